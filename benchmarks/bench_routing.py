@@ -0,0 +1,346 @@
+# Benchmark ส่วนคำนวณ (จัดเส้นทาง / ต้นทุน / บันทึกประวัติ) แบบไม่ต้องเปิดหน้าเว็บ
+#
+#   python benchmarks/bench_routing.py                      # รันทุกขนาด 10 - 20k จุด
+#   python benchmarks/bench_routing.py --sizes 10 100 1000  # เลือกขนาดเอง
+#   python benchmarks/bench_routing.py --save-baseline      # บันทึกผลเป็น baseline ใหม่
+#   python benchmarks/bench_routing.py --check              # เทียบกับ baseline ถ้าช้าลง/เส้นทางยาวขึ้นเกินเกณฑ์จะ exit 1
+#   python benchmarks/bench_routing.py --time-budget 2      # ขั้นปรับปรุงใช้เวลาจำกัดแบบหน้าเว็บ (ไม่เทียบระยะทาง)
+#
+# ค่าเริ่มต้นขั้นที่มีการปรับปรุงเส้นทางจะวนจนไม่มีการปรับได้อีก (ไม่เกิน IMPROVE_ITERATION_CAP รอบ)
+# ระยะทางจึงเท่ากันทุกเครื่อง ถ้ากำหนด --time-budget ระยะทางขึ้นกับความเร็วเครื่อง จะไม่ถูกเทียบกับ baseline
+# ไม่ใช้เครือข่าย: Geocoding ใช้ stub ที่คืนพิกัดจาก hash ของชื่อ และ OSRM ใช้ HTTP server จำลองในเครื่อง
+# ไฟล์ประวัติ/แคชทั้งหมดเขียนลงโฟลเดอร์ชั่วคราว
+import argparse
+import hashlib
+import json
+import math
+import os
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+import pandas as pd
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+DEFAULT_SIZES = [10, 100, 1000, 5000, 20000]
+
+# ขนาดสูงสุดของแต่ละขั้น (ขั้นที่ใช้ตาราง n x n หรือเรียกทีละจุดจะไม่รันกับไฟล์ใหญ่มาก)
+STAGE_LIMITS = {
+    "calculate_distance": 2000,
+    "distance_matrix": 10000,
+    "nearest_neighbour": 10000,
+    "improve_route": 5000,
+    "update_route": 5000,
+    "cvrp": 20000,
+    "plan_file_routes": 5000,
+    "marginal_cost": 20000,
+    "history_append": 2000,
+    "history_read": 2000,
+    "geocode_batch": 2000,
+    "osrm_table": 300,
+}
+# ขั้นที่ผลขึ้นกับเวลาของขั้นปรับปรุง
+BUDGETED_STAGES = {"improve_route", "update_route", "cvrp", "plan_file_routes"}
+IMPROVE_ITERATION_CAP = 50
+
+# ศูนย์กลางเมืองในไทยสำหรับสุ่มจุดลูกค้า (lat, lon, ความกระจาย องศา, น้ำหนัก)
+THAI_CLUSTERS = [
+    (13.7563, 100.5018, 0.35, 0.45),   # กรุงเทพฯ และปริมณฑล
+    (18.7883, 98.9853, 0.25, 0.12),    # เชียงใหม่
+    (16.4322, 102.8236, 0.25, 0.10),   # ขอนแก่น
+    (14.9799, 102.0977, 0.25, 0.10),   # นครราชสีมา
+    (13.3611, 100.9847, 0.20, 0.13),   # ชลบุรี
+    (7.0086, 100.4747, 0.20, 0.10),    # หาดใหญ่
+]
+
+
+def generate_locations(n, seed=0):
+    rng = np.random.default_rng(seed)
+    weights = np.array([c[3] for c in THAI_CLUSTERS])
+    cluster = rng.choice(len(THAI_CLUSTERS), size=n, p=weights / weights.sum())
+    centers = np.array([[c[0], c[1]] for c in THAI_CLUSTERS])
+    spread = np.array([c[2] for c in THAI_CLUSTERS])
+    coords = centers[cluster] + rng.normal(size=(n, 2)) * spread[cluster, None]
+    coords[0] = centers[0]   # จุดแรกเป็นคลังสินค้าที่กรุงเทพฯ
+    return pd.DataFrame({
+        "Location": ["คลังสินค้า"] + [f"ลูกค้า {i}" for i in range(1, n)],
+        "Latitude": coords[:, 0],
+        "Longitude": coords[:, 1],
+        "Demand": rng.integers(10, 300, size=n).astype(np.float64),
+    })
+
+
+def stub_geocode(query):
+    digest = hashlib.sha256(query.encode("utf-8")).digest()
+    return 6.0 + digest[0] / 255 * 14.0, 98.0 + digest[1] / 255 * 7.0
+
+
+def _stub_haversine_m(a, b):
+    lon1, lat1 = a
+    lon2, lat2 = b
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    h = math.sin((phi2 - phi1) / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(math.radians(lon2 - lon1) / 2) ** 2
+    return 2 * 6371000 * math.asin(math.sqrt(h)) * 1.3
+
+
+class StubOSRMHandler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        coords = [tuple(map(float, c.split(","))) for c in url.path.rsplit("/", 1)[-1].split(";")]
+        if url.path.startswith("/table"):
+            query = parse_qs(url.query)
+            sources = [int(i) for i in query["sources"][0].split(";")]
+            destinations = [int(i) for i in query["destinations"][0].split(";")]
+            distances = [[_stub_haversine_m(coords[i], coords[j]) for j in destinations] for i in sources]
+            body = {"code": "Ok", "distances": distances,
+                    "durations": [[d / 15 for d in row] for row in distances]}
+        else:
+            distance = _stub_haversine_m(coords[0], coords[1])
+            body = {"code": "Ok", "routes": [{
+                "geometry": {"type": "LineString", "coordinates": [list(coords[0]), list(coords[1])]},
+                "distance": distance, "duration": distance / 15,
+            }]}
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+def start_stub_osrm():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubOSRMHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def load_engine(workdir):
+    # ย้ายไปโฟลเดอร์ชั่วคราวก่อน เพื่อให้ไฟล์ประวัติ/แคชที่ใช้ path สัมพัทธ์ไม่ปนกับของจริง
+    os.chdir(workdir)
+    sys.path.insert(0, REPO_DIR)
+    import logistics_engine
+    return logistics_engine
+
+
+def measure(fn, memory):
+    start = time.perf_counter()
+    value = fn()
+    wall = time.perf_counter() - start
+    peak_mb = None
+    if memory:
+        tracemalloc.start()
+        fn()
+        peak_mb = tracemalloc.get_traced_memory()[1] / 2 ** 20
+        tracemalloc.stop()
+    return wall, peak_mb, value
+
+
+def build_stages(engine, df, n, time_budget):
+    lats = df["Latitude"].to_numpy()
+    lons = df["Longitude"].to_numpy()
+    depot = df["Location"].iloc[0]
+    shared = {}
+
+    def calculate_distance():
+        for i in range(1, n):
+            engine.calculate_distance(lats[i - 1], lons[i - 1], lats[i], lons[i])
+        return None
+
+    def distance_matrix():
+        shared["matrix"] = engine.build_distance_matrix(lats, lons)
+        return None
+
+    def nearest_neighbour():
+        matrix = shared.get("matrix")
+        if matrix is None:
+            matrix = shared["matrix"] = engine.build_distance_matrix(lats, lons)
+        shared["tour"], km = engine.nearest_neighbour_tour(matrix, 0)
+        return km
+
+    def improve_route():
+        matrix = shared.get("matrix")
+        if matrix is None:
+            matrix = shared["matrix"] = engine.build_distance_matrix(lats, lons)
+        tour = shared.get("tour") or engine.nearest_neighbour_tour(matrix, 0)[0]
+        return engine.improve_route(tour, matrix, time_budget=time_budget, max_iterations=IMPROVE_ITERATION_CAP)[1]
+
+    # ยกเลิก 1 จุด + เพิ่ม 1 จุด บนเส้นทางที่จัดแล้ว (ใช้ตาราง/tour จากขั้นก่อนหน้า ถ้ามี)
+    def update_route():
+        matrix = shared.get("matrix")
+        if matrix is None:
+            matrix = shared["matrix"] = engine.build_distance_matrix(lats, lons)
+        tour = shared.get("tour") or engine.nearest_neighbour_tour(matrix, 0)[0]
+        names = df["Location"].tolist()
+        previous = {
+            "names": names, "order": list(tour), "matrix": matrix, "durations": None, "distance_source": "haversine",
+            "locs": {name: [lat, lon] for name, lat, lon in zip(names, lats, lons)},
+        }
+        changed = pd.concat([df.drop(index=n // 2), pd.DataFrame({
+            "Location": ["ลูกค้าใหม่"], "Latitude": [lats[n // 3] + 0.01], "Longitude": [lons[n // 3] + 0.01]})])
+        return engine.update_route(previous, changed, time_budget=time_budget)["km"]
+
+    def cvrp():
+        fleet = [(vehicle, n, engine.VEHICLE_CAPACITY[vehicle]) for vehicle in engine.VEHICLE_TYPES]
+        vehicles, _ = engine.solve_cvrp_from_df(depot, df, fleet, time_budget=time_budget)
+        return sum(v["km"] for v in vehicles)
+
+    # ตั้งแต่ตารางอัปโหลดจนได้เส้นทาง + ต้นทุน + ETA แบบหน้าจัดเส้นทางจากไฟล์ (รถคันเดียว ไม่ใช้แคชผลลัพธ์)
+    def plan_file_routes():
+        settings = {
+            "mode": "single", "car_type": "รถกระบะ 4 ล้อ", "road_distances": False, "fleet": None,
+            "traffic": list(engine.TRAFFIC_PROFILES)[-1], "improve_methods": list(engine.ROUTE_IMPROVERS),
+            "time_budget": time_budget, "fuel_price": 30.5, "toll_fee": 0.0, "departure": engine.DEFAULT_DEPARTURE,
+        }
+        return engine.plan_file_routes(df, depot, settings)["km"]
+
+    def marginal_cost():
+        for km in range(n):
+            engine.calculate_marginal_cost(float(km), "รถกระบะ 4 ล้อ", 30.5, 0.0)
+        return None
+
+    def history_append():
+        path = f"bench_history_{n}.csv"
+        if os.path.exists(path):
+            os.remove(path)
+        for i in range(n):
+            engine.append_history_rows(path, engine.HISTORY_COLUMNS, [{
+                "Date": "2025-01-01 08:00:00", "Route": f"คลัง -> ลูกค้า {i}", "Distance_KM": i,
+                "Old_Cost": 100.0, "New_Cost": 80.0, "Saving": 20.0,
+            }])
+        return None
+
+    def history_read():
+        path = f"bench_history_{n}.csv"
+        if not os.path.exists(path):
+            history_append()
+        engine.storage._history_readers()["states"].pop(path, None)
+        engine.read_history_incremental(path, engine.HISTORY_COLUMNS, sum_columns=("Saving", "Distance_KM"))
+        return None
+
+    def geocode_batch():
+        if os.path.exists(engine.CACHE_DB_FILE):
+            os.remove(engine.CACHE_DB_FILE)
+        engine.geocode_locations(df["Location"].tolist())
+        return None
+
+    def osrm_table():
+        engine.osrm._osrm_state()["tables"] = engine.osrm._table_cache()
+        engine.get_osrm_table(df[["Latitude", "Longitude"]].to_numpy())
+        return None
+
+    return {
+        "calculate_distance": calculate_distance,
+        "distance_matrix": distance_matrix,
+        "nearest_neighbour": nearest_neighbour,
+        "improve_route": improve_route,
+        "update_route": update_route,
+        "cvrp": cvrp,
+        "plan_file_routes": plan_file_routes,
+        "marginal_cost": marginal_cost,
+        "history_append": history_append,
+        "history_read": history_read,
+        "geocode_batch": geocode_batch,
+        "osrm_table": osrm_table,
+    }
+
+
+def run(sizes, stages, time_budget, memory, seed):
+    with tempfile.TemporaryDirectory() as workdir:
+        engine = load_engine(workdir)
+        engine.set_geocoder(stub_geocode, min_interval=0.0)
+        server, base_url = start_stub_osrm()
+        engine.set_osrm_base_url(base_url)
+
+        results = {}
+        try:
+            for n in sizes:
+                df = generate_locations(n, seed)
+                available = build_stages(engine, df, n, time_budget)
+                for stage in stages:
+                    if n > STAGE_LIMITS[stage]:
+                        continue
+                    wall, peak_mb, tour_km = measure(available[stage], memory)
+                    results[f"{stage}@{n}"] = {"wall_s": wall, "peak_mb": peak_mb, "tour_km": tour_km,
+                                               "deterministic": stage not in BUDGETED_STAGES or math.isinf(time_budget)}
+                    print(format_row(stage, n, results[f"{stage}@{n}"]), flush=True)
+        finally:
+            server.shutdown()
+            os.chdir(REPO_DIR)
+    return results
+
+
+def format_row(stage, n, row):
+    peak = "-" if row["peak_mb"] is None else f"{row['peak_mb']:.1f}"
+    tour = "-" if row["tour_km"] is None else f"{row['tour_km']:,.1f}"
+    return f"{stage:<20} {n:>6} {row['wall_s']:>10.4f} {peak:>10} {tour:>14}"
+
+
+def compare(results, baseline, time_tolerance, tour_tolerance):
+    failures = []
+    for key, row in results.items():
+        base = baseline.get(key)
+        if base is None:
+            continue
+        if row["wall_s"] > max(base["wall_s"] * time_tolerance, base["wall_s"] + 0.05):
+            failures.append(f"{key}: เวลา {row['wall_s']:.4f}s เทียบกับ baseline {base['wall_s']:.4f}s")
+        # เทียบระยะทางเฉพาะผลที่ไม่ขึ้นกับความเร็วเครื่อง
+        comparable = row.get("deterministic", True) and base.get("deterministic", True)
+        if comparable and row["tour_km"] is not None and base.get("tour_km") is not None \
+                and row["tour_km"] > base["tour_km"] * (1 + tour_tolerance):
+            failures.append(f"{key}: ระยะทาง {row['tour_km']:,.1f} กม. เทียบกับ baseline {base['tour_km']:,.1f} กม.")
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark ส่วนคำนวณเส้นทางและต้นทุน (ไม่ใช้ UI / ไม่ใช้เครือข่าย)")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--stages", nargs="+", default=list(STAGE_LIMITS), choices=list(STAGE_LIMITS))
+    parser.add_argument("--time-budget", type=float, default=math.inf,
+                        help="เวลาของขั้นปรับปรุงเส้นทาง (วินาที) ค่าเริ่มต้นวนจนไม่มีการปรับได้อีก")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-memory", action="store_true", help="ไม่วัดหน่วยความจำ (รันแต่ละขั้นครั้งเดียว)")
+    parser.add_argument("--baseline", default=BASELINE_FILE)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--check", action="store_true", help="exit 1 ถ้าช้าลงหรือเส้นทางยาวขึ้นเกินเกณฑ์")
+    parser.add_argument("--time-tolerance", type=float, default=2.0, help="ยอมให้ช้าลงได้กี่เท่าของ baseline")
+    parser.add_argument("--tour-tolerance", type=float, default=0.02, help="ยอมให้ระยะทางยาวขึ้นได้กี่สัดส่วน")
+    args = parser.parse_args(argv)
+
+    print(f"{'stage':<20} {'stops':>6} {'wall (s)':>10} {'peak (MB)':>10} {'tour (km)':>14}")
+    results = run(args.sizes, args.stages, args.time_budget, not args.no_memory, args.seed)
+
+    if args.save_baseline:
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline, encoding="utf-8") as f:
+                baseline = json.load(f)
+        baseline.update(results)
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+        print(f"บันทึก baseline แล้ว: {args.baseline}")
+
+    if args.check:
+        if not os.path.exists(args.baseline):
+            print(f"ไม่พบ baseline: {args.baseline}")
+            return 1
+        with open(args.baseline, encoding="utf-8") as f:
+            failures = compare(results, json.load(f), args.time_tolerance, args.tour_tolerance)
+        for failure in failures:
+            print(f"❌ {failure}")
+        if failures:
+            return 1
+        print("✅ ไม่พบการถดถอยเมื่อเทียบกับ baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,78 @@
+# เอนจินจัดเส้นทาง/คำนวณต้นทุน ที่ไม่ผูกกับหน้าจอ Streamlit
+# ใช้ได้ทั้งจาก main.py, งาน batch และสคริปต์ทดสอบ/benchmark
+# folium, geopy, openpyxl และ pyarrow จะถูก import ตอนใช้งานจริงเท่านั้น (ไม่โหลดตอน import แพ็กเกจ)
+from .caching import CACHE_DB_FILE, LRUCache
+from .metrics import (
+    timed, timer, count, register_cache, reset_metrics, metrics_snapshot, cache_snapshot, metrics_json_lines,
+    prometheus_text,
+)
+from .distance import (
+    EARTH_RADIUS_KM, ROAD_FACTOR, calculate_distance, build_distance_matrix, haversine_pairs,
+    build_grid_index, grid_nearest_neighbours,
+)
+from .costing import (
+    TRAFFIC_PROFILES, DEFAULT_DEPARTURE, calculate_marginal_cost, traffic_profile, parse_departure, format_clock,
+    route_timing, route_costing,
+)
+from .routing import (
+    IMPROVE_TIME_BUDGET, ROUTE_IMPROVERS, VEHICLE_TYPES, VEHICLE_CAPACITY,
+    nearest_neighbour_tour, build_neighbour_lists, tour_length, two_opt_pass, or_opt_pass, improve_route,
+    INCREMENTAL_BUDGET, solve_route, solve_vrp_from_df, route_changes, update_route, savings_routes, assign_vehicles, solve_cvrp_from_df, create_gmaps_link,
+)
+from .osrm import OSRM_MAX_LEG_GEOMETRIES, set_osrm_base_url, osrm_table_limit, get_osrm_routes, get_osrm_route, get_osrm_table
+from .geocoding import (
+    normalize_location_key, geocode_cache_get_many, geocode_cache_put_many, set_geocoder, get_lat_lon,
+    geocode_locations, fill_missing_coordinates,
+)
+from .ingest import UPLOAD_COLUMNS, validate_upload_chunk, parse_upload, load_upload
+from .sync import (
+    set_sync_endpoint, enqueue_sync, enqueue_sync_many, sync_queue_size, sync_pending_once, start_sync_worker,
+)
+from .storage import (
+    DATA_FILE, TRACKING_FILE, HISTORY_COLUMNS, TRACKING_COLUMNS,
+    history_lock, migrate_history_file, append_history_rows, clear_history_file,
+    read_history_incremental, read_file_bytes, save_history, save_history_many, save_tracking_status,
+)
+from .archive import (
+    ARCHIVE_DIR, archive_path, read_archive_summary, archive_totals, rollover_history, maybe_rollover, query_history,
+    archived_latest, export_history_csv, clear_archive,
+)
+from .planning import (
+    INCREMENTAL_MAX_STOPS, INCREMENTAL_MAX_CHANGE, solve_cache_stats, solve_cache_key, plan_file_routes, plan_file_routes_cached,
+    can_replan, replan_file_routes, quote_trip,
+)
+from .maprender import (
+    ROUTE_COLORS, MAP_LIGHTWEIGHT_STOPS, MAP_HEIGHT, simplify_polyline, zoom_for_bounds,
+    build_route_map, get_route_map_html,
+)
+
+# ชื่อที่ re-export จากแต่ละโมดูล (from logistics_engine import * / ตัวตรวจโค้ดใช้ดูว่าเป็น API สาธารณะ)
+__all__ = [
+    "CACHE_DB_FILE", "LRUCache",
+    "timed", "timer", "count", "register_cache", "reset_metrics", "metrics_snapshot", "cache_snapshot",
+    "metrics_json_lines", "prometheus_text",
+    "EARTH_RADIUS_KM", "ROAD_FACTOR", "calculate_distance", "build_distance_matrix", "haversine_pairs",
+    "build_grid_index", "grid_nearest_neighbours",
+    "TRAFFIC_PROFILES", "DEFAULT_DEPARTURE", "calculate_marginal_cost", "traffic_profile", "parse_departure",
+    "format_clock", "route_timing", "route_costing",
+    "IMPROVE_TIME_BUDGET", "ROUTE_IMPROVERS", "VEHICLE_TYPES", "VEHICLE_CAPACITY", "nearest_neighbour_tour",
+    "build_neighbour_lists", "tour_length", "two_opt_pass", "or_opt_pass", "improve_route", "INCREMENTAL_BUDGET",
+    "solve_route", "solve_vrp_from_df", "route_changes", "update_route", "savings_routes", "assign_vehicles",
+    "solve_cvrp_from_df", "create_gmaps_link",
+    "OSRM_MAX_LEG_GEOMETRIES", "set_osrm_base_url", "osrm_table_limit", "get_osrm_routes", "get_osrm_route",
+    "get_osrm_table",
+    "normalize_location_key", "geocode_cache_get_many", "geocode_cache_put_many", "set_geocoder", "get_lat_lon",
+    "geocode_locations", "fill_missing_coordinates",
+    "UPLOAD_COLUMNS", "validate_upload_chunk", "parse_upload", "load_upload",
+    "set_sync_endpoint", "enqueue_sync", "enqueue_sync_many", "sync_queue_size", "sync_pending_once",
+    "start_sync_worker",
+    "DATA_FILE", "TRACKING_FILE", "HISTORY_COLUMNS", "TRACKING_COLUMNS", "history_lock", "migrate_history_file",
+    "append_history_rows", "clear_history_file", "read_history_incremental", "read_file_bytes", "save_history",
+    "save_history_many", "save_tracking_status",
+    "ARCHIVE_DIR", "archive_path", "read_archive_summary", "archive_totals", "rollover_history", "maybe_rollover",
+    "query_history", "archived_latest", "export_history_csv", "clear_archive",
+    "INCREMENTAL_MAX_STOPS", "INCREMENTAL_MAX_CHANGE", "solve_cache_stats", "solve_cache_key", "plan_file_routes",
+    "plan_file_routes_cached", "can_replan", "replan_file_routes", "quote_trip",
+    "ROUTE_COLORS", "MAP_LIGHTWEIGHT_STOPS", "MAP_HEIGHT", "simplify_polyline", "zoom_for_bounds",
+    "build_route_map", "get_route_map_html",
+]
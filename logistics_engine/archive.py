@@ -0,0 +1,249 @@
+# คลังประวัติระยะยาว: ย้ายแถวเก่าจากไฟล์ CSV ไปเก็บเป็น Parquet แยกตามเดือน และค้นตามช่วงวันที่/งาน
+import functools
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pandas as pd
+
+from .metrics import timed
+from .storage import DATA_FILE, TRACKING_FILE, HISTORY_COLUMNS, TRACKING_COLUMNS, history_lock, migrate_history_file
+
+# 6.4 คลัง Parquet รายเดือน (Rollover)
+# - แถวที่เก่ากว่าต้นเดือนปัจจุบัน (เวลาไทย) ถูกย้ายไป <ARCHIVE_DIR>/<ชื่อไฟล์>/month=YYYY-MM/part-*.parquet
+#   คอลัมน์วันที่เป็น timestamp ตัวเลขเป็น float64 ไฟล์ CSV เหลือเฉพาะแถวล่าสุด (ตัวอ่าน 6.1 อ่านไฟล์เล็กลง)
+# - สรุปของแต่ละเดือน (จำนวนแถว, ยอดรวม, ช่วงเวลา, รายชื่องาน) อยู่ใน _summary.json
+#   ยอดสะสมจึงไม่ต้องเปิดไฟล์ Parquet และการค้นอ่านเฉพาะเดือนที่เกี่ยวข้อง
+# - ย้ายขณะถือ history_lock ของไฟล์ CSV: เขียน Parquet + สรุปก่อน แล้วค่อยเขียน CSV ใหม่ (os.replace)
+# - pyarrow จะถูก import ตอนใช้งานจริงเท่านั้น
+ARCHIVE_DIR = 'history_archive'
+ARCHIVE_DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+ARCHIVE_SPECS = {
+    DATA_FILE: {'columns': HISTORY_COLUMNS, 'date': "Date", 'floats': ["Distance_KM", "Old_Cost", "New_Cost", "Saving"],
+                'sums': ["Saving", "Distance_KM"], 'job': "Route", 'job_index': False},
+    TRACKING_FILE: {'columns': TRACKING_COLUMNS, 'date': "Date_Time", 'floats': [], 'sums': [],
+                    'job': "Driver_Job", 'job_index': True},
+}
+
+# ไฟล์ประวัติที่ชื่ออื่น (เช่น --history-file ของงาน batch) ใช้รูปแบบเดียวกับไฟล์ประวัติคำนวณ
+def archive_spec(path):
+    return ARCHIVE_SPECS.get(os.path.basename(path), ARCHIVE_SPECS[DATA_FILE])
+
+def archive_path(path, archive_dir=ARCHIVE_DIR):
+    return os.path.join(archive_dir, os.path.splitext(os.path.basename(path))[0])
+
+def _current_month_start():
+    now = datetime.now(timezone(timedelta(hours=7)))
+    return pd.Timestamp(now.year, now.month, 1)
+
+def _arrow_schema(spec):
+    import pyarrow as pa
+    return pa.schema([(col, pa.timestamp('s') if col == spec['date'] else
+                       pa.float64() if col in spec['floats'] else pa.string()) for col in spec['columns']])
+
+def _typed_frame(raw, spec):
+    df = raw.reindex(columns=spec['columns']).fillna("")
+    df[spec['date']] = pd.to_datetime(df[spec['date']], format=ARCHIVE_DATE_FORMAT, errors='coerce')
+    for col in spec['floats']:
+        df[col] = pd.to_numeric(df[col], errors='coerce')
+    return df
+
+def _read_current(path, spec):
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        return pd.DataFrame(columns=spec['columns'])
+    return pd.read_csv(path, dtype=str, keep_default_na=False, encoding='utf-8-sig')
+
+def read_archive_summary(path, archive_dir=ARCHIVE_DIR):
+    summary_file = os.path.join(archive_path(path, archive_dir), "_summary.json")
+    if not os.path.exists(summary_file):
+        return {}
+    with open(summary_file, encoding='utf-8') as f:
+        return json.load(f)
+
+def _write_archive_summary(path, archive_dir, summary):
+    summary_file = os.path.join(archive_path(path, archive_dir), "_summary.json")
+    with open(summary_file + ".tmp", "w", encoding='utf-8') as f:
+        json.dump(summary, f, ensure_ascii=False, indent=1, sort_keys=True)
+    os.replace(summary_file + ".tmp", summary_file)
+
+# ยอดรวมทุกเดือนในคลัง (ใช้คู่กับยอดจากไฟล์ CSV ปัจจุบัน)
+def archive_totals(path, archive_dir=ARCHIVE_DIR):
+    spec = archive_spec(path)
+    summary = read_archive_summary(path, archive_dir)
+    return {
+        'rows': sum(entry['rows'] for entry in summary.values()),
+        'sums': {col: sum(entry['sums'].get(col, 0.0) for entry in summary.values()) for col in spec['sums']},
+        'months': sorted(summary),
+    }
+
+@timed("archive.rollover")
+def rollover_history(path, before=None, archive_dir=ARCHIVE_DIR):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    spec = archive_spec(path)
+    before = pd.Timestamp(before) if before is not None else _current_month_start()
+    with history_lock(path):
+        if not os.path.exists(path) or os.path.getsize(path) == 0:
+            return {}
+        migrate_history_file(path, spec['columns'])
+        raw = _read_current(path, spec)
+        typed = _typed_frame(raw, spec)
+        # แถวที่อ่านวันที่ไม่ได้จะอยู่ในไฟล์ CSV ต่อไป
+        old = (typed[spec['date']] < before).to_numpy()
+        if not old.any():
+            return {}
+
+        dataset_dir = archive_path(path, archive_dir)
+        summary = read_archive_summary(path, archive_dir)
+        schema = _arrow_schema(spec)
+        # ชื่อไฟล์ต้องไม่ซ้ำ แม้ย้ายหลายครั้งในวินาทีเดียวกัน (ไม่เช่นนั้นจะทับ part เดิม)
+        stamp = f"{time.strftime('%Y%m%d%H%M%S')}-{uuid.uuid4().hex[:12]}"
+        moved = typed[old]
+        months = moved[spec['date']].dt.strftime("%Y-%m")
+        for month, part in moved.groupby(months, sort=True):
+            part_dir = os.path.join(dataset_dir, f"month={month}")
+            os.makedirs(part_dir, exist_ok=True)
+            part_file = os.path.join(part_dir, f"part-{stamp}.parquet")
+            pq.write_table(pa.Table.from_pandas(part, schema=schema, preserve_index=False), part_file + ".tmp")
+            os.replace(part_file + ".tmp", part_file)
+
+            entry = summary.setdefault(month, {'rows': 0, 'sums': {}, 'first': None, 'last': None})
+            entry['rows'] += len(part)
+            for col in spec['sums']:
+                entry['sums'][col] = entry['sums'].get(col, 0.0) + float(part[col].sum())
+            first, last = part[spec['date']].min().strftime(ARCHIVE_DATE_FORMAT), part[spec['date']].max().strftime(ARCHIVE_DATE_FORMAT)
+            entry['first'] = min(filter(None, [entry['first'], first]))
+            entry['last'] = max(filter(None, [entry['last'], last]))
+            if spec['job_index']:
+                entry['jobs'] = sorted(set(entry.get('jobs', [])) | set(part[spec['job']]))
+        _write_archive_summary(path, archive_dir, summary)
+
+        tmp_path = path + ".tmp"
+        raw[~old].to_csv(tmp_path, index=False, encoding='utf-8-sig', lineterminator="\n")
+        os.replace(tmp_path, path)
+    return {month: int(n) for month, n in months.value_counts().sort_index().items()}
+
+# อ่านแค่แถวแรกของไฟล์ ย้ายเมื่อมีแถวเก่ากว่าต้นเดือนเท่านั้น และตรวจไม่เกินเดือนละครั้งต่อโปรเซสต่อไฟล์
+@functools.cache
+def _rollover_checks():
+    return {'lock': threading.Lock(), 'months': {}}
+
+def _first_row_date(path, spec):
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        return pd.NaT
+    head = pd.read_csv(path, dtype=str, keep_default_na=False, encoding='utf-8-sig', nrows=1)
+    if head.empty or spec['date'] not in head.columns:
+        return pd.NaT
+    return pd.to_datetime(head[spec['date']].iloc[0], format=ARCHIVE_DATE_FORMAT, errors='coerce')
+
+def maybe_rollover(path, archive_dir=ARCHIVE_DIR):
+    checks = _rollover_checks()
+    month_start = _current_month_start()
+    if checks['months'].get((path, archive_dir)) == month_start:
+        return {}
+    first_date = _first_row_date(path, archive_spec(path))
+    moved = rollover_history(path, month_start, archive_dir) if pd.notna(first_date) and first_date < month_start else {}
+    with checks['lock']:
+        checks['months'][(path, archive_dir)] = month_start
+    return moved
+
+# 6.5 ค้นประวัติตามช่วงวันที่ [start, end) และ/หรือชื่องาน
+# อ่านเฉพาะโฟลเดอร์เดือนที่ทับช่วงวันที่ (และมีงานนั้น ถ้าไฟล์มีรายชื่องานในสรุป) แล้วกรองแถวด้วย pyarrow
+# include_current=True รวมแถวจากไฟล์ CSV ปัจจุบันด้วย ผลเรียงตามเวลา คอลัมน์วันที่เป็น datetime
+@timed("archive.query")
+def query_history(path, start=None, end=None, job=None, include_current=True, archive_dir=ARCHIVE_DIR):
+    spec = archive_spec(path)
+    date_col, job_col = spec['date'], spec['job']
+    start = pd.Timestamp(start) if start is not None else None
+    end = pd.Timestamp(end) if end is not None else None
+
+    frames = []
+    files = []
+    dataset_dir = archive_path(path, archive_dir)
+    for month, entry in sorted(read_archive_summary(path, archive_dir).items()):
+        if start is not None and month < start.strftime("%Y-%m"):
+            continue
+        if end is not None and month > (end - pd.Timedelta(seconds=1)).strftime("%Y-%m"):
+            continue
+        if job is not None and 'jobs' in entry and job not in entry['jobs']:
+            continue
+        part_dir = os.path.join(dataset_dir, f"month={month}")
+        if os.path.isdir(part_dir):
+            files += [os.path.join(part_dir, name) for name in sorted(os.listdir(part_dir)) if name.endswith(".parquet")]
+
+    if files:
+        import pyarrow as pa
+        import pyarrow.dataset as ds
+
+        condition = None
+        for expr in [
+            ds.field(date_col) >= pa.scalar(start.to_pydatetime(), pa.timestamp('s')) if start is not None else None,
+            ds.field(date_col) < pa.scalar(end.to_pydatetime(), pa.timestamp('s')) if end is not None else None,
+            ds.field(job_col) == job if job is not None else None,
+        ]:
+            if expr is not None:
+                condition = expr if condition is None else condition & expr
+        table = ds.dataset(files, format="parquet", schema=_arrow_schema(spec)).to_table(filter=condition)
+        frames.append(table.to_pandas())
+
+    if include_current:
+        current = _typed_frame(_read_current(path, spec), spec)
+        keep = pd.Series(True, index=current.index)
+        if start is not None:
+            keep &= current[date_col] >= start
+        if end is not None:
+            keep &= current[date_col] < end
+        if job is not None:
+            keep &= current[job_col] == job
+        frames.append(current[keep])
+
+    frames = [frame for frame in frames if len(frame)]
+    if not frames:
+        return _typed_frame(pd.DataFrame(columns=spec['columns']), spec)
+    result = pd.concat(frames, ignore_index=True)
+    result[date_col] = result[date_col].astype("datetime64[s]")
+    return result.sort_values(date_col, kind="stable", ignore_index=True)
+
+# 6.6 สถานะล่าสุดของแต่ละงานในเดือนล่าสุดของคลัง (แถวสุดท้ายของแต่ละงาน วันที่เป็นข้อความแบบไฟล์ CSV)
+# ให้กระดาน Live Status ยังเห็นงานที่ค้างจากเดือนก่อนหลังย้ายแถวตอนต้นเดือน
+# อ่าน Parquet ใหม่เฉพาะเมื่อสรุปของเดือนนั้นเปลี่ยน (จำผลไว้ตามเดือน + จำนวนแถว)
+@functools.cache
+def _archived_latest_cache():
+    return {'lock': threading.Lock(), 'entries': {}}
+
+def archived_latest(path, archive_dir=ARCHIVE_DIR):
+    spec = archive_spec(path)
+    summary = read_archive_summary(path, archive_dir)
+    if not summary:
+        return []
+    month = max(summary)
+    version = (month, summary[month]['rows'], summary[month]['last'])
+    cache = _archived_latest_cache()
+    with cache['lock']:
+        cached = cache['entries'].get((path, archive_dir))
+    if cached is not None and cached[0] == version:
+        return cached[1]
+
+    start = pd.Timestamp(f"{month}-01")
+    rows = query_history(path, start, start + pd.offsets.MonthBegin(1), include_current=False, archive_dir=archive_dir)
+    rows[spec['date']] = rows[spec['date']].dt.strftime(ARCHIVE_DATE_FORMAT)
+    latest = rows.drop_duplicates(spec['job'], keep='last').to_dict('records')
+    with cache['lock']:
+        cache['entries'][(path, archive_dir)] = (version, latest)
+    return latest
+
+# CSV (utf-8-sig) สำหรับปุ่มดาวน์โหลด สร้างเมื่อกดเท่านั้น
+def export_history_csv(path, start=None, end=None, job=None, archive_dir=ARCHIVE_DIR):
+    spec = archive_spec(path)
+    df = query_history(path, start, end, job, archive_dir=archive_dir)
+    df[spec['date']] = df[spec['date']].dt.strftime(ARCHIVE_DATE_FORMAT)
+    return df.to_csv(index=False).encode('utf-8-sig')
+
+def clear_archive(path, archive_dir=ARCHIVE_DIR):
+    with history_lock(path):
+        shutil.rmtree(archive_path(path, archive_dir), ignore_errors=True)
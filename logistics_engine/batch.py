@@ -0,0 +1,145 @@
+# งาน batch: จัดเส้นทางทุกไฟล์ในโฟลเดอร์ (เช่น รอบกลางคืน) แบบขนานหลายคอร์ แล้วบันทึกประวัติทีละชุด
+#
+#   python -m logistics_engine.batch --input-dir uploads/
+#   python -m logistics_engine.batch --input-dir uploads/ --workers 8 --car-type "6 ล้อ" --fuel-price 31.2
+#
+# - จุดเริ่มต้นของแต่ละไฟล์ = แถวแรกของไฟล์ (ค่าเริ่มต้นของช่อง "จุดเริ่มต้น" ในหน้าเว็บ)
+# - อ่านไฟล์และเติมพิกัดที่ขาดในโปรเซสหลัก (การเว้นระยะเรียก Nominatim ต้องนับรวมทุกไฟล์)
+#   แล้วส่งงานจัดเส้นทาง + คำนวณต้นทุน + ลิงก์ Google Maps ให้ ProcessPoolExecutor
+# - ผลทุกไฟล์ต่อท้ายไฟล์ประวัติครั้งเดียว และเข้าคิว Google Sheets ใน transaction เดียว
+#   (worker ของหน้าเว็บจะส่งคิวต่อเองเมื่อแอปเปิดอยู่) แล้วย้ายแถวเดือนก่อน ๆ ไปคลัง Parquet (ถ้ามี)
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from .archive import maybe_rollover
+from .costing import DEFAULT_DEPARTURE, TRAFFIC_PROFILES, parse_departure
+from .geocoding import fill_missing_coordinates
+from .ingest import parse_upload
+from .planning import plan_file_routes
+from .routing import IMPROVE_TIME_BUDGET, ROUTE_IMPROVERS, VEHICLE_TYPES
+from .storage import DATA_FILE, save_history_many
+from .sync import sync_queue_size
+
+UPLOAD_EXTENSIONS = ('.csv', '.xlsx')
+TRAFFIC_LEVELS = dict(zip(["normal", "moderate", "heavy", "hourly"], TRAFFIC_PROFILES))
+
+def find_upload_files(input_dir):
+    names = sorted(os.listdir(input_dir))
+    return [os.path.join(input_dir, name) for name in names
+            if name.lower().endswith(UPLOAD_EXTENSIONS) and not name.startswith(('.', '~$'))]
+
+# อ่าน + ตรวจ + เติมพิกัด คืน (ตาราง, จุดเริ่มต้น, คำเตือน)
+def load_job(path):
+    with open(path, 'rb') as f:
+        upload = parse_upload(f.read(), os.path.basename(path))
+    df, warnings = upload['df'], []
+    if not upload['rejects'].empty:
+        warnings.append(f"ข้าม {len(upload['rejects'])} แถวที่ใช้ไม่ได้")
+    if df.empty:
+        raise ValueError("ไม่มีแถวที่ใช้จัดเส้นทางได้ในไฟล์")
+    depot = df['Location'].iloc[0]
+    if 'Latitude' not in df.columns or 'Longitude' not in df.columns or df[['Latitude', 'Longitude']].isna().any().any():
+        df, unresolved = fill_missing_coordinates(df)
+        if unresolved:
+            warnings.append(f"หาพิกัดไม่เจอ {len(unresolved)} จุด")
+        if depot not in set(df['Location']):
+            raise ValueError(f"หาพิกัดจุดเริ่มต้น '{depot}' ไม่เจอ")
+    return df, depot, warnings
+
+# รันในโปรเซสลูก คืนเฉพาะค่าที่ต้องใช้ (ไม่ส่งตาราง/สถิติทั้งหมดกลับข้ามโปรเซส)
+def plan_job(path, df, depot, settings):
+    started = time.perf_counter()
+    res = plan_file_routes(df, depot, settings)
+    return {
+        'path': path, 'stops': len(res['route']) - 2, 'km': res['km'], 'cost': res['cost'], 'time': res['time'],
+        'history_route': res['history_route'], 'history_gmaps': res['history_gmaps'],
+        'history_etas': res['history_etas'], 'finish': res['etas'][-1],
+        'elapsed_s': time.perf_counter() - started,
+    }
+
+def run_batch(paths, settings, old_cost, workers=None, history_file=DATA_FILE, sync=True, log=print):
+    jobs = []
+    failed = []
+    for path in paths:
+        try:
+            df, depot, warnings = load_job(path)
+        except Exception as e:
+            failed.append((path, str(e)))
+            log(f"❌ {os.path.basename(path)}: {e}")
+            continue
+        for warning in warnings:
+            log(f"⚠️ {os.path.basename(path)}: {warning}")
+        jobs.append((path, df, depot))
+
+    results = []
+    if jobs:
+        with ProcessPoolExecutor(max_workers=min(workers or os.cpu_count() or 1, len(jobs))) as pool:
+            futures = {pool.submit(plan_job, path, df, depot, settings): path for path, df, depot in jobs}
+            for future in as_completed(futures):
+                path = futures[future]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    failed.append((path, str(e)))
+                    log(f"❌ {os.path.basename(path)}: {e}")
+                    continue
+                results.append(result)
+                log(f"✅ {os.path.basename(path)}: {result['stops']} จุด, {result['km']:,.2f} กม., "
+                    f"{result['cost']:,.2f} บาท, กลับคลัง {result['finish']} ({result['elapsed_s']:.1f} วินาที)")
+
+    results.sort(key=lambda r: r['path'])
+    if results:
+        save_history_many([{'route': r['history_route'], 'km': r['km'], 'old_cost': old_cost, 'new_cost': r['cost'],
+                            'gmaps_link': r['history_gmaps'], 'stop_etas': r['history_etas']} for r in results],
+                          path=history_file, sync=sync)
+        maybe_rollover(history_file)
+    return results, failed
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="จัดเส้นทางทุกไฟล์ในโฟลเดอร์ แล้วบันทึกลงประวัติ")
+    parser.add_argument("--input-dir", required=True, help="โฟลเดอร์ที่มีไฟล์ .csv / .xlsx (หนึ่งไฟล์ต่อหนึ่งคลัง)")
+    parser.add_argument("--workers", type=int, default=None, help="จำนวนโปรเซส (ค่าเริ่มต้น = จำนวนคอร์)")
+    parser.add_argument("--car-type", choices=VEHICLE_TYPES, default=VEHICLE_TYPES[0])
+    parser.add_argument("--fuel-price", type=float, default=30.50, help="ราคาน้ำมันดีเซล (บาท/ลิตร)")
+    parser.add_argument("--toll-fee", type=float, default=0.0, help="ค่าผ่านทาง / ทางด่วน (บาท)")
+    parser.add_argument("--traffic", choices=list(TRAFFIC_LEVELS), default="normal",
+                        help="hourly = ตัวคูณตามชั่วโมง (เช้า/เย็นติด กลางคืนโล่ง)")
+    parser.add_argument("--departure", default=DEFAULT_DEPARTURE, help="เวลาออกจากคลัง HH:MM")
+    parser.add_argument("--old-cost", type=float, default=2000.0, help="ต้นทุนเดิมต่อเส้นทาง (บาท)")
+    parser.add_argument("--improve", nargs="*", choices=list(ROUTE_IMPROVERS), default=list(ROUTE_IMPROVERS),
+                        help="วิธีปรับปรุงเส้นทาง (ไม่ใส่ค่า = ไม่ปรับปรุง)")
+    parser.add_argument("--time-budget", type=float, default=IMPROVE_TIME_BUDGET, help="เวลาปรับปรุงต่อไฟล์ (วินาที)")
+    parser.add_argument("--road-distances", action="store_true", help="ใช้ระยะทางถนนจริงจาก OSRM")
+    parser.add_argument("--history-file", default=DATA_FILE)
+    parser.add_argument("--no-sync", action="store_true", help="ไม่เข้าคิวส่ง Google Sheets")
+    args = parser.parse_args(argv)
+
+    try:
+        parse_departure(args.departure)
+    except ValueError:
+        parser.error(f"--departure ต้องอยู่ในรูป HH:MM: {args.departure}")
+
+    paths = find_upload_files(args.input_dir)
+    if not paths:
+        print(f"ไม่พบไฟล์ .csv / .xlsx ใน {args.input_dir}")
+        return 1
+
+    settings = {
+        'mode': "single", 'car_type': args.car_type, 'road_distances': args.road_distances, 'fleet': None,
+        'traffic': TRAFFIC_LEVELS[args.traffic], 'improve_methods': args.improve, 'time_budget': args.time_budget,
+        'fuel_price': args.fuel_price, 'toll_fee': args.toll_fee, 'departure': args.departure,
+    }
+    started = time.perf_counter()
+    results, failed = run_batch(paths, settings, args.old_cost, args.workers, args.history_file, not args.no_sync)
+
+    print(f"\nสำเร็จ {len(results)} / {len(paths)} ไฟล์ ใน {time.perf_counter() - started:.1f} วินาที "
+          f"ระยะทางรวม {sum(r['km'] for r in results):,.2f} กม. ต้นทุนรวม {sum(r['cost'] for r in results):,.2f} บาท")
+    if results and not args.no_sync:
+        print(f"☁️ รอส่ง Google Sheets: {sync_queue_size()} รายการ (ส่งเมื่อเปิดแอป)")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,57 @@
+# แคชที่ใช้ร่วมกันทั้งโปรเซส
+import threading
+import time
+from collections import OrderedDict
+
+# ไฟล์ SQLite ที่เก็บแคชพิกัด (geocode_cache) และเส้นทางถนนจริง (osrm_routes)
+CACHE_DB_FILE = 'geo_cache.sqlite'
+
+# 0. แคชในหน่วยความจำแบบจำกัดขนาด (LRU) ใช้ร่วมกันได้หลาย thread พร้อมนับ hit/miss
+# ttl (วินาที) ถ้ากำหนด รายการที่เก่ากว่านี้จะนับเป็น miss และถูกลบ
+# max_bytes + sizeof(value) ถ้ากำหนด จำกัดขนาดรวมเป็นไบต์ด้วย (รายการที่ใหญ่กว่า max_bytes เองจะไม่ถูกเก็บ)
+class LRUCache:
+    def __init__(self, maxsize, ttl=None, max_bytes=None, sizeof=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self.hits = 0
+        self.misses = 0
+        self.nbytes = 0
+        self._data = OrderedDict()
+        self._sizes = {}
+        self._lock = threading.Lock()
+
+    def _discard(self, key):
+        del self._data[key]
+        self.nbytes -= self._sizes.pop(key, 0)
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key in self._data:
+                expires, value = self._data[key]
+                if expires is None or expires > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                self._discard(key)
+            self.misses += 1
+            return default
+
+    def put(self, key, value):
+        size = self.sizeof(value) if self.max_bytes is not None else 0
+        with self._lock:
+            if key in self._data:
+                self._discard(key)
+            if self.max_bytes is not None and size > self.max_bytes:
+                return
+            expires = time.monotonic() + self.ttl if self.ttl else None
+            self._data[key] = (expires, value)
+            if size:
+                self._sizes[key] = size
+                self.nbytes += size
+            while len(self._data) > self.maxsize or (self.max_bytes is not None and self.nbytes > self.max_bytes):
+                self._discard(next(iter(self._data)))
+
+    def __len__(self):
+        return len(self._data)
@@ -0,0 +1,98 @@
+# ต้นทุนผันแปรและเวลาเดินทาง
+import numpy as np
+
+# 2. [อัปเดต!] ฟังก์ชันคำนวณต้นทุน (เฉพาะ Variable Cost: น้ำมัน + ทางด่วน)
+def calculate_marginal_cost(distance_km, car_type, fuel_price_today, toll_fee):
+    # --- กำหนดอัตราสิ้นเปลืองรถ ---
+    if "4" in car_type:
+        fuel_efficiency = 12.0     # อัตราสิ้นเปลืองรถกระบะ (กม./ลิตร)
+    else:
+        fuel_efficiency = 7.0      # อัตราสิ้นเปลืองรถบรรทุก 6 ล้อ (กม./ลิตร)
+        
+    # --- 1. คำนวณ Cost per Kilometer (ต้นทุนน้ำมันต่อกิโลเมตร) ---
+    cost_per_km = fuel_price_today / fuel_efficiency
+    
+    # --- 2. สมการ (Formula) ---
+    # Total Cost = (Cost per KM × Distance) + Toll Fee
+    total_transportation_cost = (cost_per_km * distance_km) + toll_fee
+    
+    return total_transportation_cost
+
+# 2.1 เวลาถึงแต่ละจุด (ETA) และค่าเสียเวลารถติด คิดทีละช่วง (leg) ของเส้นทาง
+# - เวลาขับแต่ละช่วงตอนถนนโล่งมาจากตารางเวลา OSRM (ถ้ามี) ไม่เช่นนั้นใช้ km x MINS_PER_KM
+# - สภาพจราจรเป็นตัวคูณรายชั่วโมง (24 ค่า) ตามเวลาที่ออกจากจุดต้นช่วง
+# - ค่าเสียเวลารถติด = นาทีที่ขับช้ากว่าถนนโล่ง x TIME_SURCHARGE_PER_MIN (เวลาส่งของไม่คิดตัวคูณ)
+MINS_PER_KM = 0.85              # วิ่งข้ามจังหวัดเฉลี่ยราว 70 กม./ชม.
+DROP_MINUTES = 15               # เวลาส่งของต่อจุด
+TIME_SURCHARGE_PER_MIN = 2.0    # บาท/นาที
+DEFAULT_DEPARTURE = "08:00"
+ETA_MAX_ITERATIONS = 20
+
+TRAFFIC_PROFILES = {
+    "🟢 ปกติ (ถนนโล่ง)": np.full(24, 1.0),
+    "🟡 รถติดปานกลาง / ฝนตก": np.full(24, 1.5),
+    "🔴 รถติดหนัก (ช่วงเร่งด่วน)": np.full(24, 2.0),
+    # ชั่วโมง:                     0    1    2    3    4    5    6    7    8    9   10   11
+    "⏰ ตามช่วงเวลา (เช้า/เย็นติด กลางคืนโล่ง)": np.array([0.9, 0.9, 0.9, 0.9, 0.9, 1.0, 1.3, 1.8, 1.8, 1.4, 1.2, 1.2,
+    # ชั่วโมง:                    12   13   14   15   16   17   18   19   20   21   22   23
+                                                          1.3, 1.2, 1.2, 1.3, 1.6, 2.0, 2.0, 1.5, 1.1, 1.0, 0.9, 0.9]),
+}
+
+def traffic_profile(traffic):
+    return TRAFFIC_PROFILES.get(traffic, TRAFFIC_PROFILES["🟢 ปกติ (ถนนโล่ง)"])
+
+# "HH:MM" -> นาทีนับจากเที่ยงคืน
+def parse_departure(departure):
+    hours, minutes = str(departure or DEFAULT_DEPARTURE).split(":")[:2]
+    return int(hours) * 60 + int(minutes)
+
+def format_clock(minutes):
+    day, mins = divmod(int(round(minutes)), 24 * 60)
+    text = f"{mins // 60:02d}:{mins % 60:02d}"
+    return f"{text} (+{day})" if day else text
+
+# คำนวณทุกช่วงพร้อมกันแบบ vectorized leg_mins = เวลาขับถนนโล่งของแต่ละช่วง (นาที)
+# ปลายทุกช่วงหยุดส่งของ service_mins ยกเว้นช่วงสุดท้าย (กลับคลัง / ถึงปลายทาง)
+# ตัวคูณของช่วงหนึ่งขึ้นกับเวลาออก ซึ่งขึ้นกับตัวคูณของช่วงก่อน ๆ จึงวนแบบ fixed-point:
+# เวลาขับ -> เวลาออกทุกช่วง (cumsum) -> ตัวคูณตามชั่วโมง -> เวลาขับใหม่ จนไม่เปลี่ยน
+def route_timing(leg_mins, departure=DEFAULT_DEPARTURE, traffic=None, service_mins=DROP_MINUTES):
+    base = np.asarray(leg_mins, dtype=np.float64)
+    profile = traffic_profile(traffic)
+    start = parse_departure(departure)
+    dwell = np.full(len(base), float(service_mins))
+    if len(base):
+        dwell[-1] = 0.0
+
+    drive = base * profile[(start // 60) % 24]
+    depart = np.full(len(base), float(start))
+    for _ in range(ETA_MAX_ITERATIONS):
+        depart = start + np.concatenate(([0.0], np.cumsum(drive + dwell)[:-1]))
+        hours = (depart // 60).astype(np.int64) % 24
+        new_drive = base * profile[hours]
+        if np.array_equal(new_drive, drive):
+            break
+        drive = new_drive
+
+    arrive = depart + drive
+    return {
+        'start': start, 'depart': depart, 'arrive': arrive, 'drive_mins': drive, 'base_drive_mins': base,
+        'total_mins': float(arrive[-1] - start) if len(base) else 0.0,
+        'delay_mins': float(drive.sum() - base.sum()),
+    }
+
+# ต้นทุนของเส้นทาง + ตารางรายช่วง leg_km/leg_mins เรียงตามลำดับการวิ่ง (route มี len(leg_km) + 1 จุด)
+def route_costing(route, leg_km, leg_mins, car_type, fuel_price, toll_fee, traffic, departure=DEFAULT_DEPARTURE):
+    leg_km = np.asarray(leg_km, dtype=np.float64)
+    timing = route_timing(leg_mins, departure, traffic)
+    km = float(leg_km.sum())
+    base_price = calculate_marginal_cost(km, car_type, fuel_price, toll_fee)
+    surcharge = timing['delay_mins'] * TIME_SURCHARGE_PER_MIN
+    leg_cost = (calculate_marginal_cost(leg_km, car_type, fuel_price, 0.0)
+                + (timing['drive_mins'] - timing['base_drive_mins']) * TIME_SURCHARGE_PER_MIN)
+    etas = [format_clock(timing['start'])] + [format_clock(m) for m in timing['arrive']]
+    return {
+        'base_price': base_price, 'surcharge': surcharge, 'cost': base_price + surcharge,
+        'time': timing['total_mins'], 'etas': etas,
+        'legs': {'Stop': np.arange(1, len(leg_km) + 1), 'Location': route[1:], 'ETA': etas[1:],
+                 'Leg_KM': leg_km.round(2), 'Leg_Mins': timing['drive_mins'].round(1), 'Leg_Cost': leg_cost.round(2)},
+    }
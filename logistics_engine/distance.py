@@ -0,0 +1,103 @@
+# ระยะทางเส้นตรง x ตัวคูณถนน, ตารางระยะทาง และดัชนีหาจุดใกล้เคียง
+import math
+
+import numpy as np
+
+# 1. ฟังก์ชันคำนวณระยะทาง
+EARTH_RADIUS_KM = 6371
+ROAD_FACTOR = 1.4          # ตัวคูณเผื่อระยะทางถนนจริงเทียบกับเส้นตรง
+LARGE_MATRIX_STOPS = 3000  # จำนวนจุดที่เริ่มใช้โหมดประหยัดหน่วยความจำ (float32 + แบ่งก้อน)
+MATRIX_CHUNK_ROWS = 1024   # จำนวนแถวที่คำนวณต่อหนึ่งก้อนในโหมดแบ่งก้อน
+
+def calculate_distance(lat1, lon1, lat2, lon2):
+    R = EARTH_RADIUS_KM
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = math.radians(lat2 - lat1)
+    dlambda = math.radians(lon2 - lon1)
+    a = math.sin(dphi/2)**2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda/2)**2
+    c = 2 * math.atan2(math.sqrt(a), math.sqrt(1-a))
+    return R * c * ROAD_FACTOR
+
+# 1.1 ฟังก์ชันสร้างตารางระยะทางทุกคู่ (Distance Matrix) แบบ NumPy ในรอบเดียว
+# - ให้ผลเท่ากับ calculate_distance ทุกคู่ (รวมตัวคูณถนน 1.4)
+# - ไฟล์ใหญ่ (>= LARGE_MATRIX_STOPS จุด) จะใช้ float32 และคำนวณทีละก้อนแถว
+#   เพื่อไม่ให้เกิดอาร์เรย์ชั่วคราวขนาด n x n หลายชุดพร้อมกัน (10k x 10k ใช้ ~400 MB)
+def build_distance_matrix(lats, lons, dtype=None, chunk_rows=None):
+    n = len(lats)
+    if dtype is None:
+        dtype = np.float32 if n >= LARGE_MATRIX_STOPS else np.float64
+    if chunk_rows is None:
+        chunk_rows = MATRIX_CHUNK_ROWS if n >= LARGE_MATRIX_STOPS else max(n, 1)
+
+    phi = np.radians(np.asarray(lats, dtype=np.float64)).astype(dtype)
+    lam = np.radians(np.asarray(lons, dtype=np.float64)).astype(dtype)
+    cos_phi = np.cos(phi)
+    scale = dtype(2 * EARTH_RADIUS_KM * ROAD_FACTOR)
+
+    matrix = np.empty((n, n), dtype=dtype)
+    for start in range(0, n, chunk_rows):
+        stop = min(start + chunk_rows, n)
+        a = np.sin((phi[None, :] - phi[start:stop, None]) / 2) ** 2
+        a += cos_phi[start:stop, None] * cos_phi[None, :] * np.sin((lam[None, :] - lam[start:stop, None]) / 2) ** 2
+        np.clip(a, 0, 1, out=a)
+        np.sqrt(a, out=a)
+        np.arcsin(a, out=a)
+        matrix[start:stop] = a * scale
+    return matrix
+
+# 1.2 ระยะทางแบบจับคู่ทีละตำแหน่ง (ไม่สร้างตารางเต็ม) ใช้กับคู่ที่คัดมาแล้ว
+def haversine_pairs(lat1, lon1, lat2, lon2):
+    phi1, phi2 = np.radians(lat1), np.radians(lat2)
+    a = np.sin((phi2 - phi1) / 2) ** 2 + np.cos(phi1) * np.cos(phi2) * np.sin(np.radians(np.subtract(lon2, lon1)) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * ROAD_FACTOR * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+# 1.3 ดัชนีเชิงพื้นที่แบบตาราง (Grid Index) สำหรับหาจุดใกล้เคียง k จุด โดยไม่ต้องสร้างตาราง n x n
+# แปลงพิกัดเป็นกิโลเมตรแบบระนาบ แล้วแบ่งเป็นช่องสี่เหลี่ยม ค้นจากช่องรอบ ๆ ทีละวง
+KM_PER_DEGREE = 111.32
+
+def build_grid_index(lats, lons, k):
+    lats = np.asarray(lats, dtype=np.float64)
+    lons = np.asarray(lons, dtype=np.float64)
+    y = lats * KM_PER_DEGREE
+    x = lons * KM_PER_DEGREE * math.cos(math.radians(float(np.mean(lats)) if len(lats) else 0.0))
+
+    # ให้แต่ละช่องมีจุดเฉลี่ยราว k/2 จุด
+    area = max((x.max() - x.min()) * (y.max() - y.min()), 1.0) if len(x) else 1.0
+    cell_km = max(math.sqrt(area * max(k, 2) / 2 / max(len(x), 1)), 0.1)
+    cx = np.floor((x - x.min()) / cell_km).astype(np.int64) if len(x) else x.astype(np.int64)
+    cy = np.floor((y - y.min()) / cell_km).astype(np.int64) if len(y) else y.astype(np.int64)
+
+    cells = {}
+    for idx, key in enumerate(zip(cx.tolist(), cy.tolist())):
+        cells.setdefault(key, []).append(idx)
+    cells = {key: np.array(members, dtype=np.int64) for key, members in cells.items()}
+    return {'x': x, 'y': y, 'cells': cells}
+
+def grid_nearest_neighbours(grid, k):
+    x, y, cells = grid['x'], grid['y'], grid['cells']
+    n = len(x)
+    k = min(k, n - 1)
+    result = np.full((n, max(k, 0)), -1, dtype=np.int64)
+    if k <= 0:
+        return result
+
+    def ring_members(cx, cy, r):
+        found = [cells[key] for key in ((cx + dx, cy + dy) for dx in range(-r, r + 1) for dy in range(-r, r + 1)) if key in cells]
+        return np.concatenate(found) if found else np.empty(0, dtype=np.int64)
+
+    for (cx, cy), members in cells.items():
+        r = 1
+        candidates = ring_members(cx, cy, r)
+        while len(candidates) <= k and len(candidates) < n:
+            r += 1
+            candidates = ring_members(cx, cy, r)
+        # ขยายอีกหนึ่งวงเพื่อให้จุดที่อยู่ใกล้ขอบช่องไม่ตกหล่น
+        candidates = ring_members(cx, cy, r + 1)
+
+        d2 = (x[members, None] - x[None, candidates]) ** 2 + (y[members, None] - y[None, candidates]) ** 2
+        d2[members[:, None] == candidates[None, :]] = np.inf
+        nearest = np.argpartition(d2, k - 1, axis=1)[:, :k]
+        rows = np.arange(len(members))[:, None]
+        nearest = nearest[rows, np.argsort(d2[rows, nearest], axis=1)]
+        result[members] = candidates[nearest]
+    return result
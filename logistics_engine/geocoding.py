@@ -0,0 +1,159 @@
+# ค้นหาพิกัดจากชื่อสถานที่ (geopy โหลดเมื่อเรียก Nominatim ครั้งแรกเท่านั้น)
+import functools
+import sqlite3
+import threading
+import time
+import unicodedata
+from contextlib import closing
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+from .caching import CACHE_DB_FILE
+from .metrics import timed, count, counter_value, register_cache
+
+# 4. ฟังก์ชัน Geocoding
+# - แคชผลค้นหาพิกัดลง SQLite (คีย์ = ชื่อที่ normalize แล้ว) มีอายุ (TTL) และลบรายการที่ไม่ได้ใช้นานสุดเมื่อเต็ม (LRU)
+# - Nominatim ใช้ client ตัวเดียวทั้งแอป และเว้นช่วงการเรียกตามนโยบาย (ไม่เกิน 1 ครั้ง/วินาที)
+# - เปลี่ยนตัวค้นหาได้ด้วย set_geocoder (เช่น ใช้ stub ตอนทดสอบ)
+GEOCODE_TTL_DAYS = 30            # อายุของพิกัดที่ค้นเจอ
+GEOCODE_MISS_TTL_DAYS = 1        # อายุของชื่อที่ค้นไม่เจอ (กันการค้นซ้ำถี่ ๆ)
+GEOCODE_CACHE_MAX_ROWS = 50000
+GEOCODE_MIN_INTERVAL = 1.0       # วินาทีระหว่างการเรียก Nominatim แต่ละครั้ง
+GEOCODE_WORKERS = 4
+
+def normalize_location_key(location_name):
+    text = unicodedata.normalize("NFC", str(location_name))
+    return " ".join(text.split()).lower()
+
+def _cache_connect():
+    conn = sqlite3.connect(CACHE_DB_FILE, timeout=30)
+    conn.execute("CREATE TABLE IF NOT EXISTS geocode_cache ("
+                 "key TEXT PRIMARY KEY, lat REAL, lon REAL, created REAL, last_used REAL)")
+    return conn
+
+def geocode_cache_get_many(keys):
+    now = time.time()
+    found = {}
+    keys = list(keys)
+    with closing(_cache_connect()) as conn, conn:
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            rows = conn.execute(
+                f"SELECT key, lat, lon, created FROM geocode_cache WHERE key IN ({','.join('?' * len(chunk))})", chunk
+            ).fetchall()
+            hits = []
+            for key, lat, lon, created in rows:
+                ttl_days = GEOCODE_TTL_DAYS if lat is not None else GEOCODE_MISS_TTL_DAYS
+                if now - created <= ttl_days * 86400:
+                    found[key] = (lat, lon)
+                    hits.append((now, key))
+            conn.executemany("UPDATE geocode_cache SET last_used = ? WHERE key = ?", hits)
+    count("geocode_cache.hits", len(found))
+    count("geocode_cache.misses", len(keys) - len(found))
+    return found
+
+def geocode_cache_put_many(results):
+    now = time.time()
+    with closing(_cache_connect()) as conn, conn:
+        conn.executemany(
+            "INSERT OR REPLACE INTO geocode_cache (key, lat, lon, created, last_used) VALUES (?, ?, ?, ?, ?)",
+            [(key, lat, lon, now, now) for key, (lat, lon) in results.items()]
+        )
+        overflow = conn.execute("SELECT COUNT(*) FROM geocode_cache").fetchone()[0] - GEOCODE_CACHE_MAX_ROWS
+        if overflow > 0:
+            conn.execute("DELETE FROM geocode_cache WHERE key IN "
+                         "(SELECT key FROM geocode_cache ORDER BY last_used LIMIT ?)", (overflow,))
+
+@functools.cache
+def _geocoder_state():
+    return {'geocode': None, 'min_interval': GEOCODE_MIN_INTERVAL, 'lock': threading.Lock(), 'last_call': 0.0}
+
+register_cache("geocode (sqlite)", lambda: (counter_value("geocode_cache.hits"), counter_value("geocode_cache.misses")))
+
+def _nominatim_geocode(query):
+    state = _geocoder_state()
+    if 'nominatim' not in state:
+        from geopy.geocoders import Nominatim
+        state['nominatim'] = Nominatim(user_agent="logistics_student_project_66")
+    location = state['nominatim'].geocode(query, timeout=10)
+    if location:
+        return location.latitude, location.longitude
+    return None, None
+
+def set_geocoder(geocode_fn, min_interval=0.0):
+    state = _geocoder_state()
+    state['geocode'] = geocode_fn
+    state['min_interval'] = min_interval
+
+# เรียกตัวค้นหาจริง โดยเว้นระยะห่างระหว่างการเรียกทุก thread รวมกัน
+@timed("geocode.remote")
+def _geocode_remote(location_name):
+    state = _geocoder_state()
+    with state['lock']:
+        wait = state['last_call'] + state['min_interval'] - time.monotonic()
+        if wait > 0:
+            time.sleep(wait)
+        state['last_call'] = time.monotonic()
+    geocode = state['geocode'] or _nominatim_geocode
+    return geocode(location_name + ", Thailand")
+
+@timed("geocode.get_lat_lon")
+def get_lat_lon(location_name):
+    key = normalize_location_key(location_name)
+    cached = geocode_cache_get_many([key])
+    if key in cached:
+        return cached[key]
+    try:
+        lat, lon = _geocode_remote(location_name)
+    except:
+        return None, None
+    geocode_cache_put_many({key: (lat, lon)})
+    return lat, lon
+
+# 4.1 ค้นหาพิกัดเป็นชุด: อ่านแคชครั้งเดียว ส่วนที่ไม่มีในแคชส่งให้ worker pool (ยังเว้นระยะตามนโยบาย)
+# คืน dict ชื่อ -> (lat, lon) ตัวที่ค้นไม่เจอจะเป็น (None, None)
+@timed("geocode.batch")
+def geocode_locations(location_names, max_workers=GEOCODE_WORKERS, progress=None):
+    keys = {}
+    for name in location_names:
+        keys.setdefault(normalize_location_key(name), name)
+
+    resolved = geocode_cache_get_many(keys.keys())
+    missing = [key for key in keys if key not in resolved]
+    fetched = {}
+    if missing:
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            futures = {pool.submit(_geocode_remote, keys[key]): key for key in missing}
+            for done, future in enumerate(as_completed(futures), start=1):
+                key = futures[future]
+                try:
+                    fetched[key] = future.result()
+                except:
+                    resolved[key] = (None, None)
+                if progress:
+                    progress(done, len(missing))
+        geocode_cache_put_many(fetched)
+    resolved.update(fetched)
+    return {name: resolved[normalize_location_key(name)] for name in location_names}
+
+# 4.2 เติม Latitude/Longitude ที่ว่างในตารางที่อัปโหลด คืน (ตารางใหม่, รายชื่อที่หาพิกัดไม่เจอ)
+def fill_missing_coordinates(df_data, progress=None):
+    df_data = df_data.copy()
+    for col in ('Latitude', 'Longitude'):
+        if col not in df_data.columns:
+            df_data[col] = np.nan
+        df_data[col] = pd.to_numeric(df_data[col], errors='coerce')
+
+    missing = df_data['Latitude'].isna() | df_data['Longitude'].isna()
+    if not missing.any():
+        return df_data, []
+
+    found = geocode_locations(df_data.loc[missing, 'Location'].unique().tolist(), progress=progress)
+    coords = df_data.loc[missing, 'Location'].map(found)
+    df_data.loc[missing, 'Latitude'] = np.array([c[0] for c in coords], dtype=np.float64)
+    df_data.loc[missing, 'Longitude'] = np.array([c[1] for c in coords], dtype=np.float64)
+
+    unresolved = df_data['Latitude'].isna() | df_data['Longitude'].isna()
+    return df_data[~unresolved].reset_index(drop=True), df_data.loc[unresolved, 'Location'].tolist()
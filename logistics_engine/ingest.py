@@ -0,0 +1,121 @@
+# อ่านไฟล์ลูกค้าที่อัปโหลด (openpyxl โหลดเมื่ออ่าน .xlsx เท่านั้น)
+import functools
+import hashlib
+import io
+
+import numpy as np
+import pandas as pd
+
+from .caching import LRUCache
+from .metrics import timed, register_cache
+
+# 8. อ่านไฟล์อัปโหลดแบบแบ่งก้อน + ตรวจสอบข้อมูล
+# - CSV อ่านทีละ UPLOAD_CHUNK_ROWS แถว, xlsx ใช้ openpyxl โหมด read-only (ไม่โหลดทั้ง workbook เข้าหน่วยความจำ)
+# - อ่านเฉพาะคอลัมน์ที่ใช้ Location เป็นข้อความ Latitude/Longitude/Demand/Capacity เป็น float64
+# - ตรวจทุกแถวแบบ vectorized แถวที่ใช้ไม่ได้จะถูกแยกออกพร้อมเหตุผลและเลขแถวในไฟล์
+# - ผลการอ่านแคชตาม hash ของเนื้อไฟล์ rerun ด้วยไฟล์เดิมจึงไม่ต้อง parse ใหม่
+UPLOAD_CHUNK_ROWS = 50000
+UPLOAD_COLUMNS = ['Location', 'Latitude', 'Longitude', 'Demand', 'Capacity']
+UPLOAD_NUMERIC_COLUMNS = ['Latitude', 'Longitude', 'Demand', 'Capacity']
+UPLOAD_CACHE_SIZE = 8
+
+def _iter_csv_chunks(data):
+    return pd.read_csv(io.BytesIO(data), chunksize=UPLOAD_CHUNK_ROWS, encoding='utf-8-sig',
+                       usecols=lambda col: col in UPLOAD_COLUMNS, dtype={'Location': str})
+
+def _iter_xlsx_chunks(data):
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(io.BytesIO(data), read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = [str(h).strip() if h is not None else "" for h in next(rows, ())]
+        keep = [i for i, h in enumerate(header) if h in UPLOAD_COLUMNS]
+        columns = [header[i] for i in keep]
+        batch = []
+        for row in rows:
+            batch.append([row[i] if i < len(row) else None for i in keep])
+            if len(batch) >= UPLOAD_CHUNK_ROWS:
+                yield pd.DataFrame(batch, columns=columns)
+                batch = []
+        if batch or not columns:
+            yield pd.DataFrame(batch, columns=columns)
+    finally:
+        workbook.close()
+
+# ตรวจหนึ่งก้อน คืน (แถวที่ใช้ได้, แถวที่ถูกปฏิเสธ) first_row = เลขแถวในไฟล์ของแถวแรกในก้อน
+def validate_upload_chunk(chunk, first_row):
+    if 'Location' not in chunk.columns:
+        raise ValueError("ไม่พบคอลัมน์ 'Location' ในไฟล์")
+    chunk = chunk.reset_index(drop=True)
+    row_numbers = pd.Series(np.arange(first_row, first_row + len(chunk)))
+    reason = pd.Series("", index=chunk.index, dtype=object)
+
+    location = chunk['Location'].astype("string").str.strip()
+    chunk['Location'] = location.astype(object)
+    reason[location.isna() | (location == "")] = "ไม่มีชื่อสถานที่"
+
+    for col in UPLOAD_NUMERIC_COLUMNS:
+        if col not in chunk.columns:
+            continue
+        raw = chunk[col]
+        values = pd.to_numeric(raw, errors='coerce').astype(np.float64)
+        reason[(reason == "") & raw.notna() & values.isna()] = f"{col} ไม่ใช่ตัวเลข"
+        chunk[col] = values
+
+    if 'Latitude' in chunk.columns and 'Longitude' in chunk.columns:
+        lat, lon = chunk['Latitude'], chunk['Longitude']
+        reason[(reason == "") & (lat.isna() != lon.isna())] = "พิกัดไม่ครบ (มีแค่ Latitude หรือ Longitude)"
+        reason[(reason == "") & ((lat.abs() > 90) | (lon.abs() > 180))] = "พิกัดเกินช่วงที่เป็นไปได้"
+    if 'Demand' in chunk.columns:
+        reason[(reason == "") & (chunk['Demand'] < 0)] = "Demand ติดลบ"
+
+    # แถวว่างทั้งแถว (เช่น แถวท้ายตารางใน Excel) ข้ามไปเฉย ๆ ไม่นับเป็นแถวผิด
+    blank = chunk[[col for col in UPLOAD_COLUMNS if col in chunk.columns]].isna().all(axis=1)
+    bad = (reason != "") & ~blank
+    good = (reason == "") & ~blank
+    rejects = pd.DataFrame({'Row': row_numbers[bad], 'Location': chunk.loc[bad, 'Location'], 'Reason': reason[bad]})
+    clean = chunk[good].copy()
+    clean['Row'] = row_numbers[good].to_numpy()
+    return clean, rejects
+
+@timed("upload.parse")
+def parse_upload(data, file_name):
+    chunks = _iter_csv_chunks(data) if file_name.lower().endswith('.csv') else _iter_xlsx_chunks(data)
+    clean_parts, reject_parts = [], []
+    first_row = 2   # แถวที่ 1 เป็นหัวตาราง
+    for chunk in chunks:
+        clean, rejects = validate_upload_chunk(chunk, first_row)
+        first_row += len(chunk)
+        clean_parts.append(clean)
+        reject_parts.append(rejects)
+    if not clean_parts:
+        raise ValueError("ไฟล์ไม่มีข้อมูล")
+
+    df = pd.concat(clean_parts, ignore_index=True)
+    rejects = pd.concat(reject_parts, ignore_index=True)
+
+    duplicated = df['Location'].duplicated(keep='first')
+    if duplicated.any():
+        rejects = pd.concat([rejects, pd.DataFrame({
+            'Row': df.loc[duplicated, 'Row'], 'Location': df.loc[duplicated, 'Location'], 'Reason': "ชื่อสถานที่ซ้ำ (ใช้แถวแรก)"
+        })], ignore_index=True).sort_values('Row', ignore_index=True)
+        df = df[~duplicated]
+
+    return {'df': df.drop(columns='Row').reset_index(drop=True), 'rejects': rejects, 'total_rows': first_row - 2}
+
+@functools.cache
+def _upload_cache():
+    return LRUCache(UPLOAD_CACHE_SIZE)
+
+register_cache("uploads (LRU)", lambda: (_upload_cache().hits, _upload_cache().misses))
+
+# คืนสำเนาตื้นของตาราง ผู้เรียกเพิ่ม/แก้คอลัมน์ได้โดยไม่กระทบผลที่แคชไว้
+def load_upload(data, file_name):
+    cache = _upload_cache()
+    key = (hashlib.sha256(data).hexdigest(), file_name)
+    upload = cache.get(key)
+    if upload is None:
+        upload = parse_upload(data, file_name)
+        cache.put(key, upload)
+    return dict(upload, df=upload['df'].copy(deep=False), rejects=upload['rejects'].copy(deep=False))
@@ -0,0 +1,114 @@
+# สร้างแผนที่ folium ของผลจัดเส้นทาง (folium โหลดเมื่อวาดแผนที่ครั้งแรกเท่านั้น)
+import functools
+import html
+import math
+
+import numpy as np
+
+from .caching import LRUCache
+from .metrics import timed, register_cache
+
+ROUTE_COLORS = ['blue', 'green', 'purple', 'orange', 'darkred', 'cadetblue', 'darkgreen', 'pink', 'gray', 'black']
+
+# 10. วาดแผนที่ผลจัดเส้นทาง
+# - โหมดเบา (เส้นทางใหญ่): รวมหมุดเป็นกลุ่มด้วย FastMarkerCluster (ส่งแค่อาร์เรย์พิกัด ไม่สร้าง Marker ทีละตัว)
+#   และลดจุดของเส้นทาง/เส้นถนน OSRM ด้วย Douglas-Peucker ตามระดับซูมที่แผนที่เปิดขึ้นมา
+# - HTML ของแผนที่แคชตามผลลัพธ์ rerun ที่เส้นทางไม่เปลี่ยนจึงไม่ต้องสร้างแผนที่ใหม่
+MAP_LIGHTWEIGHT_STOPS = 200     # จำนวนจุดที่เริ่มใช้โหมดเบาโดยอัตโนมัติ
+MAP_SIMPLIFY_PIXELS = 1.5       # ความคลาดเคลื่อนที่ยอมให้ (พิกเซล) ตอนลดจุดของเส้น
+MAP_HTML_CACHE_SIZE = 16
+MAP_HEIGHT = 520
+
+# Douglas-Peucker แบบไม่เรียกซ้ำ คืนจุดที่เหลือตามลำดับเดิม (points เป็น [[y, x], ...])
+def simplify_polyline(points, tolerance):
+    pts = np.asarray(points, dtype=np.float64)
+    if len(pts) <= 2 or tolerance <= 0:
+        return pts.tolist()
+    keep = np.zeros(len(pts), dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(pts) - 1)]
+    while stack:
+        start, end = stack.pop()
+        if end - start < 2:
+            continue
+        seg = pts[end] - pts[start]
+        rel = pts[start + 1:end] - pts[start]
+        seg_len = np.hypot(seg[0], seg[1])
+        if seg_len == 0:
+            dist = np.hypot(rel[:, 0], rel[:, 1])
+        else:
+            dist = np.abs(seg[0] * rel[:, 1] - seg[1] * rel[:, 0]) / seg_len
+        far = int(np.argmax(dist))
+        if dist[far] > tolerance:
+            mid = start + 1 + far
+            keep[mid] = True
+            stack.append((start, mid))
+            stack.append((mid, end))
+    return pts[keep].tolist()
+
+# ระดับซูมที่ทั้งเส้นทางพอดีกับแผนที่กว้างราว 700 พิกเซล
+def zoom_for_bounds(lats, lons, width_px=700):
+    span = max(float(np.ptp(lats)) if len(lats) else 0.0, float(np.ptp(lons)) if len(lons) else 0.0, 1e-4)
+    return int(min(max(math.floor(math.log2(360 * width_px / 256 / span)), 3), 16))
+
+def _degrees_per_pixel(zoom):
+    return 360 / (256 * 2 ** zoom)
+
+@timed("map.build")
+def build_route_map(res, lightweight):
+    import folium
+    from folium.plugins import FastMarkerCluster
+
+    coords = np.array(list(res['locs'].values()), dtype=np.float64)
+    zoom = zoom_for_bounds(coords[:, 0], coords[:, 1])
+    tolerance = MAP_SIMPLIFY_PIXELS * _degrees_per_pixel(zoom) if lightweight else 0
+    depot = res['route'][0]
+
+    m = folium.Map(location=res['locs'][depot], zoom_start=zoom, prefer_canvas=lightweight)
+    if len(coords) > 1:
+        m.fit_bounds([coords.min(axis=0).tolist(), coords.max(axis=0).tolist()])
+    folium.Marker(res['locs'][depot], popup=depot, icon=folium.Icon(color='red', icon='info-sign')).add_to(m)
+
+    routes = res['vehicles'] if 'vehicles' in res else [{'route': res['route'], 'paths': res.get('paths')}]
+    for v_no, v in enumerate(routes):
+        color = ROUTE_COLORS[v_no % len(ROUTE_COLORS)]
+        tooltip = f"คันที่ {v_no+1}: {v['vehicle']}" if 'vehicle' in v else None
+        if v.get('paths') and all(v['paths']):
+            # GeoJSON เป็น [lon, lat] ต่อทุกช่วงเป็นเส้นเดียวแล้วลดจุด
+            line = [[lat, lon] for path in v['paths'] for lon, lat in path['coordinates']]
+        else:
+            line = [res['locs'][city] for city in v['route']]
+        folium.PolyLine(simplify_polyline(line, tolerance), color=color, weight=4, tooltip=tooltip).add_to(m)
+
+        stops = v['route'][1:-1]
+        prefix = f"คันที่ {v_no+1} / " if 'vehicle' in v else ""
+        if lightweight:
+            callback = ("function (row) { var marker = L.circleMarker(new L.LatLng(row[0], row[1]), "
+                        f"{{radius: 5, color: '{color}', fill: true}}); marker.bindPopup(row[2]); return marker; }}")
+            data = [[*res['locs'][city], html.escape(f"{prefix}{i}. {city}")] for i, city in enumerate(stops, start=1)]
+            FastMarkerCluster(data, callback=callback).add_to(m)
+        elif 'vehicle' in v:
+            for i, city in enumerate(stops, start=1):
+                folium.CircleMarker(res['locs'][city], radius=5, color=color, fill=True,
+                                    popup=f"{prefix}{i}. {city}").add_to(m)
+        else:
+            for i, city in enumerate(stops, start=1):
+                folium.Marker(res['locs'][city], popup=f"{i}. {city}",
+                              icon=folium.Icon(color='blue', icon='info-sign')).add_to(m)
+    return m
+
+@functools.cache
+def _map_html_cache():
+    return LRUCache(MAP_HTML_CACHE_SIZE)
+
+register_cache("map html (LRU)", lambda: (_map_html_cache().hits, _map_html_cache().misses))
+
+def get_route_map_html(res, lightweight):
+    cache = _map_html_cache()
+    key = (res.get('key'), lightweight)
+    map_html = cache.get(key) if res.get('key') else None
+    if map_html is None:
+        map_html = build_route_map(res, lightweight).get_root().render()
+        if res.get('key'):
+            cache.put(key, map_html)
+    return map_html
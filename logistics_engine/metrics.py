@@ -0,0 +1,133 @@
+# 11. วัดเวลา/นับจำนวนการเรียกฟังก์ชันหลัก (Instrumentation)
+# - ห่อฟังก์ชันด้วย @timed("ชื่อ") หรือ with timer("ชื่อ"): เก็บจำนวนครั้ง, error, เวลารวม
+#   และเวลาล่าสุดไม่เกิน METRICS_SAMPLES ค่าต่อ operation (ใช้หา p50/p95)
+# - แคชแต่ละตัวลงทะเบียนด้วย register_cache เพื่อรายงาน hit rate รวมกัน
+# - ส่งออกได้ทั้งแบบ Prometheus text (prometheus_text) และ JSON ทีละบรรทัด (metrics_json_lines)
+# - ตั้งตัวแปรแวดล้อม LOGISTICS_METRICS_LOG=1 เพื่อเขียน log JSON ทุกการเรียก (logger "logistics_engine.metrics")
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import numpy as np
+
+METRICS_SAMPLES = 1000
+METRICS_LOG = os.environ.get("LOGISTICS_METRICS_LOG") == "1"
+
+logger = logging.getLogger("logistics_engine.metrics")
+
+@functools.cache
+def _metrics_state():
+    return {'lock': threading.Lock(), 'ops': {}, 'counters': {}, 'caches': {}, 'cache_base': {}}
+
+def observe(name, seconds, error=False):
+    state = _metrics_state()
+    with state['lock']:
+        op = state['ops'].get(name)
+        if op is None:
+            op = state['ops'][name] = {'count': 0, 'errors': 0, 'total_s': 0.0,
+                                       'samples': deque(maxlen=METRICS_SAMPLES)}
+        op['count'] += 1
+        op['errors'] += bool(error)
+        op['total_s'] += seconds
+        op['samples'].append(seconds)
+    if METRICS_LOG:
+        logger.info(json.dumps({'op': name, 'ms': round(seconds * 1000, 3), 'ok': not error}))
+
+@contextmanager
+def timer(name):
+    started = time.perf_counter()
+    error = False
+    try:
+        yield
+    except BaseException:
+        error = True
+        raise
+    finally:
+        observe(name, time.perf_counter() - started, error)
+
+def timed(name):
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with timer(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+def count(name, n=1):
+    state = _metrics_state()
+    with state['lock']:
+        state['counters'][name] = state['counters'].get(name, 0) + n
+
+def counter_value(name):
+    return _metrics_state()['counters'].get(name, 0)
+
+# stats_fn() คืน (hits, misses) ของแคช เช่น lambda: (lru.hits, lru.misses)
+def register_cache(name, stats_fn):
+    _metrics_state()['caches'][name] = stats_fn
+
+# รีเซ็ตทั้งเวลา ตัวนับ และ hit/miss ของแคชที่ลงทะเบียนไว้ (จำค่าปัจจุบันไว้หักออก ไม่ล้างตัวแคชเอง)
+def reset_metrics():
+    state = _metrics_state()
+    with state['lock']:
+        state['ops'].clear()
+        state['counters'].clear()
+    state['cache_base'] = {name: stats_fn() for name, stats_fn in state['caches'].items()}
+
+def metrics_snapshot():
+    state = _metrics_state()
+    with state['lock']:
+        ops = {name: (op['count'], op['errors'], op['total_s'], np.array(op['samples']))
+               for name, op in state['ops'].items()}
+    rows = []
+    for name, (calls, errors, total_s, samples) in sorted(ops.items()):
+        p50, p95 = np.percentile(samples, [50, 95]) if len(samples) else (0.0, 0.0)
+        rows.append({'op': name, 'count': calls, 'errors': errors, 'total_s': total_s,
+                     'mean_ms': total_s / calls * 1000 if calls else 0.0, 'p50_ms': p50 * 1000, 'p95_ms': p95 * 1000})
+    return rows
+
+def cache_snapshot():
+    state = _metrics_state()
+    rows = []
+    for name, stats_fn in sorted(state['caches'].items()):
+        hits, misses = stats_fn()
+        base_hits, base_misses = state['cache_base'].get(name, (0, 0))
+        if hits < base_hits or misses < base_misses:   # แคชถูกสร้างใหม่หลังรีเซ็ต: ใช้ค่าดิบ
+            base_hits = base_misses = 0
+        hits, misses = hits - base_hits, misses - base_misses
+        total = hits + misses
+        rows.append({'cache': name, 'hits': hits, 'misses': misses, 'hit_rate': hits / total if total else None})
+    return rows
+
+def metrics_json_lines():
+    lines = [json.dumps(dict(row, type='op'), ensure_ascii=False) for row in metrics_snapshot()]
+    lines += [json.dumps(dict(row, type='cache'), ensure_ascii=False) for row in cache_snapshot()]
+    return "\n".join(lines) + "\n"
+
+def prometheus_text():
+    lines = [
+        "# HELP logistics_op_duration_seconds Duration of instrumented operations (last samples).",
+        "# TYPE logistics_op_duration_seconds summary",
+    ]
+    snapshot = metrics_snapshot()
+    for row in snapshot:
+        label = f'op="{row["op"]}"'
+        lines.append(f'logistics_op_duration_seconds{{{label},quantile="0.5"}} {row["p50_ms"] / 1000:.6f}')
+        lines.append(f'logistics_op_duration_seconds{{{label},quantile="0.95"}} {row["p95_ms"] / 1000:.6f}')
+        lines.append(f'logistics_op_duration_seconds_sum{{{label}}} {row["total_s"]:.6f}')
+        lines.append(f'logistics_op_duration_seconds_count{{{label}}} {row["count"]}')
+    lines += ["# HELP logistics_op_errors_total Instrumented operations that raised.",
+              "# TYPE logistics_op_errors_total counter"]
+    lines += [f'logistics_op_errors_total{{op="{row["op"]}"}} {row["errors"]}' for row in snapshot]
+
+    caches = cache_snapshot()
+    lines += ["# HELP logistics_cache_hits_total Cache hits.", "# TYPE logistics_cache_hits_total counter"]
+    lines += [f'logistics_cache_hits_total{{cache="{row["cache"]}"}} {row["hits"]}' for row in caches]
+    lines += ["# HELP logistics_cache_misses_total Cache misses.", "# TYPE logistics_cache_misses_total counter"]
+    lines += [f'logistics_cache_misses_total{{cache="{row["cache"]}"}} {row["misses"]}' for row in caches]
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,190 @@
+# ระยะทาง/เส้นทางถนนจริงจาก OSRM
+import functools
+import json
+import os
+import sqlite3
+import time
+from contextlib import closing
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import numpy as np
+import requests
+from requests.adapters import HTTPAdapter
+
+from .caching import LRUCache, CACHE_DB_FILE
+from .costing import MINS_PER_KM
+from .distance import build_distance_matrix
+from .metrics import timed, register_cache
+
+# 5. ฟังก์ชัน OSRM
+# - ใช้ requests.Session ตัวเดียว (connection pool) พร้อม timeout
+# - แคชเส้นทางตาม server + พิกัดที่ปัดทศนิยม: LRU ในหน่วยความจำ + ตาราง osrm_routes ใน SQLite
+#   (key = "<base_url>|<lon,lat;lon,lat>" เปลี่ยน server แล้วจะไม่ได้เส้นทางของ server เดิม)
+# - เปลี่ยน server ได้ด้วยตัวแปรแวดล้อม OSRM_BASE_URL หรือ set_osrm_base_url (เช่น OSRM ในเครื่อง / mock server)
+OSRM_BASE_URL = os.environ.get("OSRM_BASE_URL", "http://router.project-osrm.org")
+OSRM_TIMEOUT = 15
+OSRM_COORD_DECIMALS = 5
+OSRM_LRU_SIZE = 1024
+OSRM_WORKERS = 8
+OSRM_TABLE_MAX_COORDS = 100     # จำนวนพิกัดสูงสุดต่อการเรียก /table หนึ่งครั้ง (ข้อจำกัดของ server สาธารณะ)
+OSRM_MAX_LEG_GEOMETRIES = 200   # เส้นทางที่ยาวกว่านี้จะไม่ดึงเส้นถนนรายช่วงมาวาด
+# ตาราง /table ในหน่วยความจำ: ไม่เกิน 8 ชุด และรวมไม่เกิน 256 MB (3,000 จุด ใช้ชุดละ ~144 MB)
+# ตารางที่ถูกไล่ออกจะดึงใหม่ ส่วนเส้นทางรายช่วงยังอยู่ในแคช SQLite
+OSRM_TABLE_CACHE_SIZE = 8
+OSRM_TABLE_CACHE_BYTES = 256 * 1024 * 1024
+# server สาธารณะรับงานได้จำกัด: ไฟล์ที่มีจุดเกินนี้ใช้ระยะเส้นตรงแทน (ไม่ยิง /table ทีละหลายร้อยบล็อก)
+# ใช้ OSRM ของตัวเอง (OSRM_BASE_URL) ถ้าต้องการระยะถนนจริงของไฟล์ใหญ่
+OSRM_PUBLIC_HOST = "router.project-osrm.org"
+OSRM_PUBLIC_MAX_STOPS = int(os.environ.get("OSRM_PUBLIC_MAX_STOPS", 300))
+
+@functools.cache
+def _osrm_state():
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=OSRM_WORKERS, pool_maxsize=OSRM_WORKERS)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return {'session': session, 'base_url': OSRM_BASE_URL,
+            'routes': LRUCache(OSRM_LRU_SIZE), 'tables': _table_cache()}
+
+def _table_cache():
+    return LRUCache(OSRM_TABLE_CACHE_SIZE, max_bytes=OSRM_TABLE_CACHE_BYTES,
+                    sizeof=lambda tables: sum(m.nbytes for m in tables))
+
+register_cache("osrm.routes (LRU)", lambda: (_osrm_state()['routes'].hits, _osrm_state()['routes'].misses))
+register_cache("osrm.tables (LRU)", lambda: (_osrm_state()['tables'].hits, _osrm_state()['tables'].misses))
+
+def set_osrm_base_url(base_url):
+    _osrm_state()['base_url'] = base_url.rstrip("/")
+
+# จำนวนจุดสูงสุดที่ขอ /table ได้ (None = ไม่จำกัด)
+def osrm_table_limit():
+    return OSRM_PUBLIC_MAX_STOPS if OSRM_PUBLIC_HOST in _osrm_state()['base_url'] else None
+
+def _osrm_coord_key(coord):
+    return f"{round(float(coord[1]), OSRM_COORD_DECIMALS)},{round(float(coord[0]), OSRM_COORD_DECIMALS)}"
+
+def _osrm_disk_connect():
+    conn = sqlite3.connect(CACHE_DB_FILE, timeout=30)
+    conn.execute("CREATE TABLE IF NOT EXISTS osrm_routes ("
+                 "key TEXT PRIMARY KEY, geometry TEXT, km REAL, mins REAL, created REAL)")
+    return conn
+
+@timed("osrm.route_fetch")
+def _fetch_osrm_route(base_url, coords_path):
+    state = _osrm_state()
+    url = f"{base_url}/route/v1/driving/{coords_path}?overview=full&geometries=geojson"
+    r = state['session'].get(url, timeout=OSRM_TIMEOUT)
+    res = r.json()
+    routes = res['routes'][0]
+    return routes['geometry'], routes['distance']/1000, routes['duration']/60
+
+# ดึงหลายช่วงพร้อมกัน: เช็ค LRU -> SQLite -> ยิง request ที่เหลือแบบขนาน คืนผลตามลำดับ pairs
+# ช่วงที่ดึงไม่สำเร็จจะได้ (None, 0, 0) เหมือน get_osrm_route เดิม
+@timed("osrm.routes")
+def get_osrm_routes(pairs, max_workers=OSRM_WORKERS):
+    state = _osrm_state()
+    base_url = state['base_url']
+    keys = [f"{base_url}|{_osrm_coord_key(a)};{_osrm_coord_key(b)}" for a, b in pairs]
+    results = {}
+    for key in set(keys):
+        cached = state['routes'].get(key)
+        if cached is not None:
+            results[key] = cached
+
+    pending = [key for key in set(keys) if key not in results]
+    if pending:
+        with closing(_osrm_disk_connect()) as conn:
+            for start in range(0, len(pending), 500):
+                chunk = pending[start:start + 500]
+                rows = conn.execute(
+                    f"SELECT key, geometry, km, mins FROM osrm_routes WHERE key IN ({','.join('?' * len(chunk))})", chunk
+                ).fetchall()
+                for key, geometry, km, mins in rows:
+                    results[key] = (json.loads(geometry), km, mins)
+                    state['routes'].put(key, results[key])
+
+    fetched = {}
+    pending = [key for key in pending if key not in results]
+    if pending:
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            futures = {pool.submit(_fetch_osrm_route, base_url, key.split("|", 1)[1]): key for key in pending}
+            for future in as_completed(futures):
+                key = futures[future]
+                try:
+                    fetched[key] = future.result()
+                    state['routes'].put(key, fetched[key])
+                except:
+                    results[key] = (None, 0, 0)
+        if fetched:
+            now = time.time()
+            with closing(_osrm_disk_connect()) as conn, conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO osrm_routes (key, geometry, km, mins, created) VALUES (?, ?, ?, ?, ?)",
+                    [(key, json.dumps(g), km, mins, now) for key, (g, km, mins) in fetched.items()]
+                )
+    results.update(fetched)
+    return [results[key] for key in keys]
+
+def get_osrm_route(coord1, coord2):
+    return get_osrm_routes([(coord1, coord2)])[0]
+
+# 5.1 ตารางระยะทาง/เวลาถนนจริง N x N จาก OSRM /table
+# ถ้า N ไม่เกิน OSRM_TABLE_MAX_COORDS ใช้การเรียกครั้งเดียว ถ้าเกินจะแบ่งเป็นบล็อก (sources x destinations) แล้วยิงพร้อมกัน
+# คืน (km_matrix, mins_matrix) หรือ (None, None) ถ้าเรียกไม่สำเร็จหรือจุดเกิน osrm_table_limit()
+# บล็อกแรกที่ล้มเหลวจะยกเลิกบล็อกที่ยังไม่เริ่มทันที ช่องที่ไปไม่ถึงจะใช้ระยะเส้นตรง x 1.4
+# และเวลา km x MINS_PER_KM (ค่าเดียวกับที่ costing ใช้ประเมินเวลาขับ)
+@timed("osrm.table_fetch")
+def _fetch_osrm_table(coord_keys, sources, destinations):
+    state = _osrm_state()
+    url = (f"{state['base_url']}/table/v1/driving/{';'.join(coord_keys)}?annotations=distance,duration"
+           f"&sources={';'.join(map(str, sources))}&destinations={';'.join(map(str, destinations))}")
+    res = state['session'].get(url, timeout=OSRM_TIMEOUT * 2).json()
+    if res.get('code') != 'Ok':
+        raise ValueError(res.get('message', res.get('code')))
+    return (np.array(res['distances'], dtype=np.float64) / 1000,
+            np.array(res['durations'], dtype=np.float64) / 60)
+
+@timed("osrm.table")
+def get_osrm_table(coords, max_workers=OSRM_WORKERS):
+    state = _osrm_state()
+    coord_keys = [_osrm_coord_key(c) for c in coords]
+    cache_key = (state['base_url'], tuple(coord_keys))
+    cached = state['tables'].get(cache_key)
+    if cached is not None:
+        return cached
+
+    n = len(coord_keys)
+    limit = osrm_table_limit()
+    if limit is not None and n > limit:
+        return None, None
+    block = max(OSRM_TABLE_MAX_COORDS // 2, 1) if n > OSRM_TABLE_MAX_COORDS else n
+    blocks = [list(range(start, min(start + block, n))) for start in range(0, n, block)]
+    km_matrix = np.full((n, n), np.nan)
+    mins_matrix = np.full((n, n), np.nan)
+
+    def fetch_block(src, dst):
+        src_set = set(src)
+        idx = src + [j for j in dst if j not in src_set]
+        local = {j: pos for pos, j in enumerate(idx)}
+        return src, dst, _fetch_osrm_table([coord_keys[j] for j in idx],
+                                           [local[j] for j in src], [local[j] for j in dst])
+    pool = ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        futures = [pool.submit(fetch_block, src, dst) for src in blocks for dst in blocks]
+        for future in as_completed(futures):
+            src, dst, (km_block, mins_block) = future.result()
+            km_matrix[np.ix_(src, dst)] = km_block
+            mins_matrix[np.ix_(src, dst)] = mins_block
+    except:
+        pool.shutdown(wait=False, cancel_futures=True)
+        return None, None
+    pool.shutdown()
+
+    unreachable = np.isnan(km_matrix) | np.isnan(mins_matrix)
+    if unreachable.any():
+        coords_arr = np.asarray(coords, dtype=np.float64)
+        fallback = build_distance_matrix(coords_arr[:, 0], coords_arr[:, 1], dtype=np.float64)
+        km_matrix[unreachable] = fallback[unreachable]
+        mins_matrix[unreachable] = fallback[unreachable] * MINS_PER_KM
+    state['tables'].put(cache_key, (km_matrix, mins_matrix))
+    return km_matrix, mins_matrix
@@ -0,0 +1,168 @@
+# วางแผนเส้นทางจากไฟล์: รวมจัดเส้นทาง ต้นทุน และลิงก์นำทางเป็นผลลัพธ์เดียว
+import functools
+import hashlib
+import json
+
+import numpy as np
+import pandas as pd
+
+from .caching import LRUCache
+from .costing import DEFAULT_DEPARTURE, MINS_PER_KM, route_costing
+from .distance import calculate_distance
+from .ingest import UPLOAD_COLUMNS
+from .metrics import timed, register_cache
+from .osrm import OSRM_MAX_LEG_GEOMETRIES, get_osrm_route, get_osrm_routes
+from .routing import INCREMENTAL_BUDGET, solve_route, route_changes, update_route, solve_cvrp_from_df, create_gmaps_link
+
+# 9. วางแผนเส้นทางจากไฟล์ (จัดเส้นทาง + ต้นทุน + ลิงก์ Google Maps) พร้อมแคชผลลัพธ์
+# ผลลัพธ์ใช้ร่วมกันทุก session/ผู้ใช้ในโปรเซสเดียวกัน คีย์ = hash ของชุดจุด + จุดเริ่มต้น + ค่าตั้งทั้งหมด
+SOLVE_CACHE_SIZE = 32
+SOLVE_CACHE_TTL = 6 * 3600   # วินาที
+
+@functools.cache
+def _solve_cache():
+    return LRUCache(SOLVE_CACHE_SIZE, ttl=SOLVE_CACHE_TTL)
+
+register_cache("solve results (LRU)", lambda: (_solve_cache().hits, _solve_cache().misses))
+
+def solve_cache_stats():
+    cache = _solve_cache()
+    return {'hits': cache.hits, 'misses': cache.misses, 'size': len(cache)}
+
+def solve_cache_key(df_data, depot_name, settings):
+    digest = hashlib.sha256()
+    columns = [col for col in UPLOAD_COLUMNS if col in df_data.columns]
+    digest.update(json.dumps(columns).encode('utf-8'))
+    digest.update(pd.util.hash_pandas_object(df_data[columns], index=False).to_numpy().tobytes())
+    digest.update(json.dumps([depot_name, settings], sort_keys=True, ensure_ascii=False, default=str).encode('utf-8'))
+    return digest.hexdigest()
+
+# ผลของรถคันเดียว (ใช้ทั้งจัดใหม่และปรับจากผลเดิม) เก็บ solved (tour + ตารางระยะทาง) ไว้ใน 'solved'
+# เพื่อใช้ปรับเส้นทางรอบถัดไป เฉพาะเส้นทางที่ไม่เกิน INCREMENTAL_MAX_STOPS จุด (ตารางใหญ่กินหน่วยความจำ)
+INCREMENTAL_MAX_STOPS = 5000
+
+def _single_route_result(solved, settings):
+    fuel_price, toll_fee, traffic = settings['fuel_price'], settings['toll_fee'], settings['traffic']
+    departure = settings.get('departure', DEFAULT_DEPARTURE)
+    route, km, loc_dict = solved['route'], solved['km'], solved['locs']
+
+    paths = None
+    if solved['distance_source'] == "osrm" and len(route) - 1 <= OSRM_MAX_LEG_GEOMETRIES:
+        legs = [(loc_dict[a], loc_dict[b]) for a, b in zip(route[:-1], route[1:])]
+        paths = [leg[0] for leg in get_osrm_routes(legs)]
+
+    # เวลาขับรายช่วงจากตารางเวลา OSRM (ถ้าใช้ถนนจริง) ไม่เช่นนั้นประเมินจากระยะทาง
+    order = np.asarray(solved['order'])
+    leg_km = solved['matrix'][order[:-1], order[1:]].astype(np.float64)
+    leg_mins = solved['durations'][order[:-1], order[1:]] if solved['durations'] is not None else leg_km * MINS_PER_KM
+    costing = route_costing(route, leg_km, leg_mins, settings['car_type'], fuel_price, toll_fee, traffic, departure)
+
+    return {
+        'route': route, 'km': km, 'cost': costing['cost'], 'locs': loc_dict,
+        'gmaps': create_gmaps_link(route, loc_dict), 'base_price': costing['base_price'],
+        'surcharge': costing['surcharge'], 'time': costing['time'], 'etas': costing['etas'],
+        'legs': pd.DataFrame(costing['legs']), 'initial_km': solved['initial_km'], 'stats': solved['stats'],
+        'paths': paths, 'osrm_fallback': settings['road_distances'] and solved['distance_source'] != "osrm",
+        'history_route': " -> ".join(route), 'history_gmaps': create_gmaps_link(route, loc_dict),
+        'history_etas': " -> ".join(costing['etas']), 'settings': settings,
+        'solved': solved if len(loc_dict) <= INCREMENTAL_MAX_STOPS else None,
+    }
+
+# settings['departure'] = เวลาออกจากคลัง "HH:MM" ใช้หา ETA ของแต่ละจุดตามโปรไฟล์จราจร settings['traffic']
+@timed("plan.file_routes")
+def plan_file_routes(df_data, depot_name, settings):
+    if settings['mode'] == "single":
+        solved = solve_route(depot_name, df_data, settings['improve_methods'], settings['time_budget'],
+                             settings['road_distances'])
+        return _single_route_result(solved, settings)
+
+    fuel_price, toll_fee, traffic = settings['fuel_price'], settings['toll_fee'], settings['traffic']
+    departure = settings.get('departure', DEFAULT_DEPARTURE)
+
+    vehicles, loc_dict = solve_cvrp_from_df(depot_name, df_data, settings['fleet'],
+                                            settings['improve_methods'], settings['time_budget'])
+    for v_no, v in enumerate(vehicles):
+        costing = route_costing(v['route'], v['leg_km'], v['leg_km'] * MINS_PER_KM, v['vehicle'],
+                                fuel_price, toll_fee, traffic, departure)
+        v.update(base_price=costing['base_price'], surcharge=costing['surcharge'], cost=costing['cost'],
+                 time=costing['time'], etas=costing['etas'], gmaps=create_gmaps_link(v['route'], loc_dict))
+        v['legs'] = pd.DataFrame({'Vehicle': v_no + 1, **costing['legs']})
+
+    return {
+        'route': [depot_name], 'km': sum(v['km'] for v in vehicles), 'cost': sum(v['cost'] for v in vehicles),
+        'locs': loc_dict,
+        'base_price': sum(v['base_price'] for v in vehicles),
+        'surcharge': sum(v['surcharge'] for v in vehicles),
+        'time': max(v['time'] for v in vehicles) if vehicles else 0,
+        'legs': pd.concat([v['legs'] for v in vehicles], ignore_index=True) if vehicles else pd.DataFrame(),
+        'vehicles': vehicles, 'stats': [],
+        'history_route': " || ".join(" -> ".join(v['route']) for v in vehicles),
+        'history_gmaps': " || ".join(v['gmaps'] for v in vehicles),
+        'history_etas': " || ".join(" -> ".join(v['etas']) for v in vehicles),
+    }
+
+# 9.1 เช็คราคาจุดต่อจุด (หน้า "ค้นหา/ระบุพิกัด") ใช้โมเดลเวลา/ต้นทุนรายช่วงชุดเดียวกับการจัดเส้นทางจากไฟล์
+# ถ้าเรียก OSRM ไม่ได้ ใช้ระยะเส้นตรง x 1.4 และเวลา km x MINS_PER_KM แทน
+@timed("plan.quote_trip")
+def quote_trip(start, end, car_type, traffic, fuel_price, toll_fee, departure=DEFAULT_DEPARTURE):
+    path, km, mins = get_osrm_route(start, end)
+    fallback = path is None
+    if fallback:
+        km = calculate_distance(start[0], start[1], end[0], end[1])
+        mins = km * MINS_PER_KM
+    costing = route_costing(["start", "end"], [km], [mins], car_type, fuel_price, toll_fee, traffic, departure)
+    return {
+        'km': km, 'mins': costing['time'], 'cost': costing['cost'], 'path': path, 'osrm_fallback': fallback,
+        'base_price': costing['base_price'], 'surcharge': costing['surcharge'], 'etas': costing['etas'],
+    }
+
+# คืน (ผลลัพธ์, ได้จากแคชหรือไม่) แคชเก็บผลโดยไม่มี 'solved' (ตารางระยะทาง) ผลจากแคชจึงปรับต่อแบบ incremental ไม่ได้
+# ผลที่ต้องใช้ระยะเส้นตรงแทน OSRM ไม่เข้าแคช ครั้งถัดไปจะลองเรียก OSRM ใหม่
+def plan_file_routes_cached(df_data, depot_name, settings):
+    cache = _solve_cache()
+    key = solve_cache_key(df_data, depot_name, settings)
+    res = cache.get(key)
+    if res is not None:
+        return res, True
+    res = plan_file_routes(df_data, depot_name, settings)
+    res['key'] = key
+    if not res.get('osrm_fallback'):
+        cache.put(key, {k: v for k, v in res.items() if k != 'solved'})
+    return res, False
+
+# 9.2 ปรับผลเดิม (รถคันเดียว) เมื่อไฟล์มีจุดเพิ่ม/ยกเลิก: ใช้ update_route แทนการจัดใหม่ทั้งหมด
+# ใช้ได้เมื่อผลเดิมมี 'solved', จุดเริ่มต้นเดิม, ค่าตั้งระยะทางถนนจริง/วิธีปรับปรุง/เวลาปรับปรุงเหมือนเดิม,
+# มาจากไฟล์เดียวกัน (ถ้าส่ง source)
+# และจุดที่เพิ่ม+ยกเลิกไม่เกิน INCREMENTAL_MAX_CHANGE ของจำนวนจุดส่งเดิม (ไฟล์ที่ต่างกันมากจัดใหม่ได้ผลดีกว่าและเร็วกว่า)
+# ไม่เช่นนั้นคืน None ให้ผู้เรียกจัดใหม่
+# ผลใหม่เป็นของ session นั้นเท่านั้น (ไม่เข้าแคชที่ใช้ร่วมกัน) และผลเดิมใช้ต่อไม่ได้หลังเรียก
+INCREMENTAL_MAX_CHANGE = 0.2
+
+def can_replan(previous, df_data, depot_name, settings, source=None):
+    solved = previous.get('solved') if previous else None
+    if (solved is None or settings['mode'] != "single" or previous['route'][0] != depot_name
+            or any(previous['settings'][name] != settings[name]
+                   for name in ('road_distances', 'improve_methods', 'time_budget'))
+            or (source is not None and previous.get('source') != source)):
+        return False
+    _, added, removed = route_changes(solved, df_data)
+    return len(added) + len(removed) <= INCREMENTAL_MAX_CHANGE * max(len(solved['locs']) - 1, 1)
+
+# คีย์ของผลที่ปรับจากผลเดิม (ใช้กับแคชแผนที่): hash ของลำดับจุด พิกัด และค่าตั้ง
+def _replan_key(route, loc_dict, settings):
+    payload = ["replan", route, [loc_dict[name] for name in route], settings]
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str).encode('utf-8')).hexdigest()
+
+@timed("plan.replan_file_routes")
+def replan_file_routes(previous, df_data, depot_name, settings, source=None):
+    if not can_replan(previous, df_data, depot_name, settings, source):
+        return None
+    try:
+        solved = update_route(previous['solved'], df_data, settings['improve_methods'],
+                              min(settings['time_budget'], INCREMENTAL_BUDGET))
+    except ValueError:
+        return None
+    res = _single_route_result(solved, settings)
+    res['changes'] = solved['changes']
+    res['key'] = _replan_key(res['route'], res['locs'], settings)
+    return res
@@ -0,0 +1,517 @@
+# จัดเส้นทาง: รถคันเดียว (Nearest Neighbour + 2-opt / Or-opt) และหลายคัน (CVRP)
+import time
+
+import numpy as np
+import pandas as pd
+
+from .costing import MINS_PER_KM
+from .distance import build_distance_matrix, haversine_pairs, build_grid_index, grid_nearest_neighbours
+from .metrics import timed
+from .osrm import get_osrm_table
+
+# 3. ฟังก์ชัน VRP (จัดเส้นทาง)
+# 3.1 Nearest Neighbour บนตารางระยะทาง: คืนลำดับ index แบบวนกลับจุดเริ่ม และระยะทางรวม
+def nearest_neighbour_tour(dist_matrix, start_idx):
+    n = dist_matrix.shape[0]
+    visited = np.zeros(n, dtype=bool)
+    visited[start_idx] = True
+    order = [start_idx]
+    current = start_idx
+    total_dist = 0.0
+
+    for _ in range(n - 1):
+        row = np.where(visited, np.inf, dist_matrix[current])
+        nearest = int(np.argmin(row))
+        total_dist += float(row[nearest])
+        visited[nearest] = True
+        order.append(nearest)
+        current = nearest
+
+    total_dist += float(dist_matrix[current, start_idx])
+    order.append(start_idx)
+    return order, total_dist
+
+# 3.2 ปรับปรุงเส้นทาง (Local Search) ต่อจาก Nearest Neighbour
+# ทั้ง 2 แบบพิจารณาเฉพาะ "จุดใกล้เคียง" ของแต่ละจุด (Neighbour List) แทนการลองทุกคู่
+# และแก้ไข tour (list ของ index ที่ขึ้นต้น/ลงท้ายด้วยจุดเริ่ม) ในที่ คืนจำนวนครั้งที่ปรับได้
+IMPROVE_NEIGHBOURS = 10     # จำนวนจุดใกล้เคียงที่ใช้ลองสลับ
+IMPROVE_TIME_BUDGET = 2.0   # เวลาสูงสุดของขั้นปรับปรุง (วินาที)
+IMPROVE_EPS = 1e-9
+IMPROVE_CHUNK_ROWS = 256    # หาจุดใกล้เคียงทีละกี่แถว (หน่วยความจำชั่วคราว ~ แถว x N แทน N x N)
+
+def build_neighbour_lists(dist_matrix, k=IMPROVE_NEIGHBOURS):
+    n = dist_matrix.shape[0]
+    k = min(k, n - 1)
+    if k <= 0:
+        return np.empty((n, 0), dtype=np.int64)
+    neighbours = np.empty((n, k), dtype=np.int64)
+    for start in range(0, n, IMPROVE_CHUNK_ROWS):
+        stop = min(start + IMPROVE_CHUNK_ROWS, n)
+        rows = np.arange(stop - start)[:, None]
+        masked = dist_matrix[start:stop].copy()
+        masked[rows[:, 0], np.arange(start, stop)] = np.inf
+        nearest = np.argpartition(masked, k - 1, axis=1)[:, :k]
+        order = np.argsort(masked[rows, nearest], axis=1)
+        neighbours[start:stop] = nearest[rows, order]
+    return neighbours
+
+def tour_length(tour, dist_matrix):
+    idx = np.asarray(tour)
+    return float(dist_matrix[idx[:-1], idx[1:]].sum())
+
+def _tour_positions(tour, n):
+    pos = np.empty(n, dtype=np.int64)
+    pos[np.asarray(tour[:-1])] = np.arange(len(tour) - 1)
+    return pos
+
+# 2-opt: ตัดเส้น (a,b) กับ (c,d) แล้วต่อใหม่เป็น (a,c) กับ (b,d) โดยกลับทิศช่วงตรงกลาง
+# สำหรับจุด x และจุดใกล้เคียง y ลองทั้งแบบตัดเส้นที่ออกจาก x, y (ได้เส้นใหม่ x-y และ succ-succ)
+# และแบบตัดเส้นที่เข้า x, y (ได้เส้นใหม่ pred-pred และ x-y) เส้นที่เข้าจุดเริ่มคือเส้นสุดท้ายของ tour
+def two_opt_pass(tour, dist_matrix, neighbours, deadline):
+    d = dist_matrix
+    n_edges = len(tour) - 1
+    pos = _tour_positions(tour, d.shape[0])
+    moves = 0
+    for i in range(n_edges):
+        if time.perf_counter() > deadline:
+            break
+        for c in neighbours[tour[i]]:
+            j = int(pos[c])
+            improved = False
+            for e1, e2 in ((i, j), ((i - 1) % n_edges, (j - 1) % n_edges)):
+                lo, hi = min(e1, e2), max(e1, e2)
+                if hi - lo < 2:
+                    continue
+                a, b = tour[lo], tour[lo + 1]
+                c_, d_ = tour[hi], tour[hi + 1]
+                delta = d[a, c_] + d[b, d_] - d[a, b] - d[c_, d_]
+                if delta < -IMPROVE_EPS:
+                    tour[lo + 1:hi + 1] = tour[lo + 1:hi + 1][::-1]
+                    pos[np.asarray(tour[lo + 1:hi + 1])] = np.arange(lo + 1, hi + 1)
+                    moves += 1
+                    improved = True
+                    break
+            if improved:
+                break
+    return moves
+
+# Or-opt: ย้ายช่วงจุดต่อกัน 1-3 จุด ไปแทรกระหว่างจุดใกล้เคียง (ลองทั้งทิศเดิมและกลับทิศ)
+def or_opt_pass(tour, dist_matrix, neighbours, deadline, max_segment=3):
+    d = dist_matrix
+    pos = _tour_positions(tour, d.shape[0])
+    moves = 0
+    for seg_len in range(1, max_segment + 1):
+        i = 1
+        while i + seg_len < len(tour):
+            if time.perf_counter() > deadline:
+                return moves
+            prev, first = tour[i - 1], tour[i]
+            last, nxt = tour[i + seg_len - 1], tour[i + seg_len]
+            removal_gain = d[prev, first] + d[last, nxt] - d[prev, nxt]
+
+            best = None
+            for c in neighbours[first]:
+                j = int(pos[c])
+                if i - 1 <= j <= i + seg_len - 1:
+                    continue
+                p, q = tour[j], tour[j + 1]
+                forward = d[p, first] + d[last, q] - d[p, q]
+                backward = d[p, last] + d[first, q] - d[p, q]
+                cost, reverse = (forward, False) if forward <= backward else (backward, True)
+                if cost - removal_gain < -IMPROVE_EPS and (best is None or cost < best[0]):
+                    best = (cost, j, reverse)
+
+            if best is None:
+                i += 1
+                continue
+
+            _, j, reverse = best
+            segment = tour[i:i + seg_len]
+            if reverse:
+                segment = segment[::-1]
+            rest = tour[:i] + tour[i + seg_len:]
+            insert_at = j + 1 if j < i else j + 1 - seg_len
+            tour[:] = rest[:insert_at] + segment + rest[insert_at:]
+            pos = _tour_positions(tour, d.shape[0])
+            moves += 1
+    return moves
+
+ROUTE_IMPROVERS = {
+    "2-opt": two_opt_pass,
+    "Or-opt": or_opt_pass,
+}
+
+# วนปรับปรุงจนไม่มีการปรับได้อีก หมดเวลา หรือครบ max_iterations รอบ คืน (tour, ระยะทาง, สถิติรายรอบ)
+# time_budget=math.inf + max_iterations ให้ผลเหมือนกันทุกเครื่อง (ไม่ขึ้นกับความเร็วเครื่อง)
+def improve_route(tour, dist_matrix, methods=("2-opt", "Or-opt"),
+                  time_budget=IMPROVE_TIME_BUDGET, neighbours=IMPROVE_NEIGHBOURS, max_iterations=None):
+    tour = list(tour)
+    started = time.perf_counter()
+    deadline = started + time_budget
+    neighbour_lists = build_neighbour_lists(dist_matrix, neighbours)
+    stats = []
+    iteration = 0
+
+    while time.perf_counter() < deadline and (max_iterations is None or iteration < max_iterations):
+        iteration += 1
+        total_moves = 0
+        for method in methods:
+            moves = ROUTE_IMPROVERS[method](tour, dist_matrix, neighbour_lists, deadline)
+            total_moves += moves
+            stats.append({
+                "iteration": iteration,
+                "method": method,
+                "moves": moves,
+                "distance_km": tour_length(tour, dist_matrix),
+                "elapsed_s": time.perf_counter() - started,
+            })
+        if total_moves == 0:
+            break
+
+    return tour, tour_length(tour, dist_matrix), stats
+
+# 3.3 ฟังก์ชันจัดเส้นทางหลัก: Nearest Neighbour + ขั้นปรับปรุง (ถ้าเลือก)
+# road_distances=True จะใช้ตารางระยะทางถนนจริงจาก OSRM /table (ถ้าเรียกไม่ได้จะกลับไปใช้เส้นตรง x 1.4)
+# ตารางถนนจริงไม่สมมาตร ขั้นปรับปรุงจึงใช้ค่าเฉลี่ยสองทิศ แต่รายงานระยะทางตามทิศที่วิ่งจริง
+@timed("solve.route")
+def solve_route(depot_name, df_data, improve_methods=(), time_budget=IMPROVE_TIME_BUDGET, road_distances=False):
+    locations = {}
+    for name, lat, lon in zip(df_data['Location'], df_data['Latitude'], df_data['Longitude']):
+        locations[name] = [lat, lon]
+
+    names = list(locations.keys())
+    coords = np.array([locations[name] for name in names], dtype=np.float64)
+    dist_matrix, durations = None, None
+    if road_distances:
+        dist_matrix, durations = get_osrm_table(coords)
+    distance_source = "osrm" if dist_matrix is not None else "haversine"
+    if dist_matrix is None:
+        dist_matrix = build_distance_matrix(coords[:, 0], coords[:, 1])
+
+    order, total_dist = nearest_neighbour_tour(dist_matrix, names.index(depot_name))
+    initial_dist = total_dist
+    stats = []
+    if improve_methods and len(order) > 4:
+        opt_matrix = dist_matrix if distance_source == "haversine" else (dist_matrix + dist_matrix.T) / 2
+        order, total_dist, stats = improve_route(order, opt_matrix, improve_methods, time_budget)
+        total_dist = tour_length(order, dist_matrix)
+
+    return {
+        'route': [names[i] for i in order], 'km': total_dist, 'locs': locations,
+        'names': names, 'order': order, 'matrix': dist_matrix, 'durations': durations,
+        'distance_source': distance_source, 'initial_km': initial_dist, 'stats': stats,
+    }
+
+def solve_vrp_from_df(depot_name, df_data, improve_methods=(), time_budget=IMPROVE_TIME_BUDGET):
+    result = solve_route(depot_name, df_data, improve_methods, time_budget)
+    return result['route'], result['km'], result['locs']
+
+# 3.5 ปรับเส้นทางเดิมเมื่อมีจุดเพิ่ม/ยกเลิก (Incremental) แทนการจัดใหม่ทั้งหมด
+# - ใช้ tour และตารางระยะทางจากผลเดิม (ผลของ solve_route หรือ update_route)
+# - จุดที่ยกเลิก: ตัดออกจาก tour แถวในตารางยังอยู่แต่ไม่ใช้ (inactive) และถูกนำกลับมาใช้กับจุดใหม่
+# - จุดใหม่: คำนวณเฉพาะแถว/คอลัมน์ของจุดนั้น แล้วแทรกในตำแหน่งที่เพิ่มระยะทางน้อยที่สุด (Cheapest Insertion)
+# - ปรับปรุงด้วย 2-opt / Or-opt เฉพาะช่วงรอบจุดที่เปลี่ยน (ไม่สร้าง Neighbour List ทั้งตาราง)
+# - ตารางระยะทางจองที่ว่างเผื่อไว้ (INCREMENTAL_SLACK) ผลลัพธ์เป็นเจ้าของตารางและแก้ในที่ได้ในรอบถัดไป
+#   ผลเดิมที่ส่งเข้ามาจึงไม่ควรใช้ต่อหลังเรียก update_route (ยกเว้นผลจาก solve_route ซึ่งจะถูกคัดลอกก่อน)
+# - ถ้าผลเดิมใช้ระยะทางถนนจริง จุดใหม่ใช้ระยะเส้นตรง x 1.4 และเวลา km x 0.85 แทน
+INCREMENTAL_SLACK = 64      # จำนวนช่องว่างสำรองในตารางระยะทาง
+INCREMENTAL_WINDOW = 25     # จำนวนจุดก่อน/หลังจุดที่เปลี่ยน ที่นำไปปรับปรุงซ้ำ
+INCREMENTAL_BUDGET = 0.5    # เวลาปรับปรุงสูงสุด (วินาที)
+
+def _grow_buffer(buffer, used, capacity):
+    grown = np.empty((capacity, capacity), dtype=buffer.dtype)
+    grown[:used, :used] = buffer[:used, :used]
+    return grown
+
+def _cheapest_insertion(tour, dist_matrix, node):
+    idx = np.asarray(tour)
+    delta = dist_matrix[idx[:-1], node] + dist_matrix[node, idx[1:]] - dist_matrix[idx[:-1], idx[1:]]
+    best = int(np.argmin(delta))
+    tour.insert(best + 1, node)
+
+# ปรับปรุงเฉพาะช่วง tour[start:end+1] โดยตรึงจุดหัว/ท้ายช่วงไว้
+# ปิดช่วงเป็นวงด้วยเส้นเชื่อมหัว-ท้ายที่ติดลบมาก ๆ ทำให้ 2-opt / Or-opt ไม่ตัดเส้นนี้ และหัว/ท้ายไม่ถูกย้าย
+# (ตำแหน่ง 0 ไม่เคยถูกย้าย ผลจึงเริ่มที่ 0 เสมอ ถ้าเส้นเชื่อมถูกกลับมาอยู่ต้น tour ให้กลับทิศช่วงที่เหลือ)
+def _improve_segment(tour, dist_matrix, start, end, methods, time_budget, symmetrize=False):
+    seg = tour[start:end + 1]
+    if len(seg) < 5:
+        return []
+    sub = dist_matrix[np.ix_(seg, seg)].astype(np.float64)
+    if symmetrize:
+        sub = (sub + sub.T) / 2
+    anchor = -(float(sub.max()) + 1.0) * len(seg)
+    sub[-1, 0] = sub[0, -1] = anchor
+    local, _, stats = improve_route(list(range(len(seg))) + [0], sub, methods, time_budget)
+    local = local[:-1]
+    if local[1] == len(seg) - 1:
+        local = [0] + local[1:][::-1]
+    tour[start:end + 1] = [seg[i] for i in local]
+    return stats
+
+# จุดที่เพิ่ม/ยกเลิกเทียบกับผลเดิม (จุดที่พิกัดเปลี่ยนนับเป็นทั้งยกเลิกและเพิ่ม) คืน (locations, added, removed)
+def route_changes(previous, df_data):
+    locations = {}
+    for name, lat, lon in zip(df_data['Location'], df_data['Latitude'], df_data['Longitude']):
+        locations[name] = [lat, lon]
+    old_locs = previous['locs']
+    removed = [name for name in old_locs if name not in locations or locations[name] != old_locs[name]]
+    added = [name for name in locations if name not in old_locs or locations[name] != old_locs[name]]
+    return locations, added, removed
+
+@timed("solve.update_route")
+def update_route(previous, df_data, improve_methods=("2-opt", "Or-opt"), time_budget=INCREMENTAL_BUDGET):
+    locations, added, removed_names = route_changes(previous, df_data)
+
+    names = list(previous['names'])
+    slot_of = {name: i for i, name in enumerate(names)}
+    order = previous['order']
+    depot_name = names[order[0]]
+    if depot_name in removed_names:
+        raise ValueError("จุดเริ่มต้นถูกเปลี่ยน/ลบ ต้องจัดเส้นทางใหม่ทั้งหมด")
+
+    active = previous.get('active', np.ones(len(names), dtype=bool)).copy()
+    removed = [slot_of[name] for name in removed_names]
+    active[removed] = False
+
+    # ตารางระยะทาง: ผลจาก solve_route คัดลอกเข้าบัฟเฟอร์ที่มีที่ว่างเผื่อ (ครั้งเดียว) ผลจาก update_route แก้ในที่
+    used = len(names)
+    matrix, durations = previous.get('matrix_buffer'), previous.get('durations_buffer')
+    if matrix is None:
+        capacity = used + max(len(added), INCREMENTAL_SLACK)
+        matrix = _grow_buffer(previous['matrix'], used, capacity)
+        if previous['durations'] is not None:
+            durations = _grow_buffer(previous['durations'], used, capacity)
+
+    free = np.flatnonzero(~active).tolist()
+    slots = []
+    for name in added:
+        if name in slot_of and not active[slot_of[name]]:
+            slot = slot_of[name]
+            free.remove(slot)
+        elif free:
+            slot = free.pop(0)
+        else:
+            slot = used
+            used += 1
+            if used > matrix.shape[0]:
+                capacity = used + max(len(added), INCREMENTAL_SLACK, used // 2)
+                matrix = _grow_buffer(matrix, used - 1, capacity)
+                durations = _grow_buffer(durations, used - 1, capacity) if durations is not None else None
+            names.append(None)
+            active = np.append(active, False)
+        if names[slot] in slot_of and slot_of[names[slot]] == slot and names[slot] != name:
+            del slot_of[names[slot]]
+        names[slot] = name
+        slot_of[name] = slot
+        active[slot] = True
+        slots.append(slot)
+
+    # คำนวณเฉพาะแถว/คอลัมน์ของจุดใหม่ เทียบกับทุกช่องที่ใช้อยู่
+    if slots:
+        coords = np.array([locations[names[i]] if active[i] else [0.0, 0.0] for i in range(used)], dtype=np.float64)
+        new = np.asarray(slots)
+        rows = haversine_pairs(coords[new, 0, None], coords[new, 1, None], coords[None, :, 0], coords[None, :, 1])
+        matrix[new, :used] = rows
+        matrix[:used, new] = rows.T
+        if durations is not None:
+            durations[new, :used] = rows * MINS_PER_KM
+            durations[:used, new] = rows.T * MINS_PER_KM
+
+    dist_matrix = matrix[:used, :used]
+    removed_set = set(removed)
+    tour = []
+    touched = []
+    for node in order:
+        if node in removed_set:
+            if tour:
+                touched.append(tour[-1])
+            continue
+        tour.append(node)
+    for slot in slots:
+        _cheapest_insertion(tour, dist_matrix, slot)
+        touched.append(slot)
+
+    initial_km = tour_length(tour, dist_matrix)
+    stats = []
+    if improve_methods and touched and len(tour) > 4:
+        pos = _tour_positions(tour, used)
+        windows = sorted((max(int(pos[node]) - INCREMENTAL_WINDOW, 0), min(int(pos[node]) + INCREMENTAL_WINDOW, len(tour) - 1))
+                         for node in set(touched) if active[node])
+        merged = []
+        for start, end in windows:
+            if merged and start <= merged[-1][1]:
+                merged[-1][1] = max(merged[-1][1], end)
+            else:
+                merged.append([start, end])
+        for start, end in merged:
+            stats += _improve_segment(tour, dist_matrix, start, end, improve_methods, time_budget / len(merged),
+                                      symmetrize=previous['distance_source'] != "haversine")
+
+    return {
+        'route': [names[i] for i in tour], 'km': tour_length(tour, dist_matrix), 'locs': locations,
+        'names': names, 'order': tour, 'matrix': dist_matrix,
+        'durations': durations[:used, :used] if durations is not None else None,
+        'distance_source': previous['distance_source'], 'initial_km': initial_km, 'stats': stats,
+        'active': active, 'matrix_buffer': matrix, 'durations_buffer': durations,
+        'changes': {'added': added, 'removed': removed_names},
+    }
+
+# 3.4 จัดเส้นทางหลายคัน จำกัดน้ำหนักบรรทุก (Capacitated VRP)
+# ใช้ Clarke-Wright Savings เฉพาะคู่จุดใกล้เคียงจาก Grid Index (ไม่สร้างตาราง n x n)
+# แล้วปรับแต่ละเส้นทางด้วย 2-opt / Or-opt และจัดรถให้แต่ละเส้นทาง (รถเล็กสุดที่รับน้ำหนักได้)
+VEHICLE_TYPES = ["รถกระบะ 4 ล้อ", "6 ล้อ"]
+VEHICLE_CAPACITY = {"รถกระบะ 4 ล้อ": 1000.0, "6 ล้อ": 5000.0}   # น้ำหนักบรรทุกเริ่มต้น (กก.)
+CVRP_NEIGHBOURS = 15
+CVRP_IMPROVE_BUDGET = 2.0   # เวลาปรับปรุงรวมทุกเส้นทาง (วินาที)
+
+def savings_routes(depot_idx, lats, lons, demands, capacity, neighbours=CVRP_NEIGHBOURS):
+    lats = np.asarray(lats, dtype=np.float64)
+    lons = np.asarray(lons, dtype=np.float64)
+    customers = np.array([i for i in range(len(lats)) if i != depot_idx], dtype=np.int64)
+    if len(customers) == 0:
+        return []
+
+    d0 = haversine_pairs(lats[depot_idx], lons[depot_idx], lats, lons)
+    grid = build_grid_index(lats[customers], lons[customers], neighbours)
+    nearest = grid_nearest_neighbours(grid, neighbours)
+
+    # คู่ (i, j) ที่ไม่ซ้ำกันจาก Neighbour List พร้อมค่า Saving = d0i + d0j - dij
+    left = np.repeat(np.arange(len(customers)), nearest.shape[1])
+    right = nearest.ravel()
+    keep = right > left
+    i_idx, j_idx = customers[left[keep]], customers[right[keep]]
+    pair_keys = np.unique(np.stack([i_idx, j_idx], axis=1), axis=0) if len(i_idx) else np.empty((0, 2), dtype=np.int64)
+    i_idx, j_idx = pair_keys[:, 0], pair_keys[:, 1]
+    saving = d0[i_idx] + d0[j_idx] - haversine_pairs(lats[i_idx], lons[i_idx], lats[j_idx], lons[j_idx])
+    by_saving = np.argsort(-saving, kind="stable")
+
+    routes = {int(c): [int(c)] for c in customers}
+    route_of = {int(c): int(c) for c in customers}
+    load = {int(c): float(demands[c]) for c in customers}
+
+    for p in by_saving:
+        if saving[p] <= 0:
+            break
+        i, j = int(i_idx[p]), int(j_idx[p])
+        ri, rj = route_of[i], route_of[j]
+        if ri == rj or load[ri] + load[rj] > capacity:
+            continue
+        route_i, route_j = routes[ri], routes[rj]
+        if i not in (route_i[0], route_i[-1]) or j not in (route_j[0], route_j[-1]):
+            continue
+
+        # เรียงให้ i อยู่ท้ายเส้นทางแรก และ j อยู่ต้นเส้นทางที่สอง แล้วต่อกัน
+        if route_i[-1] != i:
+            route_i.reverse()
+        if route_j[0] != j:
+            route_j.reverse()
+        if len(route_i) < len(route_j):
+            route_j[:0] = route_i
+            keep_id, drop_id = rj, ri
+        else:
+            route_i.extend(route_j)
+            keep_id, drop_id = ri, rj
+        for c in routes[drop_id]:
+            route_of[c] = keep_id
+        load[keep_id] += load.pop(drop_id)
+        del routes[drop_id]
+
+    return [(route, load[rid]) for rid, route in routes.items()]
+
+# จัดรถให้เส้นทาง: เส้นทางที่หนักที่สุดได้เลือกก่อน ใช้รถเล็กสุดที่รับได้
+# เส้นทางที่ไม่มีรถคันที่เหลือรับได้ทั้งเส้น จะถูกแบ่งเป็นช่วงต่อเนื่องให้รถที่ยังว่าง (คันใหญ่สุดก่อน)
+# ถ้าส่ง demands (น้ำหนักรายจุด ตาม index) มาด้วย และติดธง extra (ต้องวิ่งเพิ่มอีกเที่ยว/รถเพิ่ม ใช้รถใหญ่สุด)
+# เฉพาะส่วนที่เหลือหลังใช้รถในกองรถครบทุกคันแล้ว
+def assign_vehicles(route_loads, fleet, demands=None):
+    available = sorted(
+        [(capacity, car_type) for car_type, count, capacity in fleet for _ in range(int(count))]
+    )
+    largest = max(fleet, key=lambda f: f[2])
+    assignments = []
+    overflow = []
+    for route, load in sorted(route_loads, key=lambda r: -r[1]):
+        chosen = next((v for v in available if v[0] >= load), None)
+        if chosen is not None:
+            available.remove(chosen)
+            assignments.append((route, load, chosen[1], chosen[0], False))
+        else:
+            overflow.append((route, load))
+
+    for route, load in overflow:
+        while route and available and demands is not None:
+            chosen = next((v for v in available if v[0] >= load), None)
+            if chosen is not None:
+                cut = len(route)
+            else:
+                chosen = available[-1]
+                cut = int(np.searchsorted(np.cumsum([demands[c] for c in route]), chosen[0], side="right"))
+                if cut == 0:   # จุดแรกหนักเกินรถทุกคันที่เหลือ
+                    break
+            available.remove(chosen)
+            part_load = float(sum(demands[c] for c in route[:cut]))
+            assignments.append((route[:cut], part_load, chosen[1], chosen[0], False))
+            route, load = route[cut:], load - part_load
+        if route:
+            assignments.append((route, load, largest[0], largest[2], True))
+    return assignments
+
+@timed("solve.cvrp")
+def solve_cvrp_from_df(depot_name, df_data, fleet, improve_methods=("2-opt", "Or-opt"),
+                       time_budget=CVRP_IMPROVE_BUDGET):
+    df_data = df_data.drop_duplicates('Location', keep='last').reset_index(drop=True)
+    names = df_data['Location'].tolist()
+    lats = df_data['Latitude'].to_numpy(dtype=np.float64)
+    lons = df_data['Longitude'].to_numpy(dtype=np.float64)
+    depot_idx = names.index(depot_name)
+
+    if 'Demand' in df_data.columns:
+        demands = pd.to_numeric(df_data['Demand'], errors='coerce').fillna(0).to_numpy(dtype=np.float64, copy=True)
+    else:
+        demands = np.zeros(len(names))
+    demands[depot_idx] = 0.0
+
+    # คอลัมน์ Capacity (ถ้ามี) ที่แถวจุดเริ่มต้น ใช้แทนน้ำหนักบรรทุกของรถทุกคัน
+    if 'Capacity' in df_data.columns:
+        depot_capacity = pd.to_numeric(df_data['Capacity'], errors='coerce').iloc[depot_idx]
+        if pd.notna(depot_capacity) and depot_capacity > 0:
+            fleet = [(car_type, count, float(depot_capacity)) for car_type, count, _ in fleet]
+
+    fleet = [f for f in fleet if f[1] > 0] or [(VEHICLE_TYPES[0], 1, VEHICLE_CAPACITY[VEHICLE_TYPES[0]])]
+    max_capacity = max(f[2] for f in fleet)
+    route_loads = savings_routes(depot_idx, lats, lons, demands, max_capacity)
+    n_customers = max(len(names) - 1, 1)
+
+    vehicles = []
+    for stops, load, car_type, capacity, extra in assign_vehicles(route_loads, fleet, demands):
+        idx = [depot_idx] + stops
+        sub_matrix = build_distance_matrix(lats[idx], lons[idx])
+        tour = list(range(len(idx))) + [0]
+        if improve_methods and len(tour) > 4:
+            tour, km, _ = improve_route(tour, sub_matrix, improve_methods, time_budget * len(stops) / n_customers)
+        else:
+            km = tour_length(tour, sub_matrix)
+        vehicles.append({
+            'vehicle': car_type, 'capacity': capacity, 'load': load, 'extra': extra,
+            'route': [names[idx[t]] for t in tour], 'km': km, 'leg_km': sub_matrix[tour[:-1], tour[1:]],
+        })
+
+    locations = {name: [lat, lon] for name, lat, lon in zip(names, lats.tolist(), lons.tolist())}
+    return vehicles, locations
+
+def create_gmaps_link(route_list, loc_dict):
+    if not route_list: return None
+    origin = loc_dict[route_list[0]]
+    origin_str = f"{origin[0]},{origin[1]}"
+    dest = loc_dict[route_list[-1]]
+    dest_str = f"{dest[0]},{dest[1]}"
+    
+    waypoints = route_list[1:-1]
+    waypoint_strs = []
+    for wp in waypoints:
+        coords = loc_dict[wp]
+        waypoint_strs.append(f"{coords[0]},{coords[1]}")
+    
+    waypoints_param = "|".join(waypoint_strs)
+    base_url = "https://www.google.com/maps/dir/?api=1"
+    full_url = f"{base_url}&origin={origin_str}&destination={dest_str}&waypoints={waypoints_param}&travelmode=driving"
+    return full_url
@@ -0,0 +1,211 @@
+# ไฟล์ประวัติคำนวณ / สถานะคนขับ (CSV ต่อท้าย) และตัวอ่านแบบเพิ่มทีละส่วน
+import csv
+import functools
+import io
+import os
+import threading
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+
+import pandas as pd
+try:
+    import fcntl
+except ImportError:  # Windows: ใช้ล็อกภายในโปรเซสอย่างเดียว
+    fcntl = None
+
+from .metrics import timed, timer
+from .sync import enqueue_sync, enqueue_sync_many
+
+# ตัวแปรเก็บไฟล์ข้อมูล
+DATA_FILE = 'saving_history.csv'
+TRACKING_FILE = 'tracking_history.csv'
+HISTORY_COLUMNS = ["Date", "Route", "Distance_KM", "Old_Cost", "New_Cost", "Saving", "Gmaps_Link", "Stop_ETAs"]
+TRACKING_COLUMNS = ["Date_Time", "Driver_Job", "Status"]
+
+# 6. ที่เก็บประวัติแบบต่อท้ายไฟล์ (Append-only CSV)
+# - เขียนเฉพาะแถวใหม่ต่อท้ายไฟล์ (O(1)) แทนการอ่านทั้งไฟล์แล้วเขียนใหม่
+# - ทุกการเขียนถือล็อกไฟล์ <ไฟล์>.lock (flock) หลาย session / หลายโปรเซสเขียนพร้อมกันได้โดยแถวไม่หาย
+# - ไฟล์เดิมที่หัวตารางไม่ตรงกับคอลัมน์ปัจจุบัน จะถูกแปลงครั้งเดียวตอนเขียนครั้งแรก
+@functools.cache
+def _history_locks():
+    return {'guard': threading.Lock(), 'paths': {}, 'migrated': set()}
+
+@contextmanager
+def history_lock(path):
+    state = _history_locks()
+    with state['guard']:
+        thread_lock = state['paths'].setdefault(path, threading.Lock())
+    with thread_lock, open(path + ".lock", "a") as lock_file:
+        if fcntl:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+def _read_header(path):
+    with open(path, encoding='utf-8-sig', newline='') as f:
+        return next(csv.reader(f), [])
+
+# แปลงไฟล์ประวัติเดิม (ที่เคยเขียนด้วย pd.to_csv ทั้งไฟล์) ให้พร้อมต่อท้าย: หัวตารางตรง + ลงท้ายด้วยขึ้นบรรทัดใหม่
+# ต้องเรียกขณะถือ history_lock อยู่
+def migrate_history_file(path, columns):
+    state = _history_locks()
+    if path in state['migrated']:
+        return
+    if os.path.exists(path) and os.path.getsize(path) > 0:
+        if _read_header(path) != columns:
+            with timer("history.rewrite"):
+                df = pd.read_csv(path).reindex(columns=columns)
+                tmp_path = path + ".tmp"
+                df.to_csv(tmp_path, index=False, encoding='utf-8-sig')
+                os.replace(tmp_path, path)
+        else:
+            with open(path, 'rb+') as f:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    f.write(b"\n")
+    state['migrated'].add(path)
+
+@timed("history.append")
+def append_history_rows(path, columns, rows):
+    buf = io.StringIO()
+    writer = csv.writer(buf, lineterminator="\n")
+    writer.writerows([[row.get(col, "") for col in columns] for row in rows])
+
+    with history_lock(path):
+        migrate_history_file(path, columns)
+        if not os.path.exists(path) or os.path.getsize(path) == 0:
+            header = io.StringIO()
+            csv.writer(header, lineterminator="\n").writerow(columns)
+            data = "\ufeff" + header.getvalue() + buf.getvalue()
+        else:
+            data = buf.getvalue()
+        with open(path, 'a', encoding='utf-8', newline='') as f:
+            f.write(data)
+
+def clear_history_file(path):
+    with history_lock(path):
+        if os.path.exists(path):
+            os.remove(path)
+
+# 6.1 อ่านประวัติแบบเพิ่มทีละส่วน (Incremental Reader)
+# จำตำแหน่งที่อ่านถึง (offset) ของแต่ละไฟล์ไว้ข้าม rerun/session แล้ว parse เฉพาะแถวที่ต่อท้ายใหม่
+# เก็บแค่ยอดรวม, แถวล่าสุดไม่กี่แถว และสถานะล่าสุดของแต่ละงาน (ไม่เก็บทั้งตาราง)
+# ถ้าไฟล์ถูกลบ/เขียนใหม่ (inode เปลี่ยน หรือไฟล์เล็กลง) จะเริ่มอ่านใหม่ตั้งแต่ต้น
+HISTORY_TAIL_ROWS = 10
+
+@functools.cache
+def _history_readers():
+    return {'lock': threading.Lock(), 'states': {}}
+
+def _empty_reader_state(columns, sum_columns):
+    return {'inode': None, 'offset': 0, 'mtime': None, 'columns': list(columns), 'rows': 0,
+            'sums': {col: 0.0 for col in sum_columns}, 'tail': deque(maxlen=HISTORY_TAIL_ROWS), 'latest': {}}
+
+@timed("history.read")
+def read_history_incremental(path, columns, sum_columns=(), key_column=None):
+    readers = _history_readers()
+    with readers['lock']:
+        state = readers['states'].get(path)
+        if not os.path.exists(path):
+            readers['states'].pop(path, None)
+            return None
+
+        info = os.stat(path)
+        if state is None or state['inode'] != info.st_ino or info.st_size < state['offset']:
+            state = _empty_reader_state(columns, sum_columns)
+            state['inode'] = info.st_ino
+            readers['states'][path] = state
+
+        if state['mtime'] != info.st_mtime_ns or state['offset'] != info.st_size:
+            with open(path, 'rb') as f:
+                f.seek(state['offset'])
+                chunk = f.read(info.st_size - state['offset'])
+            # parse เฉพาะบรรทัดที่เขียนเสร็จแล้ว (ถึง \n ตัวสุดท้าย)
+            chunk = chunk[:chunk.rfind(b"\n") + 1]
+            consumed = len(chunk)
+            if state['offset'] == 0 and chunk:
+                if chunk.startswith(b"\xef\xbb\xbf"):
+                    chunk = chunk[3:]
+                header, _, chunk = chunk.partition(b"\n")
+                state['columns'] = next(csv.reader([header.decode('utf-8')]), list(columns))
+
+            if chunk.strip():
+                new_rows = pd.read_csv(io.BytesIO(chunk), header=None, names=state['columns'])
+                state['rows'] += len(new_rows)
+                for col in state['sums']:
+                    if col in new_rows.columns:
+                        state['sums'][col] += float(pd.to_numeric(new_rows[col], errors='coerce').sum())
+                state['tail'].extend(new_rows.tail(HISTORY_TAIL_ROWS).to_dict('records'))
+                if key_column in new_rows.columns:
+                    # ไฟล์เขียนต่อท้ายตามเวลา แถวสุดท้ายของแต่ละงานจึงเป็นสถานะล่าสุด
+                    state['latest'].update(new_rows.drop_duplicates(key_column, keep='last')
+                                           .set_index(key_column, drop=False).to_dict('index'))
+
+            state['offset'] += consumed
+            state['mtime'] = info.st_mtime_ns
+
+        return {
+            'rows': state['rows'], 'sums': dict(state['sums']),
+            'tail': pd.DataFrame(list(state['tail']), columns=state['columns']),
+            'latest': list(state['latest'].values()),
+        }
+
+def read_file_bytes(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+# 6.3 ฟังก์ชันบันทึกประวัติ (เชื่อมต่อ Google Sheets ผ่านคิว)
+# เขียนไฟล์ในเครื่องก่อนเสมอ ถ้าเข้าคิวไม่ได้จะโยน exception ให้ผู้เรียกแจ้งผู้ใช้เอง
+def save_history(route_str, km, old_cost, new_cost, gmaps_link="", stop_etas=""):
+    save_history_many([{'route': route_str, 'km': km, 'old_cost': old_cost, 'new_cost': new_cost,
+                        'gmaps_link': gmaps_link, 'stop_etas': stop_etas}])
+
+# บันทึกหลายงานพร้อมกัน: ต่อท้ายไฟล์ครั้งเดียว (ถือล็อกครั้งเดียว) และเข้าคิวใน transaction เดียว
+# records = [{'route', 'km', 'old_cost', 'new_cost', 'gmaps_link' (ถ้ามี), 'stop_etas' (ถ้ามี)}, ...]
+def save_history_many(records, path=DATA_FILE, sync=True):
+    tz_thai = timezone(timedelta(hours=7))
+    current_thai_time = datetime.now(tz_thai).strftime("%Y-%m-%d %H:%M:%S")
+
+    payloads = [{
+        "date": current_thai_time, 
+        "route": record['route'],
+        "km": record['km'],
+        "old_cost": record['old_cost'],
+        "new_cost": record['new_cost'],
+        "saving": record['old_cost'] - record['new_cost'],
+        "gmaps_link": record.get('gmaps_link') or "",
+        "stop_etas": record.get('stop_etas') or "",
+    } for record in records]
+
+    append_history_rows(path, HISTORY_COLUMNS, [{
+        "Date": data["date"], "Route": data["route"], "Distance_KM": data["km"],
+        "Old_Cost": data["old_cost"], "New_Cost": data["new_cost"], "Saving": data["saving"],
+        "Gmaps_Link": data["gmaps_link"], "Stop_ETAs": data["stop_etas"],
+    } for data in payloads])
+    if sync:
+        enqueue_sync_many(payloads)
+
+# 7. ฟังก์ชันบันทึก Tracking สถานะคนขับ
+def save_tracking_status(job_id, status):
+    tz_thai = timezone(timedelta(hours=7))
+    current_thai_time = datetime.now(tz_thai).strftime("%Y-%m-%d %H:%M:%S")
+
+    data_to_send = {
+        "date": current_thai_time,
+        "job_id": job_id,
+        "status": status
+    }
+    try:
+        enqueue_sync(data_to_send)
+    except:
+        pass 
+
+    append_history_rows(TRACKING_FILE, TRACKING_COLUMNS, [{
+        "Date_Time": current_thai_time,
+        "Driver_Job": job_id,
+        "Status": status
+    }])
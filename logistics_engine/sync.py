@@ -0,0 +1,148 @@
+# ส่งข้อมูลไป Google Sheets ผ่านคิวเบื้องหลัง
+import functools
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import closing
+
+import requests
+
+from .metrics import timed
+
+# 6.2 คิวส่งข้อมูลไป Google Apps Script แบบเบื้องหลัง
+# - บันทึกลงคิว (SQLite) ก่อนแล้วคืนทันที หน้าจอไม่ต้องรอ Google
+# - worker thread ตัวเดียวต่อโปรเซส ดึงคิวทีละชุด ส่งผ่าน session เดียวกัน ส่งไม่สำเร็จจะรอแบบ backoff แล้วลองใหม่
+# - รายการที่ยังไม่ได้ส่งอยู่ในไฟล์คิว ปิด/เปิดแอปใหม่ก็ส่งต่อได้
+# - เปลี่ยนปลายทางได้ด้วยตัวแปรแวดล้อม APP_SCRIPT_URL หรือ set_sync_endpoint (เช่น HTTP server ในเครื่องตอนทดสอบ)
+APP_SCRIPT_URL = os.environ.get(
+    "APP_SCRIPT_URL",
+    "https://script.google.com/macros/s/AKfycbwHuMqah43jZlMFQumEfE7F22t4HCsnEPon8jOV9Y-WFaj9Yx8DhW1uex_DIQAZYowGbA/exec"
+)
+SYNC_QUEUE_FILE = 'sync_queue.sqlite'
+SYNC_TIMEOUT = 15
+SYNC_BATCH_SIZE = 20
+SYNC_POLL_INTERVAL = 5.0      # วินาทีที่ worker รอเมื่อคิวว่าง
+# กันไม่ให้โปรเซสอื่นหยิบรายการที่กำลังส่งซ้ำ: นานพอให้ส่งครบทั้งชุด (connect + read timeout ต่อแถว)
+# แถวที่ส่งไม่ทันก่อนหมดเวลาจอง จะคืนเข้าคิวโดยไม่ส่ง (ไม่มีโปรเซสสองตัวส่งแถวเดียวกัน)
+SYNC_CLAIM_SECONDS = SYNC_BATCH_SIZE * SYNC_TIMEOUT * 2
+SYNC_BACKOFF_BASE = 5.0
+SYNC_BACKOFF_MAX = 600.0
+# Apps Script ปัจจุบันรับทีละแถว ถ้าปรับ doPost ให้รับ {"rows": [...]} แล้ว ตั้ง SYNC_POST_BATCHES=1 เพื่อส่งทั้งชุดในครั้งเดียว
+SYNC_POST_BATCHES = os.environ.get("SYNC_POST_BATCHES") == "1"
+
+def _sync_connect():
+    conn = sqlite3.connect(SYNC_QUEUE_FILE, timeout=30)
+    conn.execute("CREATE TABLE IF NOT EXISTS outbox ("
+                 "id INTEGER PRIMARY KEY AUTOINCREMENT, endpoint TEXT, payload TEXT, "
+                 "attempts INTEGER DEFAULT 0, next_attempt REAL, created REAL, last_error TEXT)")
+    return conn
+
+@functools.cache
+def _sync_state():
+    return {'endpoint': APP_SCRIPT_URL, 'session': requests.Session(),
+            'wake': threading.Event(), 'stop': threading.Event(), 'thread': None}
+
+def set_sync_endpoint(endpoint):
+    _sync_state()['endpoint'] = endpoint
+
+def enqueue_sync(payload, endpoint=None):
+    enqueue_sync_many([payload], endpoint)
+
+# เข้าคิวหลายรายการใน transaction เดียว (ใช้กับงาน batch)
+def enqueue_sync_many(payloads, endpoint=None):
+    state = _sync_state()
+    endpoint = endpoint or state['endpoint']
+    if not endpoint or not payloads:
+        return
+    now = time.time()
+    with closing(_sync_connect()) as conn, conn:
+        conn.executemany("INSERT INTO outbox (endpoint, payload, next_attempt, created) VALUES (?, ?, ?, ?)",
+                         [(endpoint, json.dumps(payload, ensure_ascii=False), now, now) for payload in payloads])
+    state['wake'].set()
+
+def sync_queue_size():
+    with closing(_sync_connect()) as conn:
+        return conn.execute("SELECT COUNT(*) FROM outbox").fetchone()[0]
+
+@timed("sync.post")
+def _post_sync(session, endpoint, payload):
+    response = session.post(endpoint, json=payload, timeout=SYNC_TIMEOUT)
+    response.raise_for_status()
+
+# ส่งคิวที่ถึงเวลาหนึ่งชุด คืนจำนวนรายการที่ส่งสำเร็จ
+def sync_pending_once(session=None):
+    session = session or _sync_state()['session']
+    now = time.time()
+    with closing(_sync_connect()) as conn:
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            rows = conn.execute("SELECT id, endpoint, payload, attempts FROM outbox WHERE next_attempt <= ? "
+                                "ORDER BY id LIMIT ?", (now, SYNC_BATCH_SIZE)).fetchall()
+            claimed_until = now + SYNC_CLAIM_SECONDS
+            conn.executemany("UPDATE outbox SET next_attempt = ? WHERE id = ?",
+                             [(claimed_until, row[0]) for row in rows])
+
+        by_endpoint = {}
+        for row in rows:
+            by_endpoint.setdefault(row[1], []).append(row)
+
+        sent, failed, released = [], [], []
+        for endpoint, items in by_endpoint.items():
+            if time.time() + SYNC_TIMEOUT * 2 > claimed_until:
+                released += [item[0] for item in items]
+                continue
+            if SYNC_POST_BATCHES:
+                try:
+                    _post_sync(session, endpoint, {"rows": [json.loads(item[2]) for item in items]})
+                    sent += [item[0] for item in items]
+                except Exception as e:
+                    failed += [(item, str(e)) for item in items]
+                continue
+            for item in items:
+                if time.time() + SYNC_TIMEOUT * 2 > claimed_until:
+                    released.append(item[0])
+                    continue
+                try:
+                    _post_sync(session, endpoint, json.loads(item[2]))
+                    sent.append(item[0])
+                except Exception as e:
+                    failed.append((item, str(e)))
+
+        with conn:
+            conn.executemany("DELETE FROM outbox WHERE id = ?", [(row_id,) for row_id in sent])
+            conn.executemany(
+                "UPDATE outbox SET attempts = ?, next_attempt = ?, last_error = ? WHERE id = ?",
+                [(item[3] + 1, time.time() + min(SYNC_BACKOFF_BASE * 2 ** item[3], SYNC_BACKOFF_MAX), error, item[0])
+                 for item, error in failed]
+            )
+            conn.executemany("UPDATE outbox SET next_attempt = ? WHERE id = ?",
+                             [(time.time(), row_id) for row_id in released])
+    return len(sent)
+
+# วินาทีจนกว่าจะมีรายการถึงเวลาส่ง (ไม่เกิน SYNC_POLL_INTERVAL)
+def _sync_next_due_in():
+    with closing(_sync_connect()) as conn:
+        next_attempt = conn.execute("SELECT MIN(next_attempt) FROM outbox").fetchone()[0]
+    if next_attempt is None:
+        return SYNC_POLL_INTERVAL
+    return min(max(next_attempt - time.time(), 0.0), SYNC_POLL_INTERVAL)
+
+def _sync_worker_loop(state):
+    while not state['stop'].is_set():
+        try:
+            sent = sync_pending_once(state['session'])
+            wait = 0.0 if sent else _sync_next_due_in()
+        except Exception:
+            wait = SYNC_POLL_INTERVAL
+        if wait > 0:
+            state['wake'].wait(wait)
+            state['wake'].clear()
+
+def start_sync_worker():
+    state = _sync_state()
+    if state['thread'] is None or not state['thread'].is_alive():
+        state['thread'] = threading.Thread(target=_sync_worker_loop, args=(state,), name="sync-worker", daemon=True)
+        state['thread'].start()
+    return state
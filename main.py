@@ -1,194 +1,39 @@
 import streamlit as st
 import pandas as pd
-import math
-import folium
-from streamlit_folium import st_folium
+import heapq
+import datetime
 import os
-from datetime import datetime, timedelta, timezone
-import requests
-from geopy.geocoders import Nominatim
-import urllib.parse 
+import streamlit.components.v1 as components
+from logistics_engine import (
+    DATA_FILE, TRACKING_FILE, HISTORY_COLUMNS, TRACKING_COLUMNS, VEHICLE_TYPES, VEHICLE_CAPACITY,
+    ROUTE_IMPROVERS, IMPROVE_TIME_BUDGET, MAP_LIGHTWEIGHT_STOPS, MAP_HEIGHT,
+    TRAFFIC_PROFILES, DEFAULT_DEPARTURE, parse_departure, get_lat_lon, quote_trip, fill_missing_coordinates,
+    osrm_table_limit, load_upload, plan_file_routes_cached, replan_file_routes, solve_cache_stats, get_route_map_html, save_history, save_tracking_status,
+    read_history_incremental, clear_history_file, start_sync_worker, sync_queue_size,
+    metrics_snapshot, cache_snapshot, metrics_json_lines, prometheus_text, reset_metrics,
+    maybe_rollover, archived_latest, archive_totals, query_history, export_history_csv, clear_archive,
+)
 
 # --- ตั้งค่าหน้าเว็บ ---
 st.set_page_config(page_title="Smart Logistics Pro", layout="wide", page_icon="🚚")
 
-# ตัวแปรเก็บไฟล์ข้อมูล
-DATA_FILE = 'saving_history.csv'
-TRACKING_FILE = 'tracking_history.csv' 
-
-# ================= โซนฟังก์ชันคำนวณ =================
-
-# 1. ฟังก์ชันคำนวณระยะทาง
-def calculate_distance(lat1, lon1, lat2, lon2):
-    R = 6371
-    phi1, phi2 = math.radians(lat1), math.radians(lat2)
-    dphi = math.radians(lat2 - lat1)
-    dlambda = math.radians(lon2 - lon1)
-    a = math.sin(dphi/2)**2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda/2)**2
-    c = 2 * math.atan2(math.sqrt(a), math.sqrt(1-a))
-    return R * c * 1.4
-
-# 2. [อัปเดต!] ฟังก์ชันคำนวณต้นทุน (เฉพาะ Variable Cost: น้ำมัน + ทางด่วน)
-def calculate_marginal_cost(distance_km, car_type, fuel_price_today, toll_fee):
-    # --- กำหนดอัตราสิ้นเปลืองรถ ---
-    if "4" in car_type:
-        fuel_efficiency = 12.0     # อัตราสิ้นเปลืองรถกระบะ (กม./ลิตร)
-    else:
-        fuel_efficiency = 7.0      # อัตราสิ้นเปลืองรถบรรทุก 6 ล้อ (กม./ลิตร)
-        
-    # --- 1. คำนวณ Cost per Kilometer (ต้นทุนน้ำมันต่อกิโลเมตร) ---
-    cost_per_km = fuel_price_today / fuel_efficiency
-    
-    # --- 2. สมการ (Formula) ---
-    # Total Cost = (Cost per KM × Distance) + Toll Fee
-    total_transportation_cost = (cost_per_km * distance_km) + toll_fee
-    
-    return total_transportation_cost
+DEFAULT_DEPARTURE_TIME = datetime.time(*divmod(parse_departure(DEFAULT_DEPARTURE), 60))
 
-# 3. ฟังก์ชัน VRP (จัดเส้นทาง)
-def solve_vrp_from_df(depot_name, df_data):
-    locations = {}
-    for index, row in df_data.iterrows():
-        locations[row['Location']] = [row['Latitude'], row['Longitude']]
-    
-    route = [depot_name]
-    current_loc = depot_name
-    unvisited = [loc for loc in locations.keys() if loc != depot_name]
-    total_dist = 0
-    
-    while unvisited:
-        nearest_city = None
-        min_dist = float('inf')
-        curr_coords = locations[current_loc]
-        
-        for city in unvisited:
-            dest_coords = locations[city]
-            dist = calculate_distance(curr_coords[0], curr_coords[1], dest_coords[0], dest_coords[1])
-            if dist < min_dist:
-                min_dist = dist
-                nearest_city = city
-        
-        if nearest_city:
-            route.append(nearest_city)
-            total_dist += min_dist
-            current_loc = nearest_city
-            unvisited.remove(nearest_city)
-            
-    start_coords = locations[depot_name]
-    end_coords = locations[current_loc]
-    total_dist += calculate_distance(end_coords[0], end_coords[1], start_coords[0], start_coords[1])
-    route.append(depot_name)
-    return route, total_dist, locations
-
-# 4. ฟังก์ชัน Geocoding
-def get_lat_lon(location_name):
-    geolocator = Nominatim(user_agent="logistics_student_project_66")
-    try:
-        location = geolocator.geocode(location_name + ", Thailand", timeout=10)
-        if location:
-            return location.latitude, location.longitude
-        return None, None
-    except:
-        return None, None
-
-# 5. ฟังก์ชัน OSRM
-def get_osrm_route(coord1, coord2):
-    url = f"http://router.project-osrm.org/route/v1/driving/{coord1[1]},{coord1[0]};{coord2[1]},{coord2[0]}?overview=full&geometries=geojson"
-    try:
-        r = requests.get(url)
-        res = r.json()
-        routes = res['routes'][0]
-        return routes['geometry'], routes['distance']/1000, routes['duration']/60
-    except:
-        return None, 0, 0
-
-# 6. ฟังก์ชันบันทึกประวัติ (เชื่อมต่อ Google Sheets)
-def save_history(route_str, km, old_cost, new_cost):
-    APP_SCRIPT_URL = "https://script.google.com/macros/s/AKfycbwHuMqah43jZlMFQumEfE7F22t4HCsnEPon8jOV9Y-WFaj9Yx8DhW1uex_DIQAZYowGbA/exec" 
-
-    tz_thai = timezone(timedelta(hours=7))
-    current_thai_time = datetime.now(tz_thai).strftime("%Y-%m-%d %H:%M:%S")
-
-    data = {
-        "date": current_thai_time, 
-        "route": route_str,
-        "km": km,
-        "old_cost": old_cost,
-        "new_cost": new_cost,
-        "saving": old_cost - new_cost
-    }
+# ฟังก์ชันคำนวณทั้งหมดอยู่ในแพ็กเกจ logistics_engine (ไม่ผูกกับ Streamlit)
+# ไฟล์นี้เป็นหน้าจออย่างเดียว แต่ละหน้าเรนเดอร์เฉพาะตอนถูกเลือก
 
+# บันทึกประวัติแล้วแจ้งผลบนหน้าจอ
+def record_history(route_str, km, old_cost, new_cost, gmaps_link="", stop_etas=""):
     try:
-        if "script.google.com" in APP_SCRIPT_URL:
-            response = requests.post(APP_SCRIPT_URL, json=data)
-            if response.status_code == 200:
-                st.toast('✅ บันทึกข้อมูลลง Google Sheets แล้ว!', icon='☁️')
+        save_history(route_str, km, old_cost, new_cost, gmaps_link, stop_etas)
+        st.toast('✅ เข้าคิวส่ง Google Sheets แล้ว!', icon='☁️')
     except Exception as e:
-        st.error(f"❌ เชื่อมต่อ Google ไม่ได้: {e}")
-
-    if os.path.exists(DATA_FILE):
-        df = pd.read_csv(DATA_FILE)
-    else:
-        df = pd.DataFrame(columns=["Date", "Route", "Distance_KM", "Old_Cost", "New_Cost", "Saving"])
-    
-    new_row = pd.DataFrame([{
-        "Date": data["date"], "Route": data["route"], "Distance_KM": data["km"],
-        "Old_Cost": data["old_cost"], "New_Cost": data["new_cost"], "Saving": data["saving"]
-    }])
-    df = pd.concat([df, new_row], ignore_index=True)
-    df.to_csv(DATA_FILE, index=False, encoding='utf-8-sig')
-
-# 7. ฟังก์ชันบันทึก Tracking สถานะคนขับ
-def save_tracking_status(job_id, status):
-    APP_SCRIPT_URL = "https://script.google.com/macros/s/AKfycbwHuMqah43jZlMFQumEfE7F22t4HCsnEPon8jOV9Y-WFaj9Yx8DhW1uex_DIQAZYowGbA/exec" 
-    
-    tz_thai = timezone(timedelta(hours=7))
-    current_thai_time = datetime.now(tz_thai).strftime("%Y-%m-%d %H:%M:%S")
-
-    data_to_send = {
-        "date": current_thai_time,
-        "job_id": job_id,
-        "status": status
-    }
-    try:
-        requests.post(APP_SCRIPT_URL, json=data_to_send)
-    except:
-        pass 
-
-    new_data = pd.DataFrame({
-        "Date_Time": [current_thai_time],
-        "Driver_Job": [job_id],
-        "Status": [status]
-    })
-
-    if os.path.exists(TRACKING_FILE):
-        df = pd.read_csv(TRACKING_FILE)
-    else:
-        df = pd.DataFrame(columns=["Date_Time", "Driver_Job", "Status"])
-
-    df = pd.concat([df, new_data], ignore_index=True)
-    df.to_csv(TRACKING_FILE, index=False, encoding='utf-8-sig')
-
-def create_gmaps_link(route_list, loc_dict):
-    if not route_list: return None
-    origin = loc_dict[route_list[0]]
-    origin_str = f"{origin[0]},{origin[1]}"
-    dest = loc_dict[route_list[-1]]
-    dest_str = f"{dest[0]},{dest[1]}"
-    
-    waypoints = route_list[1:-1]
-    waypoint_strs = []
-    for wp in waypoints:
-        coords = loc_dict[wp]
-        waypoint_strs.append(f"{coords[0]},{coords[1]}")
-    
-    waypoints_param = "|".join(waypoint_strs)
-    base_url = "https://www.google.com/maps/dir/?api=1"
-    full_url = f"{base_url}&origin={origin_str}&destination={dest_str}&waypoints={waypoints_param}&travelmode=driving"
-    return full_url
+        st.error(f"❌ บันทึกคิว Google Sheets ไม่ได้: {e}")
 
 # ================= หน้าจอแอป (UI) =================
 
+start_sync_worker()
+
 st.sidebar.header("⚙️ ตั้งค่าระบบ (Daily Settings)")
 st.sidebar.info("อัปเดตตัวแปรให้ตรงกับความเป็นจริง ณ วันที่ปฏิบัติงาน")
 
@@ -196,13 +41,21 @@ st.sidebar.info("อัปเดตตัวแปรให้ตรงกับ
 current_fuel_price = st.sidebar.number_input("⛽ ราคาน้ำมันดีเซลวันนี้ (บาท/ลิตร)", value=30.50, step=0.10)
 current_toll_fee = st.sidebar.number_input("🛣️ ค่าผ่านทาง / ทางด่วน (บาท)", value=0.0, step=10.0)
 
+pending_sync = sync_queue_size()
+if pending_sync:
+    st.sidebar.caption(f"☁️ รอส่ง Google Sheets: {pending_sync} รายการ")
+
+show_admin = st.sidebar.toggle("🛠️ แผงวัดประสิทธิภาพ (Admin)", value=False, key="admin_panel")
+
 st.title("🚚 Smart Logistics Platform")
 st.caption("ระบบบริหารจัดการขนส่งครบวงจร (VRP + Variable Costing + Traffic Surcharge + Real-time Tracking)")
 
-tab_file, tab_search, tab_driver, tab_history = st.tabs(["📂 จัดเส้นทางจากไฟล์", "🔍 ค้นหา/ระบุพิกัด", "📱 อัปเดตสถานะ (คนขับ)", "📊 ประวัติ & ดาวน์โหลด"])
+# เลือกหน้าด้วย radio แทน st.tabs: st.tabs รันโค้ดทุกแท็บในทุก rerun ส่วนนี้รันเฉพาะหน้าที่เปิดอยู่
+PAGES = ["📂 จัดเส้นทางจากไฟล์", "🔍 ค้นหา/ระบุพิกัด", "📱 อัปเดตสถานะ (คนขับ)", "📊 ประวัติ & ดาวน์โหลด"]
+page = st.radio("เมนู", PAGES, horizontal=True, label_visibility="collapsed", key="page")
 
 # --- TAB 1: จัดเส้นทาง ---
-with tab_file:
+if page == PAGES[0]:
     st.header("จัดเส้นทางหลายจุด (Batch Upload)")
     st.info("💡 อัปโหลดไฟล์ Excel/CSV ที่มีรายชื่อลูกค้าเพื่อจัดเส้นทางอัตโนมัติ")
     
@@ -210,72 +63,115 @@ with tab_file:
 
     if uploaded_file is not None:
         try:
-            if uploaded_file.name.endswith('.csv'):
-                df = pd.read_csv(uploaded_file)
-            else:
-                df = pd.read_excel(uploaded_file)
-            
-            df['Location'] = df['Location'].astype(str)
+            upload = load_upload(uploaded_file.getvalue(), uploaded_file.name)
+            df = upload['df']
+            if not upload['rejects'].empty:
+                st.warning(f"⚠️ ข้ามแถวที่ใช้ไม่ได้ {len(upload['rejects'])} จาก {upload['total_rows']} แถว")
+                with st.expander("ดูรายการแถวที่ถูกข้าม"):
+                    st.dataframe(upload['rejects'], use_container_width=True, hide_index=True)
+            if df.empty:
+                raise ValueError("ไม่มีแถวที่ใช้จัดเส้นทางได้ในไฟล์")
+
+            if 'Latitude' not in df.columns or 'Longitude' not in df.columns or df[['Latitude', 'Longitude']].isna().any().any():
+                geo_progress = st.progress(0.0, text="กำลังค้นหาพิกัดจากชื่อสถานที่...")
+                df, unresolved = fill_missing_coordinates(
+                    df, progress=lambda done, total: geo_progress.progress(done / total, text=f"กำลังค้นหาพิกัด {done}/{total}"))
+                geo_progress.empty()
+                if unresolved:
+                    st.warning(f"⚠️ หาพิกัดไม่เจอ {len(unresolved)} จุด (ตัดออกจากการจัดเส้นทาง): {', '.join(unresolved[:20])}")
             
             c1, c2 = st.columns([1, 2])
             with c1:
                 location_list = df['Location'].tolist()
                 depot = st.selectbox("จุดเริ่มต้น", location_list)
-                car_type = st.radio("ประเภทรถ", ["รถกระบะ 4 ล้อ", "6 ล้อ"], key="car1")
+                route_mode = st.radio("โหมดจัดเส้นทาง", ["🚚 รถคันเดียว", "🚛 หลายคัน (จำกัดน้ำหนักบรรทุก)"], key="mode1")
+                if route_mode == "🚚 รถคันเดียว":
+                    car_type = st.radio("ประเภทรถ", VEHICLE_TYPES, key="car1")
+                    road_distances = st.checkbox("🛣️ ใช้ระยะทางถนนจริง (OSRM)", value=False, key="osrm1")
+                    osrm_limit = osrm_table_limit()
+                    if road_distances and osrm_limit is not None and len(df) > osrm_limit:
+                        st.caption(f"⚠️ server OSRM สาธารณะรับได้ไม่เกิน {osrm_limit} จุด ไฟล์นี้จะใช้ระยะทางเส้นตรง x 1.4 แทน")
+                    # ไฟล์เดิมที่แก้จุดส่ง (เพิ่ม/ยกเลิก): แทรก/ตัดจุดในเส้นทางเดิมแทนการจัดใหม่ทั้งหมด
+                    prev_res = st.session_state.get('res_file')
+                    can_update = bool(prev_res and prev_res.get('solved') is not None and prev_res['route'][0] == depot
+                                      and prev_res.get('source') == uploaded_file.name)
+                    incremental = st.checkbox("♻️ ปรับจากผลเดิม (เพิ่ม/ยกเลิกจุด)", value=True, disabled=not can_update,
+                                              key="incremental1", help="ใช้ได้เมื่อคำนวณแบบรถคันเดียวจากไฟล์และจุดเริ่มต้นเดิมไว้แล้ว "
+                                                                       "ถ้าจุดเปลี่ยนเกิน 20% หรือเปลี่ยนวิธี/เวลาปรับปรุงเส้นทาง จะจัดใหม่ทั้งหมด")
+                else:
+                    st.caption("ใช้คอลัมน์ Demand (น้ำหนักต่อจุด) และ Capacity (ที่แถวจุดเริ่มต้น ถ้ามี) จากไฟล์")
+                    fleet = []
+                    for v_type in VEHICLE_TYPES:
+                        col_n, col_cap = st.columns(2)
+                        count = col_n.number_input(f"จำนวน {v_type}", min_value=0, value=2, step=1, key=f"fleet_n_{v_type}")
+                        capacity = col_cap.number_input("บรรทุกได้ (กก.)", min_value=1.0, value=VEHICLE_CAPACITY[v_type], step=100.0, key=f"fleet_cap_{v_type}")
+                        fleet.append((v_type, count, capacity))
                 
-                traffic_1 = st.selectbox("สภาพการจราจร / สภาพอากาศ", ["🟢 ปกติ (ถนนโล่ง)", "🟡 รถติดปานกลาง / ฝนตก", "🔴 รถติดหนัก (ช่วงเร่งด่วน)"], key="traf1")
+                traffic_1 = st.selectbox("สภาพการจราจร / สภาพอากาศ", list(TRAFFIC_PROFILES), key="traf1")
+                departure_1 = st.time_input("🕗 เวลาออกจากคลัง", DEFAULT_DEPARTURE_TIME, key="depart1")
                 old_cost = st.number_input("ต้นทุนเดิม (บาท)", value=2000.0, key="old1")
+
+                with st.expander("🧠 ปรับปรุงเส้นทาง (2-opt / Or-opt)"):
+                    improve_methods = st.multiselect("วิธีปรับปรุง", list(ROUTE_IMPROVERS.keys()),
+                                                     default=list(ROUTE_IMPROVERS.keys()), key="improve1")
+                    time_budget = st.slider("เวลาคำนวณสูงสุด (วินาที)", 0.5, 30.0, IMPROVE_TIME_BUDGET, 0.5, key="budget1")
                 
                 if st.button("🚀 คำนวณ (จากไฟล์)", type="primary"):
-                    route, km, loc_dict = solve_vrp_from_df(depot, df)
-                    
-                    # เรียกใช้สมการคำนวณต้นทุน
-                    base_price = calculate_marginal_cost(km, car_type, current_fuel_price, current_toll_fee)
-                    
-                    # คำนวณเวลา (วิ่งข้ามจังหวัดที่ 70 กม./ชม. -> km * 0.85 นาที)
-                    driving_mins = km * 0.85
-                    num_dropoffs = max(0, len(route) - 2) 
-                    dropoff_mins = num_dropoffs * 15
-                    estimated_base_mins = driving_mins + dropoff_mins
-                    
-                    if "🟡" in traffic_1:
-                        actual_mins = estimated_base_mins * 1.5
-                    elif "🔴" in traffic_1:
-                        actual_mins = estimated_base_mins * 2.0
-                    else:
-                        actual_mins = estimated_base_mins
-                        
-                    extra_time = actual_mins - estimated_base_mins
-                    time_surcharge = extra_time * 2
-                    
-                    # ต้นทุนรวมทั้งหมด
-                    final_cost = base_price + time_surcharge
-                    
-                    save_history(" -> ".join(route), km, old_cost, final_cost)
-                    gmaps_link = create_gmaps_link(route, loc_dict)
-                    
-                    st.session_state['res_file'] = {
-                        'route': route, 'km': km, 'cost': final_cost, 'locs': loc_dict,
-                        'gmaps': gmaps_link, 'base_price': base_price, 'surcharge': time_surcharge,
-                        'time': actual_mins
+                    settings = {
+                        'mode': "single" if route_mode == "🚚 รถคันเดียว" else "cvrp",
+                        'car_type': car_type if route_mode == "🚚 รถคันเดียว" else None,
+                        'road_distances': road_distances if route_mode == "🚚 รถคันเดียว" else False,
+                        'fleet': fleet if route_mode != "🚚 รถคันเดียว" else None,
+                        'traffic': traffic_1, 'improve_methods': list(improve_methods), 'time_budget': time_budget,
+                        'fuel_price': current_fuel_price, 'toll_fee': current_toll_fee,
+                        'departure': departure_1.strftime("%H:%M"),
                     }
+                    res, from_cache = None, False
+                    if settings['mode'] == "single" and incremental:
+                        res = replan_file_routes(st.session_state.get('res_file'), df, depot, settings, uploaded_file.name)
+                    if res is None:
+                        res, from_cache = plan_file_routes_cached(df, depot, settings)
+                    if res.get('osrm_fallback'):
+                        st.warning("⚠️ เชื่อมต่อ OSRM ไม่ได้ ใช้ระยะทางเส้นตรง x 1.4 แทน")
+
+                    record_history(res['history_route'], res['km'], old_cost, res['cost'], res['history_gmaps'], res['history_etas'])
+                    st.session_state['res_file'] = dict(res, from_cache=from_cache, source=uploaded_file.name)
 
             with c2:
                 if 'res_file' in st.session_state:
                     res = st.session_state['res_file']
+                    if res.get('from_cache'):
+                        solve_cache = solve_cache_stats()
+                        st.caption(f"⚡ ใช้ผลคำนวณเดิมจากแคช (hit {solve_cache['hits']} / miss {solve_cache['misses']})")
+                    if res.get('changes'):
+                        st.caption(f"♻️ ปรับจากเส้นทางเดิม: เพิ่ม {len(res['changes']['added'])} จุด / "
+                                   f"ยกเลิก {len(res['changes']['removed'])} จุด")
                     
-                    st.success(f"✅ จัดเส้นทางสำเร็จ! ({len(res['route'])-2} จุดส่ง)")
-                    st.link_button("🗺️ เปิดนำทางใน Google Maps", res['gmaps'], type="primary", use_container_width=True)
-                    
-                    m = folium.Map(location=res['locs'][res['route'][0]], zoom_start=11)
-                    route_coords = [res['locs'][city] for city in res['route']]
-                    for i, city in enumerate(res['route']):
-                        folium.Marker(res['locs'][city], popup=f"{i}. {city}", 
-                                      icon=folium.Icon(color='red' if i==0 else 'blue', icon='info-sign')).add_to(m)
-                    folium.PolyLine(route_coords, color='blue', weight=4).add_to(m)
-                    st_folium(m, width=700, key="map1")
-                    
-                    st.info(f"📍 ลำดับการส่ง: {' -> '.join(res['route'])}")
+                    n_stops = len(res['locs']) - 1
+                    lightweight = st.toggle("🪶 แผนที่โหมดเบา (รวมหมุด + ลดรายละเอียดเส้น)",
+                                            value=n_stops > MAP_LIGHTWEIGHT_STOPS, key="light1")
+
+                    if 'vehicles' in res:
+                        st.success(f"✅ จัดเส้นทางสำเร็จ! ({n_stops} จุดส่ง / {len(res['vehicles'])} คัน)")
+                        components.html(get_route_map_html(res, lightweight), height=MAP_HEIGHT)
+
+                        st.dataframe(pd.DataFrame([{
+                            "คันที่": v_no + 1, "ประเภทรถ": v['vehicle'], "จุดส่ง": len(v['route']) - 2,
+                            "น้ำหนัก (กก.)": v['load'], "บรรทุกได้ (กก.)": v['capacity'],
+                            "ระยะทาง (กม.)": round(v['km'], 2), "เวลา (ชม.)": round(v['time'] / 60, 1),
+                            "ต้นทุน (บาท)": round(v['cost'], 2), "รถเพิ่ม/เที่ยวเพิ่ม": "⚠️" if v['extra'] else "",
+                        } for v_no, v in enumerate(res['vehicles'])]), use_container_width=True, hide_index=True)
+                        if any(v['extra'] for v in res['vehicles']):
+                            st.warning("⚠️ รถที่มีไม่พอกับน้ำหนักสินค้า บางเส้นทางต้องใช้รถเพิ่มหรือวิ่งเพิ่มอีกเที่ยว")
+                        with st.expander("🗺️ ลิงก์นำทางรายคัน"):
+                            for v_no, v in enumerate(res['vehicles']):
+                                st.link_button(f"คันที่ {v_no+1} ({v['vehicle']}, {len(v['route'])-2} จุด)", v['gmaps'], use_container_width=True)
+                    else:
+                        st.success(f"✅ จัดเส้นทางสำเร็จ! ({len(res['route'])-2} จุดส่ง)")
+                        st.link_button("🗺️ เปิดนำทางใน Google Maps", res['gmaps'], type="primary", use_container_width=True)
+                        components.html(get_route_map_html(res, lightweight), height=MAP_HEIGHT)
+                        
+                        st.info(f"📍 ลำดับการส่ง: {' -> '.join(res['route'])}")
                     
                     col_a, col_b, col_c = st.columns(3)
                     col_a.metric("ระยะทางรวม", f"{res['km']:.2f} กม.")
@@ -285,6 +181,14 @@ with tab_file:
                     col_c.metric("ราคาสุทธิ (Variable Cost)", f"{res['cost']:,.2f} บาท")
                     
                     st.caption(f"*(แบ่งเป็น: ค่าน้ำมัน+ทางด่วน {res['base_price']:,.0f} บ. + ค่าเสียเวลารถติด {res['surcharge']:,.0f} บ.)*")
+
+                    with st.expander("🕒 เวลาถึงแต่ละจุด (ETA) และต้นทุนรายช่วง"):
+                        st.dataframe(res['legs'], use_container_width=True, hide_index=True)
+
+                    if res['stats']:
+                        saved_km = res['initial_km'] - res['km']
+                        with st.expander(f"🧠 ผลการปรับปรุงเส้นทาง: ลดลง {saved_km:,.2f} กม. (จาก {res['initial_km']:,.2f} กม.)"):
+                            st.dataframe(pd.DataFrame(res['stats']), use_container_width=True, hide_index=True)
                     
         except Exception as e:
             st.error(f"Error: {e}")
@@ -300,7 +204,7 @@ with tab_file:
         st.download_button("📥 ดาวน์โหลดไฟล์ตัวอย่าง", csv_template, "template.csv", "text/csv", icon="📄")
 
 # --- TAB 2: Hybrid Search ---
-with tab_search:
+elif page == PAGES[1]:
     st.header("เช็คราคาจุดต่อจุด")
     col1, col2 = st.columns([1, 2])
     with col1:
@@ -321,7 +225,8 @@ with tab_search:
             end_lon = c_lon2.number_input("Lon ปลายทาง", 100.0000, format="%.4f")
 
         car_type_2 = st.radio("ประเภทรถ", ["รถกระบะ 4 ล้อ", "6 ล้อ"], key="car2")
-        traffic_2 = st.selectbox("สภาพการจราจร / สภาพอากาศ", ["🟢 ปกติ (ถนนโล่ง)", "🟡 รถติดปานกลาง / ฝนตก", "🔴 รถติดหนัก (ช่วงเร่งด่วน)"], key="traf2")
+        traffic_2 = st.selectbox("สภาพการจราจร / สภาพอากาศ", list(TRAFFIC_PROFILES), key="traf2")
+        departure_2 = st.time_input("🕗 เวลาออกเดินทาง", DEFAULT_DEPARTURE_TIME, key="depart2")
         old_cost_2 = st.number_input("ต้นทุนเดิม (บาท)", value=1000.0, key="old2")
 
         if st.button("🚀 คำนวณ (ค้นหา)", type="primary"):
@@ -334,37 +239,30 @@ with tab_search:
                 start_name, end_name = f"GPS:{start_lat},{start_lon}", f"GPS:{end_lat},{end_lon}"
 
             if start_lat and end_lat:
-                geo_path, km, base_mins = get_osrm_route((start_lat, start_lon), (end_lat, end_lon))
-                
-                # เรียกใช้สมการคำนวณต้นทุน
-                base_price = calculate_marginal_cost(km, car_type_2, current_fuel_price, current_toll_fee)
-                
-                if "🟡" in traffic_2:
-                    actual_mins = base_mins * 1.5
-                elif "🔴" in traffic_2:
-                    actual_mins = base_mins * 2.5
-                else:
-                    actual_mins = base_mins
-                    
-                time_surcharge = (actual_mins - base_mins) * 2
-                final_cost = base_price + time_surcharge
-                
-                save_history(f"{start_name}->{end_name}", km, old_cost_2, final_cost)
-                
+                # เวลา/ต้นทุนใช้โมเดลรายช่วงเดียวกับหน้าจัดเส้นทางจากไฟล์
+                quote = quote_trip((start_lat, start_lon), (end_lat, end_lon), car_type_2, traffic_2,
+                                   current_fuel_price, current_toll_fee, departure_2.strftime("%H:%M"))
+                if quote['osrm_fallback']:
+                    st.warning("⚠️ เชื่อมต่อ OSRM ไม่ได้ ใช้ระยะทางเส้นตรง x 1.4 แทน")
+
                 gmaps_link_2 = f"https://www.google.com/maps/dir/?api=1&origin={start_lat},{start_lon}&destination={end_lat},{end_lon}&travelmode=driving"
 
-                st.session_state['res_search'] = {
-                    'start': [start_lat, start_lon], 'end': [end_lat, end_lon],
-                    'km': km, 'mins': actual_mins, 'cost': final_cost, 'path': geo_path,
-                    'names': [start_name, end_name], 'gmaps': gmaps_link_2,
-                    'base_price': base_price, 'surcharge': time_surcharge
-                }
+                record_history(f"{start_name}->{end_name}", quote['km'], old_cost_2, quote['cost'], gmaps_link_2,
+                               " -> ".join(quote['etas']))
+
+                st.session_state['res_search'] = dict(
+                    quote, start=[start_lat, start_lon], end=[end_lat, end_lon],
+                    names=[start_name, end_name], gmaps=gmaps_link_2,
+                )
             else:
                 st.error("❌ หาพิกัดไม่เจอ")
 
     with col2:
         if 'res_search' in st.session_state:
             res = st.session_state['res_search']
+            import folium
+            from streamlit_folium import st_folium
+
             st.link_button("🗺️ นำทางด้วย Google Maps", res['gmaps'], type="primary", use_container_width=True)
             
             m2 = folium.Map(location=res['start'], zoom_start=12)
@@ -374,11 +272,12 @@ with tab_search:
             folium.Marker(res['end'], popup=res['names'][1], icon=folium.Icon(color='red', icon='stop')).add_to(m2)
             st_folium(m2, width=700, height=500, key="map2")
             
-            st.success(f"ระยะทาง: {res['km']:.2f} กม. | เวลาขับรถ: {res['mins']:.0f} นาที | ราคาสุทธิ: {res['cost']:,.2f} บาท")
+            st.success(f"ระยะทาง: {res['km']:.2f} กม. | เวลาขับรถ: {res['mins']:.0f} นาที "
+                       f"(ออก {res['etas'][0]} ถึง {res['etas'][-1]}) | ราคาสุทธิ: {res['cost']:,.2f} บาท")
             st.caption(f"*(แบ่งเป็น: ค่าน้ำมัน+ทางด่วน {res['base_price']:,.0f} บ. + ค่าเสียเวลารถติด {res['surcharge']:,.0f} บ.)*")
 
 # --- TAB 3: อัปเดตสถานะ (คนขับ) ---
-with tab_driver:
+elif page == PAGES[2]:
     st.header("📱 อัปเดตสถานะการจัดส่ง (สำหรับพนักงานขับรถ)")
     st.info("💡 ให้คนขับรถเปิดหน้านี้บนมือถือ เพื่อกดรายงานสถานะให้แอดมินทราบแบบ Real-time")
     
@@ -404,10 +303,16 @@ with tab_driver:
                 
     with col_view:
         st.subheader("📋 กระดานติดตามสถานะ (Live Status)")
-        if os.path.exists(TRACKING_FILE):
-            track_df = pd.read_csv(TRACKING_FILE)
-            latest_track = track_df.sort_values(by="Date_Time", ascending=False).head(10)
-            st.dataframe(latest_track, use_container_width=True, hide_index=True)
+        maybe_rollover(TRACKING_FILE)
+        tracking = read_history_incremental(TRACKING_FILE, TRACKING_COLUMNS, key_column="Driver_Job")
+        # งานที่ยังไม่อัปเดตในเดือนนี้ (แถวถูกย้ายเข้าคลังตอนต้นเดือน) ใช้สถานะล่าสุดจากเดือนล่าสุดในคลัง
+        archived_track = archived_latest(TRACKING_FILE)
+        if tracking is not None or archived_track:
+            latest = {str(row["Driver_Job"]): row for row in archived_track}
+            latest.update({str(row["Driver_Job"]): row for row in (tracking['latest'] if tracking is not None else [])})
+            latest_track = heapq.nlargest(10, latest.values(), key=lambda row: str(row["Date_Time"]))
+            st.caption("สถานะล่าสุดของแต่ละงาน (10 งานที่อัปเดตล่าสุด)")
+            st.dataframe(pd.DataFrame(latest_track, columns=TRACKING_COLUMNS).astype(str), use_container_width=True, hide_index=True)
             
             if st.button("🔄 รีเฟรชกระดาน"):
                 st.rerun()
@@ -415,24 +320,51 @@ with tab_driver:
             st.write("ยังไม่มีข้อมูลการอัปเดตในวันนี้")
 
 # --- TAB 4: ประวัติ ---
-with tab_history:
+elif page == PAGES[3]:
     st.header("📊 ประวัติการใช้งาน & สถิติ")
-    if os.path.exists(DATA_FILE):
-        history_df = pd.read_csv(DATA_FILE)
+    # แถวก่อนเดือนนี้อยู่ในคลัง Parquet รายเดือน ยอดสะสม = ไฟล์ CSV ปัจจุบัน + สรุปของคลัง
+    maybe_rollover(DATA_FILE)
+    history = read_history_incremental(DATA_FILE, HISTORY_COLUMNS, sum_columns=("Saving", "Distance_KM"))
+    archived = archive_totals(DATA_FILE)
+    if history is not None or archived['rows']:
+        current_rows = history['rows'] if history is not None else 0
+        current_sums = history['sums'] if history is not None else {'Saving': 0.0, 'Distance_KM': 0.0}
         c1, c2, c3 = st.columns(3)
-        c1.metric("📝 จำนวนงาน", f"{len(history_df)} งาน")
-        c2.metric("💰 ประหยัดสะสม", f"{history_df['Saving'].sum():,.0f} บาท")
-        c3.metric("🛣️ ระยะทางรวม", f"{history_df['Distance_KM'].sum():,.1f} กม.")
+        c1.metric("📝 จำนวนงาน", f"{current_rows + archived['rows']} งาน")
+        c2.metric("💰 ประหยัดสะสม", f"{current_sums['Saving'] + archived['sums']['Saving']:,.0f} บาท")
+        c3.metric("🛣️ ระยะทางรวม", f"{current_sums['Distance_KM'] + archived['sums']['Distance_KM']:,.1f} กม.")
+        if archived['rows']:
+            st.caption(f"📦 เก็บในคลังรายเดือน {archived['rows']} งาน "
+                       f"({archived['months'][0]} ถึง {archived['months'][-1]})")
         
-        st.dataframe(history_df.tail(10))
+        if history is not None:
+            st.dataframe(history['tail'])
+
+        # ค้นเฉพาะตอนกดปุ่ม (เนื้อหาใน expander รันทุก rerun) แล้วเก็บผลไว้ใน session
+        with st.expander("🔎 ค้นประวัติตามช่วงวันที่"):
+            with st.form("hist_query_form"):
+                today = datetime.datetime.now(datetime.timezone(datetime.timedelta(hours=7))).date()
+                date_range = st.date_input("ช่วงวันที่", (today - datetime.timedelta(days=30), today), key="hist_range")
+                if st.form_submit_button("🔎 ค้นหา") and len(date_range) == 2:
+                    range_end = date_range[1] + datetime.timedelta(days=1)
+                    st.session_state['hist_query'] = (date_range[0], range_end, query_history(DATA_FILE, date_range[0], range_end))
+            if 'hist_query' in st.session_state:
+                range_start, range_end, found = st.session_state['hist_query']
+                st.caption(f"พบ {len(found)} งาน ประหยัดรวม {found['Saving'].sum():,.0f} บาท "
+                           f"ระยะทางรวม {found['Distance_KM'].sum():,.1f} กม.")
+                st.dataframe(found.tail(200), use_container_width=True, hide_index=True)
+                st.download_button("📥 ดาวน์โหลด CSV (ช่วงวันที่นี้)", lambda: export_history_csv(DATA_FILE, range_start, range_end),
+                                   "history_range.csv", "text/csv")
         
-        csv_data = history_df.to_csv(index=False).encode('utf-8-sig')
         col_down, col_del = st.columns(2)
         with col_down:
-            st.download_button("📥 ดาวน์โหลด CSV (คำนวณ)", csv_data, "history.csv", "text/csv", type="primary")
+            # รวมคลัง + ไฟล์ปัจจุบันเป็น CSV (utf-8-sig) ตอนกดดาวน์โหลดเท่านั้น
+            st.download_button("📥 ดาวน์โหลด CSV (คำนวณ)", lambda: export_history_csv(DATA_FILE), "history.csv", "text/csv", type="primary")
         with col_del:
             if st.button("🗑️ ล้างประวัติคำนวณ", type="secondary"):
-                os.remove(DATA_FILE)
+                clear_history_file(DATA_FILE)
+                clear_archive(DATA_FILE)
+                st.session_state.pop('hist_query', None)
                 st.rerun()
                 
     else:
@@ -440,14 +372,43 @@ with tab_history:
         
     st.divider()
     st.subheader("📥 ดาวน์โหลดประวัติการส่งของ (Tracking)")
-    if os.path.exists(TRACKING_FILE):
-        track_csv = pd.read_csv(TRACKING_FILE).to_csv(index=False).encode('utf-8-sig')
+    if os.path.exists(TRACKING_FILE) or archive_totals(TRACKING_FILE)['rows']:
+        with st.form("track_job_form"):
+            track_job = st.text_input("🔎 ดูไทม์ไลน์ของงาน (ชื่องาน/คนขับ)", key="track_job")
+            if st.form_submit_button("🔎 ค้นหา") and track_job:
+                st.session_state['track_query'] = query_history(TRACKING_FILE, job=track_job)
+        if 'track_query' in st.session_state:
+            st.dataframe(st.session_state['track_query'], use_container_width=True, hide_index=True)
         col_t1, col_t2 = st.columns(2)
         with col_t1:
-            st.download_button("📥 ดาวน์โหลด CSV (สถานะคนขับ)", track_csv, "tracking_data.csv", "text/csv")
+            st.download_button("📥 ดาวน์โหลด CSV (สถานะคนขับ)", lambda: export_history_csv(TRACKING_FILE), "tracking_data.csv", "text/csv")
         with col_t2:
             if st.button("🗑️ ล้างประวัติสถานะคนขับ"):
-                os.remove(TRACKING_FILE)
+                clear_history_file(TRACKING_FILE)
+                clear_archive(TRACKING_FILE)
+                st.session_state.pop('track_query', None)
                 st.rerun()
     else:
-        st.write("ยังไม่มีข้อมูลสถานะคนขับให้ดาวน์โหลด")
\ No newline at end of file
+        st.write("ยังไม่มีข้อมูลสถานะคนขับให้ดาวน์โหลด")
+
+# --- แผงวัดประสิทธิภาพ: เวลาแต่ละส่วน + hit rate ของแคช (นับรวมทุก session ตั้งแต่เริ่มโปรเซส) ---
+if show_admin:
+    st.divider()
+    st.subheader("🛠️ แผงวัดประสิทธิภาพ")
+    ops = metrics_snapshot()
+    if ops:
+        st.dataframe(pd.DataFrame(ops).round({'total_s': 3, 'mean_ms': 1, 'p50_ms': 1, 'p95_ms': 1}),
+                     use_container_width=True, hide_index=True)
+    else:
+        st.caption("ยังไม่มีการเรียกที่วัดเวลาไว้")
+    caches = pd.DataFrame(cache_snapshot())
+    if not caches.empty:
+        caches['hit_rate'] = caches['hit_rate'].map(lambda rate: f"{rate:.0%}" if pd.notna(rate) else "-")
+        st.dataframe(caches, use_container_width=True, hide_index=True)
+
+    col_prom, col_json, col_reset = st.columns(3)
+    col_prom.download_button("📥 Prometheus text", prometheus_text, "metrics.prom", "text/plain")
+    col_json.download_button("📥 JSON lines", metrics_json_lines, "metrics.jsonl", "application/x-ndjson")
+    if col_reset.button("🔄 รีเซ็ตตัวนับเวลา + แคช"):
+        reset_metrics()
+        st.rerun()
\ No newline at end of file
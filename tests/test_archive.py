@@ -0,0 +1,103 @@
+import io
+
+import pandas as pd
+import pytest
+
+from logistics_engine import (
+    HISTORY_COLUMNS, TRACKING_COLUMNS, append_history_rows, archive_totals, archived_latest, clear_archive,
+    export_history_csv, query_history, read_history_incremental, rollover_history,
+)
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+def history_rows(start, end, freq="6h"):
+    return [{"Date": d.strftime("%Y-%m-%d %H:%M:%S"), "Route": f"คลัง -> ลูกค้า {i % 5}", "Distance_KM": i % 40 + 0.5,
+             "Old_Cost": 100.0, "New_Cost": 80.0, "Saving": 20.0}
+            for i, d in enumerate(pd.date_range(start, end, freq=freq))]
+
+
+def test_rollover_keeps_every_row_exactly_once(workdir):
+    path = "saving_history.csv"
+    rows = history_rows("2026-07-01", "2026-10-16")
+    append_history_rows(path, HISTORY_COLUMNS, rows)
+
+    moved = rollover_history(path, "2026-10-01")
+    assert list(moved) == ["2026-07", "2026-08", "2026-09"]
+    assert rollover_history(path, "2026-10-01") == {}
+
+    current = read_history_incremental(path, HISTORY_COLUMNS, sum_columns=("Saving", "Distance_KM"))
+    archived = archive_totals(path)
+    assert current['rows'] + archived['rows'] == len(rows)
+    assert current['sums']['Distance_KM'] + archived['sums']['Distance_KM'] == pytest.approx(
+        sum(r["Distance_KM"] for r in rows))
+
+    everything = query_history(path)
+    assert len(everything) == len(rows)
+    assert everything['Date'].is_monotonic_increasing and not everything['Date'].duplicated().any()
+    assert everything['Date'].dt.strftime("%Y-%m-%d %H:%M:%S").tolist() == [r["Date"] for r in rows]
+    assert everything['Distance_KM'].dtype == "float64"
+
+    # แถวใหม่หลัง rollover ต่อท้าย CSV ได้ และค้นเจอพร้อมแถวในคลัง
+    append_history_rows(path, HISTORY_COLUMNS, history_rows("2026-10-17", "2026-10-17"))
+    assert len(query_history(path)) == len(rows) + 1
+
+
+def test_query_crosses_archive_and_current_file(workdir):
+    path = "saving_history.csv"
+    rows = history_rows("2026-08-01", "2026-10-16")
+    append_history_rows(path, HISTORY_COLUMNS, rows)
+    rollover_history(path, "2026-10-01")
+
+    found = query_history(path, "2026-09-25", "2026-10-03")
+    expected = [r["Date"] for r in rows if "2026-09-25" <= r["Date"] < "2026-10-03"]
+    assert found['Date'].dt.strftime("%Y-%m-%d %H:%M:%S").tolist() == expected
+
+    only_archive = query_history(path, "2026-08-10", "2026-08-11", include_current=False)
+    assert len(only_archive) == 4
+
+    csv_rows = pd.read_csv(io.BytesIO(export_history_csv(path, "2026-09-25", "2026-10-03")),
+                           encoding="utf-8-sig")
+    assert csv_rows['Date'].tolist() == expected
+
+
+def test_tracking_job_filter_and_clear(workdir):
+    path = "tracking_history.csv"
+    rows = [{"Date_Time": d.strftime("%Y-%m-%d %H:%M:%S"), "Driver_Job": f"job{i % 3}", "Status": "ok"}
+            for i, d in enumerate(pd.date_range("2026-08-01", "2026-10-10", freq="12h"))]
+    append_history_rows(path, TRACKING_COLUMNS, rows)
+    rollover_history(path, "2026-10-01")
+
+    timeline = query_history(path, job="job1")
+    assert len(timeline) == sum(r["Driver_Job"] == "job1" for r in rows)
+    assert set(timeline['Driver_Job']) == {"job1"}
+    assert query_history(path, job="ไม่มีงานนี้").empty
+
+    clear_archive(path)
+    assert archive_totals(path)['rows'] == 0
+    assert len(query_history(path)) == sum(r["Date_Time"] >= "2026-10-01" for r in rows)
+
+
+def test_archived_latest_keeps_last_months_jobs_on_the_board(workdir):
+    path = "tracking_history.csv"
+    append_history_rows(path, TRACKING_COLUMNS, [
+        {"Date_Time": "2026-08-20 09:00:00", "Driver_Job": "job-aug", "Status": "ส่งแล้ว"},
+        {"Date_Time": "2026-09-30 08:00:00", "Driver_Job": "job-a", "Status": "กำลังส่ง"},
+        {"Date_Time": "2026-09-30 21:00:00", "Driver_Job": "job-b", "Status": "รอขึ้นของ"},
+        {"Date_Time": "2026-09-30 23:30:00", "Driver_Job": "job-a", "Status": "ถึงจุดที่ 3"},
+    ])
+    assert archived_latest(path) == []
+    rollover_history(path, "2026-10-01")
+
+    latest = {row["Driver_Job"]: row for row in archived_latest(path)}
+    assert set(latest) == {"job-a", "job-b"}
+    assert latest["job-a"] == {"Date_Time": "2026-09-30 23:30:00", "Driver_Job": "job-a", "Status": "ถึงจุดที่ 3"}
+
+    # แถวของเดือนเดียวกันที่ย้ายเพิ่มภายหลัง ทำให้ผลที่จำไว้ถูกอ่านใหม่
+    append_history_rows(path, TRACKING_COLUMNS, [{"Date_Time": "2026-09-30 23:50:00", "Driver_Job": "job-b", "Status": "ออกรถ"}])
+    rollover_history(path, "2026-10-01")
+    assert {row["Driver_Job"]: row["Status"] for row in archived_latest(path)} == {"job-a": "ถึงจุดที่ 3", "job-b": "ออกรถ"}
@@ -0,0 +1,18 @@
+import numpy as np
+
+from logistics_engine import LRUCache
+
+
+def test_lru_cache_evicts_by_total_bytes():
+    cache = LRUCache(8, max_bytes=250, sizeof=lambda value: value.nbytes)
+    for key in range(3):
+        cache.put(key, np.zeros(10))   # 80 ไบต์ต่อรายการ
+    cache.put(3, np.zeros(10))
+    assert cache.get(0) is None and cache.get(3) is not None
+    assert len(cache) == 3 and cache.nbytes == 240
+
+    cache.put(4, np.zeros(100))        # ใหญ่กว่า max_bytes: ไม่เก็บ และไม่ไล่รายการอื่นออก
+    assert cache.get(4) is None and len(cache) == 3
+
+    cache.put(3, np.zeros(20))         # แทนค่าเดิม: นับขนาดใหม่
+    assert len(cache) == 2 and cache.nbytes == 240
@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from logistics_engine import TRAFFIC_PROFILES, plan_file_routes, quote_trip, route_costing, route_timing
+
+NORMAL, HEAVY, HOURLY = "🟢 ปกติ (ถนนโล่ง)", "🔴 รถติดหนัก (ช่วงเร่งด่วน)", "⏰ ตามช่วงเวลา (เช้า/เย็นติด กลางคืนโล่ง)"
+PICKUP = "รถกระบะ 4 ล้อ"
+
+
+def test_hourly_profile_uses_departure_hour_of_each_leg():
+    # ออก 06:40 ช่วงแรกใช้ตัวคูณ 06:00 (1.3) ถึง 07:19 ส่งของ 15 นาที ช่วงที่สองออก 07:34 ใช้ตัวคูณ 07:00 (1.8)
+    timing = route_timing([30.0, 30.0], "06:40", HOURLY)
+    assert timing['drive_mins'] == pytest.approx([39.0, 54.0])
+    assert timing['depart'] == pytest.approx([400.0, 454.0])
+    assert timing['arrive'] == pytest.approx([439.0, 508.0])
+    assert timing['total_mins'] == pytest.approx(108.0)
+    assert timing['delay_mins'] == pytest.approx(33.0)
+
+    # fixed point: ตัวคูณของทุกช่วงตรงกับชั่วโมงที่ออกจริง
+    hours = (timing['depart'] // 60).astype(int) % 24
+    assert timing['drive_mins'] == pytest.approx(timing['base_drive_mins'] * TRAFFIC_PROFILES[HOURLY][hours])
+
+
+def test_drop_time_is_not_multiplied_and_last_leg_has_no_drop():
+    timing = route_timing([10.0, 10.0, 10.0], "08:00", HEAVY)
+    assert timing['total_mins'] == pytest.approx(3 * 20.0 + 2 * 15.0)
+    assert timing['delay_mins'] == pytest.approx(30.0)
+
+    assert route_timing([25.0], "08:00", NORMAL)['total_mins'] == pytest.approx(25.0)
+    assert route_timing([], "08:00", NORMAL)['total_mins'] == 0.0
+
+
+def test_route_costing_matches_hand_calculation():
+    # กระบะ 12 กม./ลิตร น้ำมัน 30 บาท ทางด่วน 50 บาท รถติดหนักทั้งวัน (x2.0)
+    leg_km = [12.0, 24.0]
+    res = route_costing(["คลัง", "ก", "ข"], leg_km, np.array(leg_km) * 0.85, PICKUP, 30.0, 50.0, HEAVY, "08:00")
+    assert res['base_price'] == pytest.approx(30.0 / 12 * 36 + 50.0)
+    assert res['surcharge'] == pytest.approx(36 * 0.85 * 2.0)          # ขับช้ากว่าถนนโล่ง 30.6 นาที x 2 บาท
+    assert res['cost'] == pytest.approx(140.0 + 61.2)
+    assert res['time'] == pytest.approx(36 * 0.85 * 2 + 15)
+    assert res['etas'] == ["08:00", "08:20", "09:16"]
+    assert list(res['legs']['Leg_Cost']) == pytest.approx([50.4, 100.8])
+    assert list(res['legs']['Location']) == ["ก", "ข"]
+
+
+def test_search_and_file_tabs_agree(monkeypatch):
+    import logistics_engine.planning as planning
+
+    # ไม่มี OSRM: หน้าค้นหาใช้ระยะเส้นตรง x 1.4 เหมือนหน้าไฟล์
+    monkeypatch.setattr(planning, "get_osrm_route", lambda a, b: (None, 0, 0))
+    depot, stop = (13.7563, 100.5018), (14.3532, 100.5689)
+    quote = quote_trip(depot, stop, PICKUP, HOURLY, 30.0, 0.0, "06:50")
+
+    df = pd.DataFrame({'Location': ["คลัง", "อยุธยา"], 'Latitude': [depot[0], stop[0]], 'Longitude': [depot[1], stop[1]]})
+    settings = {
+        'mode': "single", 'car_type': PICKUP, 'road_distances': False, 'fleet': None, 'traffic': HOURLY,
+        'improve_methods': [], 'time_budget': 1.0, 'fuel_price': 30.0, 'toll_fee': 0.0, 'departure': "06:50",
+    }
+    first_leg = plan_file_routes(df, "คลัง", settings)['legs'].iloc[0]
+    assert quote['osrm_fallback']
+    assert first_leg['Leg_KM'] == pytest.approx(quote['km'], abs=0.01)
+    assert first_leg['Leg_Mins'] == pytest.approx(quote['mins'], abs=0.1)
+    assert first_leg['Leg_Cost'] == pytest.approx(quote['cost'], abs=0.01)
+    assert first_leg['ETA'] == quote['etas'][1]
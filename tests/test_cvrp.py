@@ -0,0 +1,41 @@
+import numpy as np
+import pandas as pd
+
+from logistics_engine import assign_vehicles, solve_cvrp_from_df
+
+FLEET = [("รถกระบะ 4 ล้อ", 2, 1000.0), ("6 ล้อ", 1, 5000.0)]
+
+
+def make_stops(n, demand, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'Location': ['คลัง'] + [f'ลูกค้า {i}' for i in range(1, n + 1)],
+        'Latitude': np.r_[13.75, 13.6 + rng.random(n) * 0.3],
+        'Longitude': np.r_[100.5, 100.4 + rng.random(n) * 0.3],
+        'Demand': [0] + [demand] * n,
+    })
+
+
+def test_mixed_fleet_uses_every_vehicle_before_extra():
+    # 16 x 500 กก. = 8 ตัน มากกว่ากองรถ (7 ตัน) ต้องใช้รถครบ 3 คันก่อนมีเที่ยวเพิ่ม
+    vehicles, _ = solve_cvrp_from_df('คลัง', make_stops(16, 500), FLEET, improve_methods=())
+    regular = [v for v in vehicles if not v['extra']]
+    assert sorted(v['vehicle'] for v in regular) == ["6 ล้อ", "รถกระบะ 4 ล้อ", "รถกระบะ 4 ล้อ"]
+    assert all(v['load'] <= v['capacity'] for v in regular)
+    assert sum(v['load'] for v in vehicles) == 8000
+    assert sum(v['load'] for v in vehicles if v['extra']) == 1000
+
+
+def test_mixed_fleet_without_extra_when_capacity_suffices():
+    vehicles, _ = solve_cvrp_from_df('คลัง', make_stops(13, 500), FLEET, improve_methods=())
+    assert not any(v['extra'] for v in vehicles)
+    assert all(v['load'] <= v['capacity'] for v in vehicles)
+    stops = [s for v in vehicles for s in v['route'][1:-1]]
+    assert sorted(stops) == sorted(f'ลูกค้า {i}' for i in range(1, 14))
+
+
+def test_assign_vehicles_splits_overflow_route():
+    demands = {1: 400.0, 2: 400.0, 3: 400.0, 4: 400.0}
+    assignments = assign_vehicles([([1, 2, 3, 4], 1600.0)], [("รถกระบะ 4 ล้อ", 2, 1000.0)], demands)
+    assert [(route, load, extra) for route, load, _, _, extra in assignments] == [([1, 2], 800.0, False),
+                                                                                   ([3, 4], 800.0, False)]
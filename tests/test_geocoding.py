@@ -0,0 +1,76 @@
+import sqlite3
+import time
+
+import pandas as pd
+import pytest
+
+from logistics_engine import CACHE_DB_FILE, fill_missing_coordinates, geocode_locations, get_lat_lon, set_geocoder
+
+PLACES = {"ร้าน ก": (13.80, 100.55), "ร้าน ข": (13.90, 100.60), "ร้าน ค": (14.00, 100.65), "ร้าน ง": (14.10, 100.70)}
+
+
+@pytest.fixture
+def geocoder(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    calls = []
+
+    def stub(query):
+        calls.append(query)
+        return PLACES.get(query.removesuffix(", Thailand"), (None, None))
+    set_geocoder(stub)
+    yield calls
+    set_geocoder(None)
+
+
+def age_cache_rows(days):
+    with sqlite3.connect(CACHE_DB_FILE) as conn:
+        conn.execute("UPDATE geocode_cache SET created = created - ?", (days * 86400,))
+
+
+def test_geocode_cache_hits_normalized_names_and_expires(geocoder):
+    assert get_lat_lon("ร้าน ก") == PLACES["ร้าน ก"]
+    assert get_lat_lon("  ร้าน   ก ") == PLACES["ร้าน ก"]     # ชื่อที่ normalize แล้วตรงกัน ใช้แคช
+    assert get_lat_lon("ไม่มีจริง") == (None, None)
+    assert get_lat_lon("ไม่มีจริง") == (None, None)
+    assert len(geocoder) == 2
+
+    # ชื่อที่ค้นไม่เจอหมดอายุหลัง 1 วัน พิกัดที่เจอยังอยู่ (30 วัน)
+    age_cache_rows(2)
+    get_lat_lon("ร้าน ก")
+    get_lat_lon("ไม่มีจริง")
+    assert len(geocoder) == 3
+
+    age_cache_rows(31)
+    get_lat_lon("ร้าน ก")
+    assert len(geocoder) == 4
+
+
+def test_geocode_cache_evicts_least_recently_used(geocoder, monkeypatch):
+    import logistics_engine.geocoding as geocoding
+
+    monkeypatch.setattr(geocoding, "GEOCODE_CACHE_MAX_ROWS", 3)
+    for name in ["ร้าน ก", "ร้าน ข", "ร้าน ค"]:
+        get_lat_lon(name)
+        time.sleep(0.01)
+    get_lat_lon("ร้าน ก")           # ใช้ล่าสุด: ร้าน ข กลายเป็นรายการที่ไม่ได้ใช้นานสุด
+    time.sleep(0.01)
+    get_lat_lon("ร้าน ง")
+    assert len(geocoder) == 4
+
+    with sqlite3.connect(CACHE_DB_FILE) as conn:
+        keys = {row[0] for row in conn.execute("SELECT key FROM geocode_cache")}
+    assert keys == {"ร้าน ก", "ร้าน ค", "ร้าน ง"}
+
+
+def test_batch_geocoding_fills_missing_coordinates(geocoder):
+    get_lat_lon("ร้าน ก")
+    df = pd.DataFrame({'Location': ["คลัง", "ร้าน ก", "ร้าน ข", "ร้าน ข", "ไม่มีจริง"],
+                       'Latitude': [13.75, None, None, None, None], 'Longitude': [100.5, None, None, None, None]})
+    filled, unresolved = fill_missing_coordinates(df)
+    assert unresolved == ["ไม่มีจริง"]
+    assert list(filled['Location']) == ["คลัง", "ร้าน ก", "ร้าน ข", "ร้าน ข"]
+    assert tuple(filled.loc[2, ['Latitude', 'Longitude']]) == PLACES["ร้าน ข"]
+    assert sorted(geocoder) == ["ร้าน ก, Thailand", "ร้าน ข, Thailand", "ไม่มีจริง, Thailand"]
+
+    assert geocode_locations(["ร้าน ข", "ไม่มีจริง"]) == {"ร้าน ข": PLACES["ร้าน ข"], "ไม่มีจริง": (None, None)}
+    assert len(geocoder) == 3
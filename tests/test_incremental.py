@@ -0,0 +1,99 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from logistics_engine import (
+    TRAFFIC_PROFILES, build_distance_matrix, plan_file_routes_cached, replan_file_routes, solve_route, update_route,
+)
+
+SETTINGS = {
+    'mode': "single", 'car_type': "รถกระบะ 4 ล้อ", 'road_distances': False, 'fleet': None,
+    'traffic': list(TRAFFIC_PROFILES)[0], 'improve_methods': ["2-opt", "Or-opt"], 'time_budget': 1.0,
+    'fuel_price': 30.5, 'toll_fee': 0.0, 'departure': "08:00",
+}
+
+
+def make_stops(n, seed=0, prefix="ลูกค้า"):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'Location': ['คลัง'] + [f'{prefix} {i}' for i in range(1, n)],
+        'Latitude': np.r_[13.75, 13.5 + rng.random(n - 1) * 0.5],
+        'Longitude': np.r_[100.5, 100.3 + rng.random(n - 1) * 0.5],
+    })
+
+
+def check_tour(result, df):
+    route = result['route']
+    assert route[0] == route[-1] == 'คลัง'
+    assert sorted(route[1:-1]) == sorted(df['Location'].iloc[1:])
+    coords = df.set_index('Location').loc[route, ['Latitude', 'Longitude']].to_numpy()
+    legs = build_distance_matrix(coords[:, 0], coords[:, 1], dtype=np.float64)
+    assert result['km'] == pytest.approx(float(np.trace(legs, offset=1)), rel=1e-4)
+
+
+def test_update_route_adds_and_removes_stops():
+    df = make_stops(300)
+    solved = solve_route('คลัง', df, ("2-opt", "Or-opt"), 1.0)
+    extra = make_stops(6, seed=1, prefix="ใหม่").iloc[1:]
+    changed = pd.concat([df.drop(index=[10, 20, 30]), extra], ignore_index=True)
+
+    updated = update_route(solved, changed)
+    check_tour(updated, changed)
+    assert sorted(updated['changes']['added']) == sorted(extra['Location'])
+    assert sorted(updated['changes']['removed']) == ['ลูกค้า 10', 'ลูกค้า 20', 'ลูกค้า 30']
+    assert updated['km'] <= updated['initial_km'] + 1e-6
+
+    # รอบถัดไปใช้บัฟเฟอร์เดิม และนำช่องของจุดที่ยกเลิกกลับมาใช้
+    again = update_route(updated, changed.drop(index=[5]).iloc[:-1])
+    check_tour(again, changed.drop(index=[5]).iloc[:-1])
+    assert again['matrix_buffer'] is updated['matrix_buffer']
+    back = update_route(again, df)
+    check_tour(back, df)
+    assert len(back['names']) <= len(updated['names'])
+
+
+def test_update_route_rejects_moved_depot():
+    df = make_stops(50)
+    solved = solve_route('คลัง', df)
+    moved = df.copy()
+    moved.loc[0, 'Latitude'] += 0.1
+    with pytest.raises(ValueError):
+        update_route(solved, moved)
+
+
+def test_replan_falls_back_for_large_changes_or_other_file():
+    df = make_stops(200, seed=2)
+    res, _ = plan_file_routes_cached(df, 'คลัง', SETTINGS)
+    res = dict(res, source="a.csv")
+    unrelated = make_stops(200, seed=3, prefix="ร้าน")
+    assert replan_file_routes(res, unrelated, 'คลัง', SETTINGS, "a.csv") is None
+    assert replan_file_routes(res, df.iloc[:-1], 'คลัง', SETTINGS, "b.csv") is None
+
+    replanned = replan_file_routes(res, df.iloc[:-1], 'คลัง', SETTINGS, "a.csv")
+    check_tour(replanned, df.iloc[:-1])
+    assert replanned['key'] and replanned['key'] != res['key']
+    assert replanned['changes']['removed'] == [df['Location'].iloc[-1]]
+
+
+def test_replan_falls_back_when_improvement_settings_change():
+    df = make_stops(200, seed=4)
+    plain = dict(SETTINGS, improve_methods=[])
+    res, _ = plan_file_routes_cached(df, 'คลัง', plain)
+    assert replan_file_routes(res, df.iloc[:-1], 'คลัง', SETTINGS) is None
+    assert replan_file_routes(res, df.iloc[:-1], 'คลัง', dict(plain, time_budget=10.0)) is None
+    assert replan_file_routes(res, df.iloc[:-1], 'คลัง', plain) is not None
+
+
+def test_osrm_fallback_results_are_not_cached(monkeypatch):
+    import logistics_engine.osrm as osrm
+
+    def unreachable(*args):
+        raise ConnectionError("OSRM ล่ม")
+    monkeypatch.setattr(osrm, "_fetch_osrm_table", unreachable)
+    df = make_stops(50, seed=5, prefix="จุด")
+    settings = dict(SETTINGS, road_distances=True)
+    res, from_cache = plan_file_routes_cached(df, 'คลัง', settings)
+    assert res['osrm_fallback'] and not from_cache
+    # OSRM กลับมาใช้ได้ในครั้งถัดไป ต้องคำนวณใหม่ ไม่ใช่ได้ผลเส้นตรงจากแคช
+    _, from_cache = plan_file_routes_cached(df, 'คลัง', settings)
+    assert not from_cache
@@ -0,0 +1,75 @@
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from logistics_engine import parse_upload, validate_upload_chunk
+
+CSV = (
+    "Location,Latitude,Longitude,Demand,Note\n"
+    "คลัง,13.75,100.50,,ไม่ใช้\n"
+    "ร้าน ก,13.80,100.55,5,\n"
+    ",13.81,100.56,1,\n"              # ไม่มีชื่อ
+    "ร้าน ข,abc,100.57,1,\n"          # Latitude ไม่ใช่ตัวเลข
+    "ร้าน ค,13.82,,1,\n"              # มีแค่ Latitude
+    "ร้าน ง,95.0,100.58,1,\n"         # เกินช่วง
+    "ร้าน จ,13.83,100.59,-2,\n"       # Demand ติดลบ
+    ",,,,\n"                          # แถวว่าง ข้ามไปเฉย ๆ
+    "ร้าน ก,13.90,100.60,7,\n"        # ชื่อซ้ำ ใช้แถวแรก
+    "ร้าน ฉ,,,3,\n"                   # ไม่มีพิกัด ใช้ได้ (หาพิกัดภายหลัง)
+)
+
+
+def test_parse_upload_rejects_each_reason_with_file_row_numbers():
+    upload = parse_upload(CSV.encode('utf-8'), "stops.csv")
+    rejects = upload['rejects']
+    assert list(rejects['Row']) == [4, 5, 6, 7, 8, 10]
+    assert list(rejects['Reason']) == [
+        "ไม่มีชื่อสถานที่", "Latitude ไม่ใช่ตัวเลข", "พิกัดไม่ครบ (มีแค่ Latitude หรือ Longitude)",
+        "พิกัดเกินช่วงที่เป็นไปได้", "Demand ติดลบ", "ชื่อสถานที่ซ้ำ (ใช้แถวแรก)",
+    ]
+
+    df = upload['df']
+    assert list(df.columns) == ['Location', 'Latitude', 'Longitude', 'Demand']
+    assert list(df['Location']) == ["คลัง", "ร้าน ก", "ร้าน ฉ"]
+    assert df.loc[1, 'Demand'] == 5.0 and df['Latitude'].dtype == np.float64
+    assert upload['total_rows'] == 10
+
+
+def test_row_numbers_continue_across_chunks(monkeypatch):
+    import logistics_engine.ingest as ingest
+
+    monkeypatch.setattr(ingest, "UPLOAD_CHUNK_ROWS", 3)
+    upload = parse_upload(CSV.encode('utf-8'), "stops.csv")
+    assert list(upload['rejects']['Row']) == [4, 5, 6, 7, 8, 10]
+    assert list(upload['df']['Location']) == ["คลัง", "ร้าน ก", "ร้าน ฉ"]
+
+
+def test_validate_upload_chunk_requires_location_column():
+    with pytest.raises(ValueError):
+        validate_upload_chunk(pd.DataFrame({'Latitude': [13.0]}), 2)
+
+    clean, rejects = validate_upload_chunk(pd.DataFrame({'Location': ["  ร้าน ก  ", "ร้าน ข"]}), 50)
+    assert list(clean['Location']) == ["ร้าน ก", "ร้าน ข"] and list(clean['Row']) == [50, 51]
+    assert rejects.empty
+
+
+def test_parse_xlsx_upload():
+    from openpyxl import Workbook
+
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.append(["Location", "Latitude", "Longitude", "Capacity", "อื่น ๆ"])
+    sheet.append(["คลัง", 13.75, 100.5, 1000, "x"])
+    sheet.append(["ร้าน ก", "13.8", 100.55])       # แถวสั้น / ตัวเลขเป็นข้อความ
+    sheet.append(["ร้าน ข", 200, 100.6, None])
+    sheet.append([None, None, None, None])
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+
+    upload = parse_upload(buffer.getvalue(), "stops.XLSX")
+    assert list(upload['df']['Location']) == ["คลัง", "ร้าน ก"]
+    assert upload['df'].loc[1, 'Latitude'] == 13.8 and upload['df'].loc[0, 'Capacity'] == 1000.0
+    assert list(upload['rejects']['Row']) == [4]
+    assert list(upload['rejects']['Reason']) == ["พิกัดเกินช่วงที่เป็นไปได้"]
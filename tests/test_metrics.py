@@ -0,0 +1,16 @@
+from logistics_engine import LRUCache, cache_snapshot, register_cache, reset_metrics
+
+
+def test_reset_metrics_restarts_cache_hit_rates():
+    cache = LRUCache(4)
+    register_cache("test cache", lambda: (cache.hits, cache.misses))
+    cache.put("a", 1)
+    cache.get("a")
+    cache.get("b")
+    reset_metrics()
+    row = next(r for r in cache_snapshot() if r['cache'] == "test cache")
+    assert (row['hits'], row['misses'], row['hit_rate']) == (0, 0, None)
+
+    cache.get("a")
+    row = next(r for r in cache_snapshot() if r['cache'] == "test cache")
+    assert (row['hits'], row['misses'], row['hit_rate']) == (1, 0, 1.0)
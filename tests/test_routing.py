@@ -0,0 +1,40 @@
+import numpy as np
+
+from logistics_engine import build_distance_matrix, build_neighbour_lists, improve_route, nearest_neighbour_tour, tour_length
+
+
+def random_matrix(n, seed):
+    rng = np.random.default_rng(seed)
+    return build_distance_matrix(13 + rng.random(n) * 3, 100 + rng.random(n) * 3).astype(np.float64)
+
+
+def best_two_opt_delta(tour, d):
+    best = 0.0
+    for i in range(len(tour) - 3):
+        for j in range(i + 2, len(tour) - 1):
+            a, b, c, e = tour[i], tour[i + 1], tour[j], tour[j + 1]
+            best = min(best, d[a, c] + d[b, e] - d[a, b] - d[c, e])
+    return best
+
+
+def test_two_opt_reaches_local_optimum_with_neighbour_lists():
+    # 15-40 จุด มากกว่าจำนวนจุดใกล้เคียง (10) จึงต้องลองทั้งฝั่ง succ และ pred ของแต่ละคู่
+    for seed in range(40):
+        d = random_matrix(int(np.random.default_rng(seed).integers(15, 40)), seed)
+        tour, _ = nearest_neighbour_tour(d, 0)
+        tour, km, _ = improve_route(tour, d, ("2-opt",), time_budget=5.0)
+        assert sorted(tour[:-1]) == list(range(d.shape[0])) and tour[0] == tour[-1] == 0
+        assert km == tour_length(tour, d)
+        assert best_two_opt_delta(tour, d) > -1e-6
+
+
+def test_neighbour_lists_match_full_sort_across_chunks():
+    # 600 จุด = หลายบล็อกแถว (IMPROVE_CHUNK_ROWS) ผลต้องเท่ากับการเรียงทั้งแถว
+    d = random_matrix(600, 7)
+    neighbours = build_neighbour_lists(d, k=10)
+    masked = d.copy()
+    np.fill_diagonal(masked, np.inf)
+    expected = np.sort(masked, axis=1)[:, :10]
+    assert neighbours.shape == (600, 10) and neighbours.dtype == np.int64
+    assert (neighbours != np.arange(600)[:, None]).all()
+    assert np.array_equal(np.take_along_axis(d, neighbours, axis=1), expected)
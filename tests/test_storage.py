@@ -0,0 +1,60 @@
+import multiprocessing
+
+import pandas as pd
+import pytest
+
+from logistics_engine import HISTORY_COLUMNS, append_history_rows, read_history_incremental
+
+
+def history_row(i, writer=0):
+    return {"Date": f"2026-10-01 08:{i % 60:02d}:00", "Route": f"คลัง -> ลูกค้า {writer}-{i}, ซอย {i}",
+            "Distance_KM": i + 0.5, "Old_Cost": 100.0, "New_Cost": 80.0, "Saving": 20.0}
+
+
+def test_legacy_header_is_migrated_before_appending(tmp_path):
+    # ไฟล์เดิมที่เขียนด้วย pd.to_csv ก่อนมีคอลัมน์ Gmaps_Link/Stop_ETAs
+    path = str(tmp_path / "legacy_history.csv")
+    legacy = pd.DataFrame([history_row(i) for i in range(3)])
+    legacy.to_csv(path, index=False, encoding='utf-8-sig')
+
+    append_history_rows(path, HISTORY_COLUMNS, [dict(history_row(3), Gmaps_Link="https://maps", Stop_ETAs="08:00")])
+    df = pd.read_csv(path, encoding='utf-8-sig', keep_default_na=False)
+    assert list(df.columns) == HISTORY_COLUMNS
+    assert list(df["Route"]) == [history_row(i)["Route"] for i in range(4)]
+    assert list(df["Gmaps_Link"]) == ["", "", "", "https://maps"]
+
+    history = read_history_incremental(path, HISTORY_COLUMNS, sum_columns=("Distance_KM",))
+    assert history['rows'] == 4 and history['sums']['Distance_KM'] == pytest.approx(8.0)
+
+
+def test_file_without_trailing_newline_gets_one_before_append(tmp_path):
+    path = str(tmp_path / "no_newline_history.csv")
+    with open(path, "w", encoding='utf-8-sig', newline='') as f:
+        f.write(",".join(HISTORY_COLUMNS) + "\n2026-10-01 08:00:00,คลัง -> ก,1.0,10,8,2,,")
+
+    append_history_rows(path, HISTORY_COLUMNS, [history_row(1)])
+    df = pd.read_csv(path, encoding='utf-8-sig')
+    assert list(df["Route"]) == ["คลัง -> ก", history_row(1)["Route"]]
+
+
+def append_from_process(path, writer, count):
+    for i in range(count):
+        append_history_rows(path, HISTORY_COLUMNS, [history_row(i, writer)])
+
+
+def test_appends_from_several_processes_keep_every_row(tmp_path):
+    pytest.importorskip("fcntl")
+    path = str(tmp_path / "shared_history.csv")
+    context = multiprocessing.get_context("fork")
+    writers = [context.Process(target=append_from_process, args=(path, writer, 50)) for writer in range(4)]
+    for process in writers:
+        process.start()
+    for process in writers:
+        process.join(30)
+        assert process.exitcode == 0
+
+    df = pd.read_csv(path, encoding='utf-8-sig', keep_default_na=False)
+    assert list(df.columns) == HISTORY_COLUMNS
+    assert len(df) == 200
+    assert set(df["Route"]) == {history_row(i, writer)["Route"] for writer in range(4) for i in range(50)}
+    assert (df["Saving"] == 20.0).all()
@@ -0,0 +1,85 @@
+import http.server
+import json
+import sqlite3
+import threading
+
+import pytest
+
+from logistics_engine import enqueue_sync, enqueue_sync_many, set_sync_endpoint, sync_pending_once, sync_queue_size
+from logistics_engine.sync import APP_SCRIPT_URL, SYNC_QUEUE_FILE
+
+
+class AppScriptStub(http.server.BaseHTTPRequestHandler):
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        server = self.server
+        if server.failures > 0:
+            server.failures -= 1
+            self.send_response(500)
+        else:
+            server.received.append(body)
+            self.send_response(200)
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def app_script(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), AppScriptStub)
+    server.failures, server.received = 0, []
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    set_sync_endpoint(f"http://127.0.0.1:{server.server_port}/exec")
+    yield server
+    set_sync_endpoint(APP_SCRIPT_URL)
+    server.shutdown()
+    server.server_close()
+
+
+def queue_rows():
+    with sqlite3.connect(SYNC_QUEUE_FILE) as conn:
+        return conn.execute("SELECT attempts, next_attempt, last_error FROM outbox ORDER BY id").fetchall()
+
+
+def test_failed_post_backs_off_then_succeeds(app_script):
+    app_script.failures = 1
+    enqueue_sync({"route": "คลัง -> ก", "km": 12.5})
+    assert sync_queue_size() == 1
+
+    assert sync_pending_once() == 0
+    [(attempts, next_attempt, last_error)] = queue_rows()
+    assert attempts == 1 and "500" in last_error
+    assert sync_pending_once() == 0          # ยังไม่ถึงเวลาลองใหม่ (backoff)
+    assert app_script.received == []
+
+    with sqlite3.connect(SYNC_QUEUE_FILE) as conn:
+        conn.execute("UPDATE outbox SET next_attempt = next_attempt - 60")
+    assert sync_pending_once() == 1
+    assert sync_queue_size() == 0
+    assert app_script.received == [{"route": "คลัง -> ก", "km": 12.5}]
+
+
+def test_rows_are_sent_in_order_in_batches(app_script, monkeypatch):
+    import logistics_engine.sync as sync
+
+    monkeypatch.setattr(sync, "SYNC_BATCH_SIZE", 3)
+    enqueue_sync_many([{"i": i} for i in range(7)])
+    assert [sync_pending_once() for _ in range(4)] == [3, 3, 1, 0]
+    assert app_script.received == [{"i": i} for i in range(7)]
+
+
+def test_rows_past_the_claim_go_back_to_the_queue_unsent(app_script, monkeypatch):
+    import logistics_engine.sync as sync
+
+    # หมดเวลาจองก่อนส่ง: คืนแถวเข้าคิวโดยไม่ส่ง ไม่นับเป็นการส่งล้มเหลว
+    claim_seconds = sync.SYNC_CLAIM_SECONDS
+    monkeypatch.setattr(sync, "SYNC_CLAIM_SECONDS", 0)
+    enqueue_sync_many([{"i": 0}, {"i": 1}])
+    assert sync_pending_once() == 0
+    assert app_script.received == [] and [row[0] for row in queue_rows()] == [0, 0]
+
+    monkeypatch.setattr(sync, "SYNC_CLAIM_SECONDS", claim_seconds)
+    assert sync_pending_once() == 2
+    assert app_script.received == [{"i": 0}, {"i": 1}]